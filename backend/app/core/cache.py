@@ -0,0 +1,60 @@
+"""
+Cache en memoria con expiración (TTL) y tamaño máximo
+
+Cada worker mantiene su propia copia; por eso los TTL deben ser cortos y
+las rutas que modifican datos invalidan explícitamente sus entradas.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Cache LRU con expiración por entrada y métricas de aciertos"""
+
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna el valor si existe y no expiró"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Guarda un valor; ttl_seconds permite un TTL distinto por entrada"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Elimina una entrada"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Vacía el cache"""
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Métricas del cache"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
@@ -10,6 +10,15 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # Autenticación: cache de usuarios resueltos desde el token
+    USER_CACHE_TTL_SECONDS: int = 60
+    # Si es True, get_current_admin_user confía en el rol e id firmados en el
+    # token y no consulta la base (un cambio de rol rige al vencer el token)
+    TRUST_TOKEN_ROLE_CLAIM: bool = False
+    # Pool de bcrypt: hilos y máximo de operaciones en espera antes de rechazar
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     # Control de creación de admin
     ALLOW_ADMIN_CREATION: bool = False
 
@@ -38,6 +47,56 @@ class Settings(BaseSettings):
     SENDGRID_API_KEY: str = ""
     EMAIL_FROM: str = "noreply@calero.com"
     EMAIL_FROM_NAME: str = "CALERO"
+    SENDGRID_API_HOST: str = "https://api.sendgrid.com"  # Apuntar a un servidor falso local para pruebas
+
+    # Cola de salida de emails (colección email_outbox, workers async con reintentos)
+    EMAIL_WORKERS: int = 4
+    EMAIL_CLAIM_BATCH_SIZE: int = 20  # Emails reclamados por lote (y en espera por instancia)
+    EMAIL_LEASE_SECONDS: int = 120  # Tras este tiempo sin resultado otro worker lo retoma
+    EMAIL_POLL_INTERVAL_SECONDS: float = 5
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_SECONDS: float = 2  # Backoff: 2s, 4s, 8s, ...
+    EMAIL_ATTEMPT_LOG_SIZE: int = 10  # Intentos registrados por email
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 30  # Los enviados se eliminan por TTL
+
+    # Envíos masivos de marketing
+    BROADCAST_BATCH_SIZE: int = 1000  # Destinatarios por llamada a SendGrid (máximo 1000)
+    BROADCAST_RECIPIENTS_PER_SECOND: float = 100
+    BROADCAST_LEASE_SECONDS: int = 300
+
+    # Rate limiting: "memory" (por worker) o "mongo" (compartido entre workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LOGIN: str = "5/minute"
+    RATE_LIMIT_SEARCH: str = "60/minute"
+    RATE_LIMIT_ORDER_CREATE: str = "10/minute"
+
+    # Cupones: cache de /coupons/validate y límite de intentos
+    COUPON_CACHE_TTL_SECONDS: int = 30
+    COUPON_NEGATIVE_CACHE_TTL_SECONDS: int = 60
+    COUPON_VALIDATE_MAX_ATTEMPTS: int = 30  # Por IP y código, por ventana
+    COUPON_VALIDATE_MAX_MISSES: int = 10  # Códigos inexistentes por IP, por ventana
+    COUPON_VALIDATE_WINDOW_SECONDS: int = 60
+
+    # Envíos: recarga periódica de la tabla de zonas en memoria
+    SHIPPING_RATES_REFRESH_SECONDS: int = 300
+
+    # Checkout: vigencia del token de cotización (/orders/quote)
+    QUOTE_TOKEN_EXPIRE_MINUTES: int = 10
+
+    # Reviews: cache de la primera página de cada orden por producto
+    REVIEW_PAGE_CACHE_TTL_SECONDS: int = 60
+    REVIEW_FIRST_PAGE_SIZE: int = 50
+
+    # Wishlist: cache por usuario de los productos en su wishlist
+    WISHLIST_CACHE_TTL_SECONDS: int = 30
+
+    # Avisos de wishlist (vuelta a stock / baja de precio)
+    WISHLIST_ALERT_BATCH_SIZE: int = 200  # Usuarios por lote de envío
+    WISHLIST_ALERT_PRODUCT_WINDOW_MINUTES: int = 60  # Una difusión por producto y tipo
+    WISHLIST_ALERT_USER_WINDOW_HOURS: int = 72  # Un aviso por usuario, producto y tipo
+
+    # Auditoría de índices con explain() al iniciar (ver scripts/audit_indexes.py)
+    INDEX_AUDIT_ON_STARTUP: bool = False
 
     class Config:
         env_file = ".env"
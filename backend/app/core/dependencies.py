@@ -1,38 +1,113 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from typing import Optional
+from beanie import PydanticObjectId
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.models.user_model import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+# Usuarios resueltos por sujeto del token (email). Cada request recibe
+# una copia del documento cacheado; quien modifique al usuario en la base
+# debe invalidar su entrada.
+_user_cache = TTLCache(ttl_seconds=settings.USER_CACHE_TTL_SECONDS, max_size=10000)
+
+
+def invalidate_cached_user(email: str):
+    """Descarta el usuario del cache (llamar tras cambiar perfil, rol o estado)"""
+    _user_cache.invalidate(email)
+
+
+def user_cache_stats() -> dict:
+    """Métricas del cache de usuarios autenticados"""
+    return _user_cache.stats()
+
+
+def decode_access_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
     try:
         # Decodificamos el token
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    # Buscamos al usuario en Mongo
-    user = await User.find_one(User.email == email)
-    if user is None:
+    if payload.get("sub") is None:
         raise credentials_exception
-        
-    return user
-        
-async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
-    if current_user.role != "admin":
+
+    return payload
+
+
+async def resolve_user(email: str) -> Optional[User]:
+    """
+    Busca al usuario por email, primero en el cache y luego en Mongo.
+    Retorna una copia: los cambios del request (ej. current_user.set) no
+    alteran el documento cacheado que ven los demás requests.
+    """
+    user = _user_cache.get(email)
+
+    if user is None:
+        user = await User.find_one(User.email == email)
+        if user is None:
+            return None
+        _user_cache.set(email, user)
+
+    return user.model_copy(deep=True)
+
+
+def admin_from_claims(payload: dict) -> Optional[User]:
+    """
+    Identidad de admin armada solo con los claims firmados del token
+    (id, email y rol), sin consultar la base. None si el token no trae
+    el id del usuario (tokens emitidos antes del claim uid).
+    """
+    user_id = payload.get("uid")
+    if not user_id or not PydanticObjectId.is_valid(user_id):
+        return None
+
+    return User.model_construct(id=PydanticObjectId(user_id), email=payload["sub"], role="admin")
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    payload = decode_access_token(token)
+
+    user = await resolve_user(payload["sub"])
+    if user is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de Administrador para esta accion"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudieron validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    return current_user
\ No newline at end of file
+
+    return user
+
+
+async def get_current_admin_user(token: str = Depends(oauth2_scheme)) -> User:
+    forbidden_exception = HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Se requieren permisos de Administrador para esta accion"
+    )
+
+    # Con TRUST_TOKEN_ROLE_CLAIM el token firmado decide el acceso sin
+    # consultar la base: los no-admin se rechazan y el admin se arma con
+    # sus claims (solo id, email y rol). Un cambio de rol rige al vencer
+    # los tokens ya emitidos.
+    if settings.TRUST_TOKEN_ROLE_CLAIM:
+        payload = decode_access_token(token)
+        if payload.get("role") != "admin":
+            raise forbidden_exception
+        admin = admin_from_claims(payload)
+        if admin is not None:
+            return admin
+        return await get_current_user(token)
+
+    current_user = await get_current_user(token)
+    if current_user.role != "admin":
+        raise forbidden_exception
+    return current_user
@@ -0,0 +1,197 @@
+"""
+Limitadores de intentos por ventana deslizante
+
+- SlidingWindowLimiter: contador en memoria de un solo proceso.
+- RateLimitBackend: almacén de contadores intercambiable. Con varios
+  workers de uvicorn usar RATE_LIMIT_BACKEND="mongo" para que todos
+  compartan los mismos contadores.
+
+En todos los limitadores las solicitudes rechazadas también cuentan: un
+cliente que sigue insistiendo durante el bloqueo sigue bloqueado.
+- rate_limit(): dependencia de FastAPI que aplica un límite "N/unidad"
+  por IP usando el backend configurado.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Hashable, Tuple
+from fastapi import HTTPException, Request, status
+from pymongo import ReturnDocument
+from slowapi.util import get_remote_address
+
+from app.core.config import settings
+from app.models.rate_limit_model import RateLimitCounter
+
+_RATE_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class SlidingWindowLimiter:
+    """
+    Cuenta intentos por clave dentro de una ventana deslizante.
+    Cada verificación es O(1) amortizado.
+
+    Solo se guardan los últimos max_attempts intentos de cada clave: la
+    clave está bloqueada si el más antiguo de ellos sigue en la ventana.
+    """
+
+    def __init__(self, max_attempts: int, window_seconds: float, max_keys: int = 10000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts: Dict[Hashable, Deque[float]] = {}
+
+    def hit(self, key: Hashable) -> bool:
+        """
+        Registra un intento (también si se rechaza).
+        Returns: False si la clave excedió el límite en la ventana actual
+        """
+        now = time.monotonic()
+        attempts = self._attempts.get(key)
+
+        if attempts is None:
+            if len(self._attempts) >= self.max_keys:
+                self._evict_expired(now)
+            attempts = self._attempts[key] = deque(maxlen=self.max_attempts)
+
+        self._trim(attempts, now)
+        allowed = len(attempts) < self.max_attempts
+        attempts.append(now)
+        return allowed
+
+    def is_blocked(self, key: Hashable) -> bool:
+        """Indica si la clave está bloqueada sin registrar un intento"""
+        attempts = self._attempts.get(key)
+        if not attempts:
+            return False
+        self._trim(attempts, time.monotonic())
+        return len(attempts) >= self.max_attempts
+
+    def _trim(self, attempts: Deque[float], now: float):
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+
+    def _evict_expired(self, now: float):
+        for key in list(self._attempts):
+            attempts = self._attempts[key]
+            self._trim(attempts, now)
+            if not attempts:
+                del self._attempts[key]
+
+        # Si aún está lleno, descartar las claves más antiguas dejando un 10%
+        # libre: así el recorrido completo no se repite en cada clave nueva
+        target = self.max_keys - max(self.max_keys // 10, 1)
+        while len(self._attempts) > target:
+            self._attempts.pop(next(iter(self._attempts)))
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Convierte "5/minute" en (5, 60)"""
+    amount, unit = rate.split("/")
+    return (int(amount), _RATE_UNITS[unit.strip().rstrip("s")])
+
+
+class RateLimitBackend(ABC):
+    """Almacén de contadores para límites por ventana"""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        """
+        Registra una solicitud (también si se rechaza).
+        Returns: False si la clave excedió el límite en la ventana
+        """
+
+    @abstractmethod
+    async def is_blocked(self, key: str, limit: int, window_seconds: int) -> bool:
+        """Indica si la clave está bloqueada sin registrar una solicitud"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Contadores en memoria: cada worker limita por separado"""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[int, int], SlidingWindowLimiter] = {}
+
+    def _limiter(self, limit: int, window_seconds: int) -> SlidingWindowLimiter:
+        limiter = self._limiters.get((limit, window_seconds))
+        if limiter is None:
+            limiter = self._limiters[(limit, window_seconds)] = SlidingWindowLimiter(limit, window_seconds)
+        return limiter
+
+    async def hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        return self._limiter(limit, window_seconds).hit(key)
+
+    async def is_blocked(self, key: str, limit: int, window_seconds: int) -> bool:
+        return self._limiter(limit, window_seconds).is_blocked(key)
+
+
+class MongoRateLimitBackend(RateLimitBackend):
+    """
+    Contadores compartidos en la colección rate_limits.
+
+    Ventana deslizante aproximada: la ventana fija actual se suma con la
+    anterior ponderada por la fracción que aún cae dentro de la ventana.
+    Cada solicitud es un $inc atómico (upsert) más la lectura de la
+    ventana anterior, ambos en paralelo.
+    """
+
+    async def _counts(self, key: str, window_seconds: int, increment: bool) -> float:
+        now = time.time()
+        index = int(now // window_seconds)
+        collection = RateLimitCounter.get_pymongo_collection()
+
+        if increment:
+            expires_at = datetime.fromtimestamp((index + 2) * window_seconds, tz=timezone.utc)
+            current_op = collection.find_one_and_update(
+                {"_id": f"{key}:{index}"},
+                {"$inc": {"hits": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            current_op = collection.find_one({"_id": f"{key}:{index}"})
+
+        current, previous = await asyncio.gather(
+            current_op,
+            collection.find_one({"_id": f"{key}:{index - 1}"})
+        )
+
+        elapsed = (now % window_seconds) / window_seconds
+        previous_count = previous["hits"] if previous else 0
+        current_count = current["hits"] if current else 0
+        return previous_count * (1 - elapsed) + current_count
+
+    async def hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        return await self._counts(key, window_seconds, increment=True) <= limit
+
+    async def is_blocked(self, key: str, limit: int, window_seconds: int) -> bool:
+        return await self._counts(key, window_seconds, increment=False) >= limit
+
+
+def build_rate_limit_backend() -> RateLimitBackend:
+    """Crea el backend indicado por RATE_LIMIT_BACKEND ("memory" o "mongo")"""
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+# Instancia global
+rate_limiter = build_rate_limit_backend()
+
+
+def rate_limit(scope: str, rate: str):
+    """
+    Dependencia que limita solicitudes por IP, ej:
+    dependencies=[Depends(rate_limit("login", settings.RATE_LIMIT_LOGIN))]
+    """
+    limit, window_seconds = parse_rate(rate)
+
+    async def check_rate_limit(request: Request):
+        if not await rate_limiter.hit(f"{scope}:{get_remote_address(request)}", limit, window_seconds):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas solicitudes. Por favor, espera un momento."
+            )
+
+    return check_rate_limit
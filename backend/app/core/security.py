@@ -1,9 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from typing import Any, Callable, Union, Optional
 from jose import jwt
 import bcrypt
 from app.core.config import settings
 
+# bcrypt tarda decenas de ms por llamada: en las rutas async se ejecuta en
+# un pool dedicado y acotado para no bloquear el event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+_password_pool_metrics = {"pending": 0, "max_pending": 0, "completed": 0, "rejected": 0}
+
+
+class PasswordPoolBusyError(Exception):
+    """El pool de bcrypt tiene demasiadas tareas en espera"""
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña plana coincide con el hash"""
     password_bytes = plain_password.encode('utf-8')
@@ -17,9 +32,48 @@ def get_password_hash(password: str) -> str:
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
-def create_access_context(subject: Union[str, Any]) -> str:
-    """Crea un token JWT de acceso"""
+async def _run_password_task(func: Callable, *args):
+    """Ejecuta una operación bcrypt en el pool, registrando la profundidad de la cola"""
+    metrics = _password_pool_metrics
+    if metrics["pending"] >= settings.PASSWORD_HASH_MAX_PENDING:
+        metrics["rejected"] += 1
+        raise PasswordPoolBusyError()
+
+    metrics["pending"] += 1
+    metrics["max_pending"] = max(metrics["max_pending"], metrics["pending"])
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        metrics["pending"] -= 1
+        metrics["completed"] += 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password sin bloquear el event loop"""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash sin bloquear el event loop"""
+    return await _run_password_task(get_password_hash, password)
+
+
+def password_pool_stats() -> dict:
+    """Métricas del pool de bcrypt (pending = en cola + en ejecución)"""
+    return {"workers": settings.PASSWORD_HASH_WORKERS, **_password_pool_metrics}
+
+
+def create_access_context(
+    subject: Union[str, Any],
+    role: Optional[str] = None,
+    user_id: Optional[Any] = None
+) -> str:
+    """Crea un token JWT de acceso (con el rol y el id del usuario firmados si se indican)"""
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"exp": expire, "sub": str(subject)}
+    if role:
+        to_encode["role"] = role
+    if user_id is not None:
+        to_encode["uid"] = str(user_id)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
\ No newline at end of file
@@ -4,10 +4,13 @@ from app.core.config import settings
 from app.models.user_model import User
 from app.models.product_model import Product
 from app.models.orders_model import Order
-from app.models.coupon_model import Coupon
-from app.models.review_model import ProductReview
-from app.models.wishlist_model import Wishlist
+from app.models.coupon_model import Coupon, CouponRedemption
+from app.models.review_model import ProductReview, ReviewHelpfulVote
+from app.models.wishlist_model import Wishlist, WishlistAlert
 from app.models.shipping_model import ShippingZone
+from app.models.rate_limit_model import RateLimitCounter
+from app.models.email_outbox_model import EmailOutboxMessage
+from app.models.broadcast_model import EmailBroadcast
 
 client: AsyncIOMotorClient | None = None
 
@@ -22,9 +25,15 @@ async def init_db():
             Product,
             Order,
             Coupon,
+            CouponRedemption,
             ProductReview,
+            ReviewHelpfulVote,
             Wishlist,
-            ShippingZone
+            WishlistAlert,
+            ShippingZone,
+            RateLimitCounter,
+            EmailOutboxMessage,
+            EmailBroadcast
         ]
     )
 
@@ -0,0 +1,170 @@
+"""
+Auditoría de índices
+
+Ejecuta explain() sobre la forma de las consultas que hacen las rutas y
+reporta las que recorrerían la colección completa (COLLSCAN) o
+ordenarían en memoria (SORT). Se usa desde scripts/audit_indexes.py y,
+con INDEX_AUDIT_ON_STARTUP, al iniciar la API.
+
+Al agregar una consulta nueva en una ruta, agregar su forma a QUERY_SHAPES.
+"""
+import logging
+from typing import List, Optional
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from app.models.user_model import User
+from app.models.product_model import Product
+from app.models.orders_model import Order
+from app.models.coupon_model import Coupon, CouponRedemption
+from app.models.review_model import ProductReview, ReviewHelpfulVote
+from app.models.wishlist_model import Wishlist
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_ID = PydanticObjectId()
+
+
+class QueryShape(BaseModel):
+    """Forma de una consulta: colección, filtro y orden (valores de ejemplo)"""
+    route: str
+    model: type
+    filter: dict
+    sort: Optional[list] = None
+
+
+class QueryAuditResult(BaseModel):
+    """Resultado de auditar una forma de consulta"""
+    route: str
+    collection: str
+    stages: List[str]
+    index_names: List[str]
+    collscan: bool
+    in_memory_sort: bool
+
+
+QUERY_SHAPES: List[QueryShape] = [
+    # Autenticación
+    QueryShape(route="POST /auth/login, get_current_user", model=User, filter={"email": "user@example.com"}),
+    QueryShape(route="GET /users (admin)", model=User, filter={}, sort=[("created_at", -1), ("_id", -1)]),
+    QueryShape(
+        route="GET /users?role=&is_active= (admin)", model=User,
+        filter={"role": "customer", "is_active": True}, sort=[("created_at", -1), ("_id", -1)]
+    ),
+    QueryShape(
+        route="GET /users?search= (admin)", model=User,
+        filter={"$or": [
+            {"email": {"$regex": "^ana"}},
+            {"first_name": {"$regex": "^ana"}},
+            {"first_name": {"$regex": "^Ana"}},
+            {"last_name": {"$regex": "^ana"}},
+            {"last_name": {"$regex": "^Ana"}}
+        ]},
+        sort=[("created_at", -1), ("_id", -1)]
+    ),
+
+    # Catálogo
+    QueryShape(route="GET /products", model=Product, filter={"is_active": True}, sort=[("created_at", -1)]),
+    QueryShape(route="GET /products?sort_by=price_low", model=Product, filter={"is_active": True}, sort=[("base_price", 1)]),
+    QueryShape(
+        route="GET /products?sort_by=rating", model=Product, filter={"is_active": True},
+        sort=[("average_rating", -1), ("review_count", -1)]
+    ),
+    QueryShape(route="GET /products?category=", model=Product, filter={"is_active": True, "category": "General"}, sort=[("created_at", -1)]),
+    QueryShape(route="GET /products?tags=", model=Product, filter={"is_active": True, "tags": {"$in": ["cuero"]}}),
+    QueryShape(route="GET /products/featured", model=Product, filter={"is_active": True, "is_featured": True}, sort=[("created_at", -1)]),
+    QueryShape(route="POST /products (sku único)", model=Product, filter={"sku": "SKU-1"}),
+
+    # Órdenes
+    QueryShape(route="GET /orders/me", model=Order, filter={"user_id": _SAMPLE_ID}, sort=[("created_at", -1)]),
+    QueryShape(route="GET /orders (admin)", model=Order, filter={"status": "PENDING"}, sort=[("created_at", -1)]),
+    QueryShape(route="POST /webhooks/wompi", model=Order, filter={"wompi_transaction_id": "tx"}),
+    QueryShape(
+        route="POST /reviews (compra verificada)", model=Order,
+        filter={"user_id": _SAMPLE_ID, "items.product_id": _SAMPLE_ID, "status": {"$in": ["SHIPPED", "DELIVERED"]}},
+        sort=[("created_at", -1)]
+    ),
+
+    # Cupones
+    QueryShape(route="POST /coupons/validate", model=Coupon, filter={"code": "BIENVENIDA2026"}),
+    QueryShape(route="coupon_service.release", model=CouponRedemption, filter={"order_id": _SAMPLE_ID}),
+
+    # Reviews
+    QueryShape(
+        route="GET /reviews/product/{id}", model=ProductReview,
+        filter={"product_id": _SAMPLE_ID, "is_approved": True}, sort=[("created_at", -1)]
+    ),
+    QueryShape(
+        route="GET /reviews/product/{id}?sort_by=helpful", model=ProductReview,
+        filter={"product_id": _SAMPLE_ID, "is_approved": True}, sort=[("helpful_count", -1), ("created_at", -1)]
+    ),
+    QueryShape(
+        route="GET /reviews/product/{id}?sort_by=rating_low", model=ProductReview,
+        filter={"product_id": _SAMPLE_ID, "is_approved": True}, sort=[("rating", 1), ("created_at", -1)]
+    ),
+    QueryShape(route="GET /reviews/my-reviews", model=ProductReview, filter={"user_id": _SAMPLE_ID}, sort=[("created_at", -1)]),
+    QueryShape(route="GET /reviews/admin/pending", model=ProductReview, filter={"is_approved": False}, sort=[("created_at", -1)]),
+    QueryShape(route="DELETE /reviews/{id} (votos)", model=ReviewHelpfulVote, filter={"review_id": _SAMPLE_ID}),
+
+    # Wishlist
+    QueryShape(route="/wishlist/*", model=Wishlist, filter={"user_id": _SAMPLE_ID}),
+    QueryShape(route="avisos de wishlist", model=Wishlist, filter={"products": _SAMPLE_ID}),
+]
+
+
+def _collect_plan(plan: dict, stages: List[str], index_names: List[str]):
+    """
+    Recorre el plan ganador acumulando etapas e índices usados. Con el
+    motor SBE el árbol de etapas viene dentro de winningPlan.queryPlan.
+    """
+    plan = plan.get("queryPlan", plan)
+    stages.append(plan.get("stage", ""))
+    if plan.get("indexName"):
+        index_names.append(plan["indexName"])
+    if "inputStage" in plan:
+        _collect_plan(plan["inputStage"], stages, index_names)
+    for child in plan.get("inputStages", []):
+        _collect_plan(child, stages, index_names)
+
+
+async def explain_shape(shape: QueryShape) -> QueryAuditResult:
+    """Ejecuta explain() (queryPlanner) sobre una forma de consulta"""
+    collection = shape.model.get_pymongo_collection()
+    cursor = collection.find(shape.filter)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    explain = await cursor.limit(20).explain()
+
+    stages: List[str] = []
+    index_names: List[str] = []
+    _collect_plan(explain["queryPlanner"]["winningPlan"], stages, index_names)
+
+    return QueryAuditResult(
+        route=shape.route,
+        collection=collection.name,
+        stages=stages,
+        index_names=index_names,
+        collscan="COLLSCAN" in stages,
+        in_memory_sort="SORT" in stages
+    )
+
+
+async def audit_indexes() -> List[QueryAuditResult]:
+    """Audita todas las formas de consulta registradas"""
+    return [await explain_shape(shape) for shape in QUERY_SHAPES]
+
+
+async def log_index_audit():
+    """Audita al iniciar y deja advertencias en el log por cada problema"""
+    try:
+        results = await audit_indexes()
+    except Exception as e:
+        logger.error(f"Index audit failed: {str(e)}")
+        return
+
+    problems = [r for r in results if r.collscan or r.in_memory_sort]
+    for result in problems:
+        issue = "COLLSCAN" if result.collscan else "in-memory SORT"
+        logger.warning(f"Index audit: {result.route} on '{result.collection}' uses {issue}")
+
+    logger.info(f"Index audit: {len(results)} query shapes checked, {len(problems)} problems")
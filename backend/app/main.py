@@ -1,8 +1,5 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from app.db.connection import init_db
 from app.routes import (
     users_routes,
@@ -13,9 +10,16 @@ from app.routes import (
     coupon_routes,
     review_routes,
     wishlist_routes,
-    webhook_routes
+    webhook_routes,
+    shipping_routes,
+    email_routes
 )
 from app.core.config import settings
+from app.services.shipping_service import shipping_service
+from app.services.email_service import email_service
+from app.services.email_outbox import email_outbox
+from app.services.broadcast_service import broadcast_service
+from app.db.index_audit import log_index_audit
 import logging
 
 # Configurar logging
@@ -31,11 +35,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Configurar rate limiter
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # Configurar CORS
 origins = settings.CORS_ORIGINS.split(",")
 
@@ -55,6 +54,19 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    await shipping_service.load()
+    email_outbox.start(email_service.deliver)
+    await broadcast_service.resume_interrupted()
+
+    if settings.INDEX_AUDIT_ON_STARTUP:
+        await log_index_audit()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Entregar lo que quede en la cola antes de salir
+    await broadcast_service.stop()
+    await email_outbox.stop()
 
 
 
@@ -67,3 +79,5 @@ app.include_router(coupon_routes.router, prefix="/coupons", tags=["Coupons"])
 app.include_router(review_routes.router, prefix="/reviews", tags=["Reviews"])
 app.include_router(wishlist_routes.router, prefix="/wishlist", tags=["Wishlist"])
 app.include_router(webhook_routes.router, prefix="/webhooks", tags=["Webhooks"])
+app.include_router(shipping_routes.router, prefix="/shipping", tags=["Shipping"])
+app.include_router(email_routes.router, prefix="/emails", tags=["Emails"])
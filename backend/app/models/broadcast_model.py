@@ -0,0 +1,53 @@
+from typing import List, Optional
+from datetime import datetime, timezone
+from enum import Enum
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+
+class BroadcastStatus(str, Enum):
+    """Estados de un envío masivo"""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"  # Un lote agotó los reintentos; se puede reanudar
+    CANCELLED = "CANCELLED"
+
+
+class EmailBroadcast(Document):
+    """
+    Envío masivo de marketing a los usuarios.
+
+    Los destinatarios se recorren por _id ascendente; resume_after guarda
+    el último _id enviado, así el job se reanuda en ese punto tras una
+    pausa, un fallo o un reinicio. Un lease evita que dos instancias
+    procesen el mismo envío.
+    """
+    name: str = Field(..., max_length=200, description="Nombre interno del envío")
+    subject: str = Field(..., max_length=200)
+    html_content: str = Field(..., description="Contenido HTML; -first_name- se reemplaza por destinatario")
+    roles: List[str] = Field(default_factory=lambda: ["customer"], description="Roles de usuario destinatarios")
+    recipients_per_second: Optional[float] = Field(None, gt=0, description="Límite de envío (None = valor por defecto)")
+
+    status: BroadcastStatus = Field(default=BroadcastStatus.PENDING)
+    resume_after: Optional[PydanticObjectId] = Field(None, description="Último usuario enviado")
+    sent_count: int = 0
+    batches_sent: int = 0
+    last_error: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_until: Optional[datetime] = None
+
+    created_by: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Settings:
+        name = "email_broadcasts"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="broadcast_status_lease_idx"),
+            IndexModel([("created_at", DESCENDING)], name="broadcast_created_idx"),
+        ]
@@ -1,7 +1,8 @@
-from typing import Optional, List
+from typing import Optional, List, Iterable, Tuple
 from datetime import datetime, timezone
-from beanie import Document, Indexed
+from beanie import Document, Indexed, PydanticObjectId
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING
 from enum import Enum
 
 
@@ -92,8 +93,33 @@ class Coupon(Document):
 
         return (True, "")
 
+    def has_line_restrictions(self) -> bool:
+        """Indica si el cupón restringe categorías o productos"""
+        return bool(self.applicable_categories or self.excluded_products)
+
+    def eligible_subtotal(self, lines: Iterable[Tuple[str, str, float]]) -> float:
+        """
+        Suma el subtotal de las líneas a las que aplica el cupón.
+        lines: (product_id, categoría, subtotal de la línea)
+        """
+        if not self.has_line_restrictions():
+            return sum(line_total for _, _, line_total in lines)
+
+        # Sets para búsquedas O(1) aunque las listas sean grandes
+        excluded = set(self.excluded_products)
+        categories = set(self.applicable_categories)
+
+        return sum(
+            line_total
+            for product_id, category, line_total in lines
+            if product_id not in excluded and (not categories or category in categories)
+        )
+
     def calculate_discount(self, subtotal: float) -> float:
-        """Calcula el monto de descuento para un subtotal dado"""
+        """
+        Calcula el monto de descuento para un subtotal dado.
+        Con restricciones de línea, subtotal debe ser el de eligible_subtotal.
+        """
         if self.discount_type == DiscountType.PERCENTAGE:
             discount = subtotal * (self.discount_value / 100)
         else:  # FIXED
@@ -105,3 +131,37 @@ class Coupon(Document):
 
         # El descuento no puede ser mayor al subtotal
         return min(discount, subtotal)
+
+
+class CouponRedemption(Document):
+    """
+    Registro de un uso de cupón por un usuario en una orden.
+
+    Cada uso ocupa un "slot" (0..max_uses_per_user-1); el índice único
+    (coupon_id, user_id, slot) hace que el límite por usuario se cumpla
+    de forma atómica aunque lleguen checkouts concurrentes.
+    """
+    coupon_id: PydanticObjectId = Field(..., description="ID del cupón")
+    coupon_code: str = Field(..., description="Código del cupón al momento del uso")
+    user_id: PydanticObjectId = Field(..., description="ID del usuario")
+    order_id: PydanticObjectId = Field(..., description="ID de la orden")
+    slot: int = Field(..., ge=0, description="Slot de uso dentro del límite por usuario")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "coupon_redemptions"
+        indexes = [
+            IndexModel(
+                [("coupon_id", ASCENDING), ("user_id", ASCENDING), ("slot", ASCENDING)],
+                name="coupon_user_slot_idx",
+                unique=True
+            ),
+            IndexModel(
+                [("coupon_id", ASCENDING), ("user_id", ASCENDING), ("order_id", ASCENDING)],
+                name="coupon_user_order_idx"
+            ),
+            IndexModel(
+                [("order_id", ASCENDING)],
+                name="order_redemptions_idx"
+            ),
+        ]
@@ -0,0 +1,79 @@
+from typing import List, Optional
+from datetime import datetime, timezone
+from enum import Enum
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+
+class EmailOutboxStatus(str, Enum):
+    """Estados de un email en la cola de salida"""
+    PENDING = "PENDING"  # Esperando envío (o reintento)
+    SENDING = "SENDING"  # Reclamado por un worker (con lease)
+    SENT = "SENT"
+    FAILED = "FAILED"  # Agotó los reintentos o error permanente
+
+
+class EmailDeliveryAttempt(BaseModel):
+    """Resultado de un intento de entrega"""
+    attempted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    success: bool
+    error: Optional[str] = None
+    duration_ms: Optional[float] = None
+
+
+class EmailOutboxMessage(Document):
+    """
+    Email pendiente de envío.
+
+    Se guarda en la misma solicitud que lo origina; los workers lo
+    reclaman con un lease (find_one_and_update), así un reinicio no lo
+    pierde y un lease vencido permite que otro worker lo retome.
+    """
+    to_email: str
+    subject: str
+    html_content: str
+    cc: Optional[List[str]] = None
+    kind: str = Field(default="generic", description="Tipo de email (order_confirmation, welcome, ...)")
+    order_id: Optional[PydanticObjectId] = Field(None, description="Orden relacionada, si aplica")
+
+    status: EmailOutboxStatus = Field(default=EmailOutboxStatus.PENDING)
+    attempts: int = Field(default=0, ge=0)
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    lease_owner: Optional[str] = None
+    lease_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    attempt_log: List[EmailDeliveryAttempt] = Field(default_factory=list)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    sent_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = Field(None, description="Los enviados se eliminan por TTL")
+
+    class Settings:
+        name = "email_outbox"
+        indexes = [
+            # Reclamo de pendientes listos y de leases vencidos
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="outbox_claim_idx"),
+            IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="outbox_lease_idx"),
+            # Listado de fallidos para admin
+            IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="outbox_status_created_idx"),
+            IndexModel([("expires_at", ASCENDING)], name="outbox_ttl_idx", expireAfterSeconds=0),
+        ]
+
+
+class EmailOutboxSummary(BaseModel):
+    """Proyección de un email de la cola sin el contenido HTML (listados de admin)"""
+    id: PydanticObjectId = Field(alias="_id")
+    to_email: str
+    subject: str
+    kind: str
+    order_id: Optional[PydanticObjectId] = None
+    status: EmailOutboxStatus
+    attempts: int = 0
+    last_error: Optional[str] = None
+    attempt_log: List[EmailDeliveryAttempt] = Field(default_factory=list)
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+    class Settings:
+        projection = {"html_content": 0, "cc": 0}
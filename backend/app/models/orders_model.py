@@ -1,9 +1,9 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 from enum import Enum
 from beanie import Document, PydanticObjectId
 from pydantic import BaseModel, Field
-from pymongo import IndexModel, DESCENDING
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from app.models.user_model import Address
 
 
@@ -115,6 +115,10 @@ class Order(Document):
                 [("status", DESCENDING), ("created_at", DESCENDING)],
                 name="status_orders_idx"
             ),
+            IndexModel(
+                [("user_id", ASCENDING), ("items.product_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)],
+                name="user_product_orders_idx"
+            ),
             "wompi_transaction_id",
             "tracking_number"
         ]
@@ -137,6 +141,46 @@ class Order(Document):
         self.status = status
         self.updated_at = datetime.now(timezone.utc)
 
+    async def push_tracking_event(
+        self,
+        status: OrderStatus,
+        location: Optional[str] = None,
+        notes: Optional[str] = None,
+        updated_by: Optional[str] = None,
+        extra_fields: Optional[Dict[str, Any]] = None,
+        conditions: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Agrega un evento de tracking con un update parcial ($push/$set)
+        en lugar de reemplazar el documento completo.
+
+        - extra_fields: campos adicionales a actualizar en la misma operación
+        - conditions: filtros extra sobre la orden (ej: estado esperado)
+
+        Returns: False si la orden ya no cumple las condiciones
+        """
+        event = TrackingEvent(
+            status=status,
+            location=location,
+            notes=notes,
+            updated_by=updated_by
+        )
+        fields = {"status": status, "updated_at": event.timestamp}
+        if extra_fields:
+            fields.update(extra_fields)
+
+        result = await Order.find_one({"_id": self.id, **(conditions or {})}).update(
+            {"$push": {"tracking_history": event}, "$set": fields}
+        )
+        if result.matched_count == 0:
+            return False
+
+        # Reflejar el cambio en la instancia local
+        self.tracking_history.append(event)
+        for field, value in fields.items():
+            setattr(self, field, value)
+        return True
+
     def get_latest_tracking(self) -> Optional[TrackingEvent]:
         """Retorna el último evento de tracking"""
         if not self.tracking_history:
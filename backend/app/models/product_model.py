@@ -1,6 +1,6 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timezone
-from beanie import Document, Indexed
+from beanie import Document, Indexed, PydanticObjectId
 from pydantic import Field, BaseModel
 from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
 
@@ -19,6 +19,57 @@ class ProductVariant(BaseModel):
     is_available: bool = Field(default=True, description="Si la variante está disponible para venta")
 
 
+class ProductCategoryView(BaseModel):
+    """Proyección mínima de un producto: solo su categoría"""
+    id: PydanticObjectId = Field(alias="_id")
+    category: str
+
+
+class ProductReviewStats(BaseModel):
+    """Proyección de los agregados de reviews de un producto"""
+    id: PydanticObjectId = Field(alias="_id")
+    average_rating: float = 0
+    review_count: int = 0
+    rating_distribution: Dict[str, int] = Field(default_factory=dict)
+    verified_review_count: int = 0
+
+
+class VariantStockView(BaseModel):
+    """Proyección del stock de una variante"""
+    stock: int = 0
+    is_available: bool = True
+
+
+class ProductCardView(BaseModel):
+    """Proyección para tarjetas de producto (wishlist): datos básicos y stock"""
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    base_price: float
+    main_image: Optional[str] = None
+    is_active: bool = True
+    has_variants: bool = False
+    stock: Optional[int] = None
+    variants: List[VariantStockView] = Field(default_factory=list)
+
+    class Settings:
+        projection = {
+            "name": 1,
+            "base_price": 1,
+            "main_image": 1,
+            "is_active": 1,
+            "has_variants": 1,
+            "stock": 1,
+            "variants.stock": 1,
+            "variants.is_available": 1
+        }
+
+    @property
+    def in_stock(self) -> bool:
+        if self.has_variants:
+            return any(v.stock > 0 and v.is_available for v in self.variants)
+        return (self.stock or 0) > 0
+
+
 class Product(Document):
     """
     Modelo de producto mejorado con soporte para variantes
@@ -39,6 +90,9 @@ class Product(Document):
     sku: Optional[Indexed(str, unique=True)] = Field(None, description="SKU para producto simple")
     stock: Optional[int] = Field(None, ge=0, description="Stock para producto simple")
 
+    # Envío
+    weight_kg: Optional[float] = Field(None, ge=0, description="Peso para cálculo de envío")
+
     # Imágenes (múltiples imágenes soportadas)
     images: List[str] = Field(default_factory=list, description="URLs de imágenes del producto")
     main_image: Optional[str] = Field(None, description="Imagen principal (primera por defecto)")
@@ -50,6 +104,12 @@ class Product(Document):
     # Reviews (agregados)
     average_rating: float = Field(default=0, ge=0, le=5, description="Rating promedio")
     review_count: int = Field(default=0, ge=0, description="Cantidad de reviews")
+    rating_sum: int = Field(default=0, ge=0, description="Suma de calificaciones aprobadas")
+    rating_distribution: Dict[str, int] = Field(
+        default_factory=lambda: {str(stars): 0 for stars in range(1, 6)},
+        description="Reviews aprobadas por estrellas ('1' a '5')"
+    )
+    verified_review_count: int = Field(default=0, ge=0, description="Reviews aprobadas de compra verificada")
 
     # Metadata
     is_featured: bool = Field(default=False, description="Producto destacado")
@@ -75,6 +135,21 @@ class Product(Document):
                 [("is_featured", DESCENDING), ("created_at", DESCENDING)],
                 name="featured_idx"
             ),
+            # Catálogo: productos activos por fecha, precio o rating
+            IndexModel(
+                [("is_active", DESCENDING), ("created_at", DESCENDING)],
+                name="active_created_idx"
+            ),
+            IndexModel(
+                [("is_active", DESCENDING), ("base_price", ASCENDING)],
+                name="active_price_idx"
+            ),
+            IndexModel(
+                [("is_active", DESCENDING), ("average_rating", DESCENDING), ("review_count", DESCENDING)],
+                name="active_rating_idx"
+            ),
+            # Filtro por tags (multikey)
+            IndexModel([("tags", ASCENDING)], name="tags_idx"),
         ]
 
     def get_total_stock(self) -> int:
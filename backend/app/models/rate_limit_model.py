@@ -0,0 +1,22 @@
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+
+class RateLimitCounter(Document):
+    """
+    Contador de solicitudes de una clave en una ventana fija.
+
+    El _id es "<clave>:<índice de ventana>", así el upsert con $inc es
+    atómico entre workers. El índice TTL elimina las ventanas vencidas.
+    """
+    id: str = Field(..., alias="_id")
+    hits: int = Field(default=0, ge=0)
+    expires_at: datetime = Field(..., description="Momento en que el contador deja de ser útil")
+
+    class Settings:
+        name = "rate_limits"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], name="rate_limit_ttl_idx", expireAfterSeconds=0),
+        ]
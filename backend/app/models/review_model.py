@@ -2,7 +2,7 @@ from typing import Optional, List
 from datetime import datetime, timezone
 from beanie import Document, PydanticObjectId
 from pydantic import Field
-from pymongo import IndexModel, DESCENDING
+from pymongo import IndexModel, ASCENDING, DESCENDING
 
 
 class ProductReview(Document):
@@ -11,7 +11,7 @@ class ProductReview(Document):
     """
     product_id: PydanticObjectId = Field(..., description="ID del producto")
     user_id: PydanticObjectId = Field(..., description="ID del usuario")
-    order_id: PydanticObjectId = Field(..., description="ID de la orden (compra verificada)")
+    order_id: Optional[PydanticObjectId] = Field(None, description="ID de la orden (solo en compras verificadas)")
 
     # Rating y contenido
     rating: int = Field(..., ge=1, le=5, description="Calificación de 1 a 5 estrellas")
@@ -42,8 +42,47 @@ class ProductReview(Document):
                 [("product_id", DESCENDING), ("is_approved", DESCENDING), ("created_at", DESCENDING)],
                 name="product_reviews_idx"
             ),
+            IndexModel(
+                [("product_id", DESCENDING), ("is_approved", DESCENDING), ("helpful_count", DESCENDING), ("created_at", DESCENDING)],
+                name="product_reviews_helpful_idx"
+            ),
+            IndexModel(
+                [("product_id", DESCENDING), ("is_approved", DESCENDING), ("rating", DESCENDING), ("created_at", DESCENDING)],
+                name="product_reviews_rating_high_idx"
+            ),
+            IndexModel(
+                [("product_id", DESCENDING), ("is_approved", DESCENDING), ("rating", ASCENDING), ("created_at", DESCENDING)],
+                name="product_reviews_rating_low_idx"
+            ),
             IndexModel(
                 [("user_id", DESCENDING), ("created_at", DESCENDING)],
                 name="user_reviews_idx"
             ),
+            # Reviews pendientes de aprobación (admin)
+            IndexModel(
+                [("is_approved", DESCENDING), ("created_at", DESCENDING)],
+                name="pending_reviews_idx"
+            ),
+        ]
+
+
+class ReviewHelpfulVote(Document):
+    """
+    Voto 'útil' de un usuario sobre una review.
+
+    El índice único (review_id, user_id) garantiza un solo voto por usuario
+    aunque lleguen requests concurrentes.
+    """
+    review_id: PydanticObjectId = Field(..., description="ID de la review")
+    user_id: PydanticObjectId = Field(..., description="ID del usuario que votó")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "review_helpful_votes"
+        indexes = [
+            IndexModel(
+                [("review_id", ASCENDING), ("user_id", ASCENDING)],
+                name="review_user_vote_idx",
+                unique=True
+            ),
         ]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime, timezone
 from beanie import Document
 from pydantic import Field, BaseModel
@@ -21,6 +21,25 @@ class ShippingMethod(BaseModel):
     free_shipping_threshold: Optional[float] = Field(None, description="Monto para envío gratis")
     max_weight_kg: Optional[float] = Field(None, description="Peso máximo permitido")
 
+    # Cargo por peso
+    included_weight_kg: float = Field(default=0, ge=0, description="Peso incluido en el precio base")
+    price_per_extra_kg: float = Field(default=0, ge=0, description="Cargo por kg adicional")
+
+    def calculate_cost(self, subtotal: float, weight_kg: float = 0) -> Optional[float]:
+        """
+        Calcula el costo de envío aplicando las reglas de peso y monto.
+        Returns: None si el método no admite el peso indicado
+        """
+        if self.max_weight_kg is not None and weight_kg > self.max_weight_kg:
+            return None
+
+        # Verificar si aplica envío gratis
+        if self.free_shipping_threshold and subtotal >= self.free_shipping_threshold:
+            return 0.0
+
+        extra_kg = max(0.0, weight_kg - self.included_weight_kg)
+        return round(self.base_price + extra_kg * self.price_per_extra_kg, 2)
+
 
 class ShippingZone(Document):
     """
@@ -28,12 +47,20 @@ class ShippingZone(Document):
     """
     name: str = Field(..., description="Nombre de la zona (San Salvador, La Libertad)")
     department: str = Field(..., description="Departamento")
+    cities: List[str] = Field(
+        default_factory=list,
+        description="Ciudades/municipios de la zona (vacío = todo el departamento)"
+    )
     shipping_methods: list[ShippingMethod] = Field(default_factory=list)
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
         name = "shipping_zones"
+        indexes = [
+            "is_active"
+        ]
 
 
 # Métodos de envío predefinidos para El Salvador
@@ -1,7 +1,8 @@
-from beanie import Document
+from beanie import Document, PydanticObjectId
 from pydantic import EmailStr, BaseModel, Field
 from typing import Optional
 from datetime import datetime, timezone
+from pymongo import IndexModel, ASCENDING, DESCENDING
 
 
 class Address(BaseModel):
@@ -11,6 +12,13 @@ class Address(BaseModel):
     zip_code: Optional[str] = None
     country: str = "SV"
 
+class UserContactView(BaseModel):
+    """Proyección de un usuario para envío de emails"""
+    id: PydanticObjectId = Field(alias="_id")
+    email: str
+    first_name: str
+
+
 class User(Document):
     email: EmailStr = Field(unique=True)
     hashed_password: str
@@ -23,7 +31,24 @@ class User(Document):
     is_active: bool = True
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: Optional[datetime] = None
 
 
     class Settings:
         name = "users"  # nombre de la colección
+        indexes = [
+            # Login, registro y get_current_user buscan por email
+            IndexModel([("email", ASCENDING)], name="users_email_idx", unique=True),
+            # Listado de admin (paginado por created_at, _id), con o sin filtro de rol/estado
+            IndexModel(
+                [("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="users_created_idx"
+            ),
+            IndexModel(
+                [("role", ASCENDING), ("is_active", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="users_role_idx"
+            ),
+            # Búsqueda por prefijo de nombre/apellido (admin)
+            IndexModel([("first_name", ASCENDING)], name="users_first_name_idx"),
+            IndexModel([("last_name", ASCENDING)], name="users_last_name_idx"),
+        ]
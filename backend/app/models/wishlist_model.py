@@ -1,7 +1,15 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
+from enum import Enum
 from beanie import Document, PydanticObjectId, Indexed
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+
+class WishlistAlertKind(str, Enum):
+    """Tipos de aviso a usuarios con el producto en su wishlist"""
+    BACK_IN_STOCK = "BACK_IN_STOCK"
+    PRICE_DROP = "PRICE_DROP"
 
 
 class Wishlist(Document):
@@ -15,3 +23,31 @@ class Wishlist(Document):
 
     class Settings:
         name = "wishlists"
+        indexes = [
+            # Multikey: usuarios que tienen un producto en su wishlist
+            IndexModel([("products", ASCENDING)], name="wishlist_products_idx"),
+        ]
+
+
+class WishlistAlert(Document):
+    """
+    Último envío de un aviso de wishlist.
+
+    Con user_id registra el aviso a un usuario (deduplicación); sin
+    user_id registra la difusión del producto (throttling). El índice
+    único permite reclamar el envío de forma atómica.
+    """
+    product_id: PydanticObjectId = Field(..., description="ID del producto")
+    kind: WishlistAlertKind
+    user_id: Optional[PydanticObjectId] = Field(None, description="Usuario avisado (None = difusión del producto)")
+    sent_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "wishlist_alerts"
+        indexes = [
+            IndexModel(
+                [("product_id", ASCENDING), ("kind", ASCENDING), ("user_id", ASCENDING)],
+                name="wishlist_alert_idx",
+                unique=True
+            ),
+        ]
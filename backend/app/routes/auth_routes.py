@@ -1,29 +1,45 @@
 from fastapi import Depends, APIRouter, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from app.models.user_model import User
-from app.core.security import verify_password, create_access_context, get_password_hash
+from app.core.config import settings
+from app.core.rate_limit import rate_limit
+from app.core.security import (
+    verify_password_async,
+    create_access_context,
+    get_password_hash_async,
+    PasswordPoolBusyError
+)
 from app.schemas.user_schema import UserResponse, UserCreate
 from typing import Any
 import logging
 
 logger = logging.getLogger(__name__)
-limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter()
 
-@router.post("/login")
-@limiter.limit("5/minute")
+
+async def run_password_check(coro):
+    """Espera una operación bcrypt; 503 si el pool está saturado"""
+    try:
+        return await coro
+    except PasswordPoolBusyError:
+        logger.warning("Password hashing pool saturated, request rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos"
+        )
+
+
+@router.post("/login", dependencies=[Depends(rate_limit("login", settings.RATE_LIMIT_LOGIN))])
 async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     """
     Autenticación de usuario.
 
-    Rate limit: 5 intentos por minuto por IP.
+    Rate limit: RATE_LIMIT_LOGIN por IP (por defecto 5 intentos por minuto).
     """
     user = await User.find_one(User.email == form_data.username)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await run_password_check(verify_password_async(form_data.password, user.hashed_password)):
         logger.warning(f"Failed login attempt for email: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,7 +47,7 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
         )
 
     logger.info(f"User {user.email} logged in successfully")
-    access_token = create_access_context(subject=user.email)
+    access_token = create_access_context(subject=user.email, role=user.role, user_id=user.id)
 
     return {
         "access_token": access_token,
@@ -56,7 +72,7 @@ async def create_user(user: UserCreate):
             detail="Este correo ya está registrado"
         )
 
-    hashed_password = get_password_hash(password=user.password)
+    hashed_password = await run_password_check(get_password_hash_async(user.password))
     user_data = user.model_dump(exclude={"password"})
     user_data["hashed_password"] = hashed_password
 
@@ -89,7 +105,7 @@ async def create_admin_user(user: UserCreate):
         )
     
     # Crear usuario con rol admin
-    hashed_password = get_password_hash(password=user.password)
+    hashed_password = await run_password_check(get_password_hash_async(user.password))
     user_data = user.model_dump(exclude={"password"})
     user_data["hashed_password"] = hashed_password
     user_data["role"] = "admin"
@@ -1,20 +1,24 @@
 """
 Rutas para gestión de cupones de descuento
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from slowapi.util import get_remote_address
 from typing import List, Optional
 from datetime import datetime, timezone
 from beanie import PydanticObjectId
 
 from app.models.coupon_model import Coupon, DiscountType
+from app.models.product_model import Product, ProductCategoryView
 from app.models.user_model import User
 from app.core.dependencies import get_current_admin_user
+from app.services.coupon_service import coupon_service
 from app.schemas.coupon_schema import (
     CouponCreate,
     CouponUpdate,
     CouponResponse,
     CouponValidationRequest,
-    CouponValidationResponse
+    CouponValidationResponse,
+    CouponCartItem
 )
 
 router = APIRouter()
@@ -44,10 +48,32 @@ def coupon_to_response(coupon: Coupon) -> dict:
     }
 
 
+async def build_coupon_lines(coupon: Coupon, cart_items: List[CouponCartItem]) -> list[tuple[str, str, float]]:
+    """
+    Convierte las líneas del carrito en (product_id, categoría, subtotal).
+    Las categorías se cargan con una sola consulta $in, y solo si el cupón
+    restringe categorías.
+    """
+    categories = {}
+    if coupon.applicable_categories:
+        product_ids = {
+            PydanticObjectId(item.product_id)
+            for item in cart_items
+            if PydanticObjectId.is_valid(item.product_id)
+        }
+        products = await Product.find({"_id": {"$in": list(product_ids)}}).project(ProductCategoryView).to_list()
+        categories = {str(p.id): p.category for p in products}
+
+    return [
+        (item.product_id, categories.get(item.product_id, ""), item.price * item.quantity)
+        for item in cart_items
+    ]
+
+
 # ==================== ENDPOINTS PÚBLICOS ====================
 
 @router.post("/validate")
-async def validate_coupon(request: CouponValidationRequest):
+async def validate_coupon(validation: CouponValidationRequest, request: Request):
     """
     Valida un cupón y calcula el descuento (público).
 
@@ -55,10 +81,21 @@ async def validate_coupon(request: CouponValidationRequest):
     - Verifica fechas de validez
     - Verifica límites de uso
     - Calcula el descuento aplicable
+
+    Las búsquedas se sirven desde cache y los intentos se limitan por IP.
     """
-    coupon = await Coupon.find_one(Coupon.code == request.code.upper().strip())
+    client_ip = get_remote_address(request)
+
+    if not await coupon_service.allow_attempt(client_ip, validation.code):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos. Por favor, espera un momento."
+        )
+
+    coupon = await coupon_service.get_cached(validation.code)
 
     if not coupon:
+        await coupon_service.record_miss(client_ip)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cupón no encontrado"
@@ -73,15 +110,26 @@ async def validate_coupon(request: CouponValidationRequest):
         )
 
     # Verificar monto mínimo
-    if coupon.minimum_amount and request.subtotal < coupon.minimum_amount:
+    if coupon.minimum_amount and validation.subtotal < coupon.minimum_amount:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Compra mínima requerida: ${coupon.minimum_amount:.2f}"
         )
 
-    # Calcular descuento
-    discount_amount = coupon.calculate_discount(request.subtotal)
-    new_total = request.subtotal - discount_amount
+    # Calcular descuento sobre las líneas elegibles si se envió el carrito
+    discount_base = validation.subtotal
+    if validation.cart_items and coupon.has_line_restrictions():
+        lines = await build_coupon_lines(coupon, validation.cart_items)
+        discount_base = coupon.eligible_subtotal(lines)
+
+        if discount_base <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El cupón no aplica a los productos del carrito"
+            )
+
+    discount_amount = coupon.calculate_discount(discount_base)
+    new_total = validation.subtotal - discount_amount
 
     return {
         "valid": True,
@@ -138,6 +186,7 @@ async def create_coupon(
     )
 
     await coupon.create()
+    coupon_service.invalidate(coupon.code)
 
     return coupon_to_response(coupon)
 
@@ -206,11 +255,9 @@ async def update_coupon(
     # Actualizar campos proporcionados
     update_data = coupon_update.model_dump(exclude_unset=True)
 
-    for field, value in update_data.items():
-        setattr(coupon, field, value)
-
-    coupon.updated_at = datetime.now(timezone.utc)
-    await coupon.save()
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    await coupon.set(update_data)
+    coupon_service.invalidate(coupon.code)
 
     return coupon_to_response(coupon)
 
@@ -232,6 +279,7 @@ async def delete_coupon(
         )
 
     await coupon.delete()
+    coupon_service.invalidate(coupon.code)
 
 
 @router.post("/{code}/deactivate")
@@ -250,8 +298,10 @@ async def deactivate_coupon(
             detail="Cupón no encontrado"
         )
 
-    coupon.is_active = False
-    coupon.updated_at = datetime.now(timezone.utc)
-    await coupon.save()
+    await coupon.set({
+        Coupon.is_active: False,
+        Coupon.updated_at: datetime.now(timezone.utc)
+    })
+    coupon_service.invalidate(coupon.code)
 
     return coupon_to_response(coupon)
@@ -0,0 +1,190 @@
+"""
+Rutas de administración de la cola de emails
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+from beanie import PydanticObjectId
+
+from app.models.broadcast_model import EmailBroadcast
+from app.models.email_outbox_model import EmailOutboxSummary
+from app.models.user_model import User
+from app.core.dependencies import get_current_admin_user
+from app.schemas.broadcast_schema import BroadcastCreate
+from app.services.broadcast_service import broadcast_service
+from app.services.email_outbox import email_outbox
+
+router = APIRouter()
+
+
+def outbox_message_to_response(message: EmailOutboxSummary) -> dict:
+    """Convierte un email de la cola a respuesta con ids como string"""
+    data = message.model_dump(mode="json", exclude={"id", "order_id"})
+    data["id"] = str(message.id)
+    data["order_id"] = str(message.order_id) if message.order_id else None
+    return data
+
+
+def broadcast_to_response(broadcast: EmailBroadcast) -> dict:
+    """Convierte un envío masivo a respuesta (sin el contenido HTML)"""
+    data = broadcast.model_dump(mode="json", exclude={"id", "resume_after", "html_content", "lease_owner", "lease_until"})
+    data["id"] = str(broadcast.id)
+    data["resume_after"] = str(broadcast.resume_after) if broadcast.resume_after else None
+    return data
+
+
+async def get_broadcast_or_404(broadcast_id: PydanticObjectId) -> EmailBroadcast:
+    broadcast = await EmailBroadcast.get(broadcast_id)
+    if not broadcast:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Envío masivo no encontrado"
+        )
+    return broadcast
+
+
+@router.get("/stats")
+async def get_email_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Métricas de la cola de emails (solo admin): emails por estado, envíos,
+    fallos, reintentos y latencia de entrega de esta instancia.
+    """
+    return await email_outbox.stats()
+
+
+@router.get("/failed")
+async def list_failed_emails(
+    kind: Optional[str] = Query(None, description="Filtrar por tipo de email"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Lista los emails que fallaron definitivamente, con sus intentos (solo admin).
+    """
+    messages = await email_outbox.list_failed(kind=kind, skip=skip, limit=limit)
+    return [outbox_message_to_response(m) for m in messages]
+
+
+@router.post("/failed/replay")
+async def replay_failed_emails(
+    kind: Optional[str] = Query(None, description="Reenviar solo este tipo de email"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Vuelve a poner en cola todos los emails fallidos (solo admin).
+    """
+    count = await email_outbox.replay_failed(kind=kind)
+    return {"replayed": count}
+
+
+@router.post("/{message_id}/replay")
+async def replay_email(
+    message_id: PydanticObjectId,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Vuelve a poner en cola un email fallido (solo admin).
+    """
+    if not await email_outbox.replay(message_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email fallido no encontrado"
+        )
+
+    return {"replayed": 1}
+
+
+# ==================== ENVÍOS MASIVOS ====================
+
+@router.post("/broadcasts", status_code=status.HTTP_201_CREATED)
+async def create_broadcast(
+    broadcast_in: BroadcastCreate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Crea un envío masivo de marketing y, por defecto, lo inicia (solo admin).
+
+    Se envía por lotes de hasta 1000 destinatarios por llamada a SendGrid,
+    al ritmo configurado. -first_name- se reemplaza por destinatario.
+    """
+    broadcast = await broadcast_service.create(broadcast_in, created_by=current_user.email)
+    return broadcast_to_response(broadcast)
+
+
+@router.get("/broadcasts")
+async def list_broadcasts(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Lista los envíos masivos, los más recientes primero (solo admin).
+    """
+    broadcasts = await EmailBroadcast.find_all().sort("-created_at").skip(skip).limit(limit).to_list()
+    return [broadcast_to_response(b) for b in broadcasts]
+
+
+@router.get("/broadcasts/{broadcast_id}")
+async def get_broadcast(
+    broadcast_id: PydanticObjectId,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Progreso de un envío masivo, con los destinatarios restantes (solo admin).
+    """
+    broadcast = await get_broadcast_or_404(broadcast_id)
+    response = broadcast_to_response(broadcast)
+    response["remaining_recipients"] = await broadcast_service.remaining_recipients(broadcast)
+    return response
+
+
+@router.post("/broadcasts/{broadcast_id}/pause")
+async def pause_broadcast(
+    broadcast_id: PydanticObjectId,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Pausa un envío masivo; se detiene al terminar el lote en curso (solo admin).
+    """
+    await get_broadcast_or_404(broadcast_id)
+    if not await broadcast_service.pause(broadcast_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El envío no está pendiente ni en curso"
+        )
+    return broadcast_to_response(await EmailBroadcast.get(broadcast_id))
+
+
+@router.post("/broadcasts/{broadcast_id}/resume")
+async def resume_broadcast(
+    broadcast_id: PydanticObjectId,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Inicia o reanuda un envío masivo desde el último lote enviado (solo admin).
+    """
+    await get_broadcast_or_404(broadcast_id)
+    broadcast = await broadcast_service.start(broadcast_id)
+    if not broadcast:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El envío ya está en curso, completado o cancelado"
+        )
+    return broadcast_to_response(broadcast)
+
+
+@router.post("/broadcasts/{broadcast_id}/cancel")
+async def cancel_broadcast(
+    broadcast_id: PydanticObjectId,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Cancela un envío masivo (solo admin).
+    """
+    await get_broadcast_or_404(broadcast_id)
+    if not await broadcast_service.cancel(broadcast_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El envío ya terminó o fue cancelado"
+        )
+    return broadcast_to_response(await EmailBroadcast.get(broadcast_id))
@@ -1,7 +1,7 @@
 """
 Rutas para gestión de órdenes de compra
 """
-from fastapi import HTTPException, APIRouter, status, Depends, Query, BackgroundTasks
+from fastapi import HTTPException, APIRouter, status, Depends, Query
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 from beanie import PydanticObjectId
@@ -9,47 +9,146 @@ from beanie import PydanticObjectId
 from app.models.user_model import User
 from app.models.product_model import Product
 from app.models.orders_model import Order, OrderItem, OrderStatus, PaymentMethod
-from app.models.coupon_model import Coupon
-from app.models.shipping_model import DEFAULT_SHIPPING_METHODS
 from app.schemas.order_schema import (
     OrderCreate,
     OrderResponse,
     OrderStatusUpdate,
     ShippingUpdate,
-    PaymentLinkResponse
+    PaymentLinkResponse,
+    OrderQuoteRequest,
+    OrderQuoteResponse,
+    OrderQuoteLine
 )
 from app.core.dependencies import get_current_user, get_current_admin_user
+from app.core.config import settings
+from app.core.rate_limit import rate_limit
 from app.services.wompi_service import wompi_service
 from app.services.email_service import email_service
+from app.services.coupon_service import coupon_service
+from app.services.pricing_service import pricing_service
 
 router = APIRouter()
 
 
-def get_shipping_method(method_id: str):
-    """Obtiene un método de envío por su ID"""
-    return DEFAULT_SHIPPING_METHODS.get(method_id)
+def resolve_shipping_address(shipping_address, current_user: User):
+    """Dirección de envío del request o, en su defecto, la del perfil"""
+    if shipping_address:
+        return shipping_address
+    if current_user.address:
+        return current_user.address
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Se requiere una dirección de envío"
+    )
+
+
+async def decrement_stock(
+    product_id: PydanticObjectId,
+    quantity: int,
+    variant_sku: Optional[str] = None
+) -> bool:
+    """
+    Descuenta stock con un $inc condicional (variante o producto simple).
+    Solo descuenta de productos activos.
+    Returns: False si no había stock suficiente o el producto se desactivó
+    """
+    if variant_sku:
+        result = await Product.find_one({
+            "_id": product_id,
+            "is_active": True,
+            "variants": {"$elemMatch": {"sku": variant_sku, "stock": {"$gte": quantity}}}
+        }).update({"$inc": {"variants.$.stock": -quantity}})
+    else:
+        result = await Product.find_one(
+            Product.id == product_id,
+            Product.is_active == True,
+            Product.stock >= quantity
+        ).update({"$inc": {"stock": -quantity}})
+
+    return result.modified_count > 0
+
+
+async def restore_stock(items: List[OrderItem]):
+    """Devuelve al inventario el stock de los items de una orden"""
+    for item in items:
+        if item.variant_sku:
+            await Product.find_one({"_id": item.product_id, "variants.sku": item.variant_sku}).update(
+                {"$inc": {"variants.$.stock": item.quantity}}
+            )
+        else:
+            await Product.find_one(Product.id == item.product_id).update(
+                {"$inc": {"stock": item.quantity}}
+            )
 
 
-def calculate_shipping_cost(method_id: str, subtotal: float) -> tuple[float, str]:
+@router.post("/quote", response_model=OrderQuoteResponse)
+async def quote_order(
+    quote_in: OrderQuoteRequest,
+    current_user: User = Depends(get_current_user)
+):
     """
-    Calcula el costo de envío.
-    Returns: (costo, nombre del método)
+    Cotiza un carrito sin crear la orden ni tocar el inventario.
+
+    - Carga todos los productos en una sola consulta
+    - Aplica ajustes de variantes, cupón y envío con la misma lógica que create_order
+    - Indica la disponibilidad de stock por línea
+    - Retorna un token firmado de vida corta que create_order acepta sin recalcular
     """
-    method = get_shipping_method(method_id)
-    if not method:
-        return (0.0, "Envío estándar")
+    final_address = resolve_shipping_address(quote_in.shipping_address, current_user)
+
+    priced = await pricing_service.price_cart(
+        quote_in.items,
+        final_address,
+        shipping_method_id=quote_in.shipping_method_id,
+        coupon_code=quote_in.coupon_code,
+        require_stock=False
+    )
 
-    # Verificar si aplica envío gratis
-    if method.free_shipping_threshold and subtotal >= method.free_shipping_threshold:
-        return (0.0, method.name)
+    # Solo se firma una cotización que puede convertirse en orden
+    quote_token = None
+    expires_at = None
+    if priced.all_in_stock:
+        quote_token, expires_at = pricing_service.create_quote_token(
+            priced,
+            current_user.id,
+            quote_in.items,
+            final_address,
+            quote_in.shipping_method_id,
+            quote_in.coupon_code
+        )
 
-    return (method.base_price, method.name)
+    return OrderQuoteResponse(
+        lines=[
+            OrderQuoteLine(
+                **line.item.model_dump(),
+                line_total=round(line.item.subtotal, 2),
+                available_stock=line.available_stock,
+                in_stock=line.in_stock
+            )
+            for line in priced.lines
+        ],
+        subtotal=priced.subtotal,
+        discount_amount=priced.discount_amount,
+        shipping_cost=priced.shipping_cost,
+        total_amount=priced.total_amount,
+        coupon_code=priced.coupon_code,
+        coupon_message=priced.coupon_message,
+        shipping_method_id=priced.shipping_method_id,
+        shipping_method_name=priced.shipping_method_name,
+        all_in_stock=priced.all_in_stock,
+        quote_token=quote_token,
+        expires_at=expires_at
+    )
 
 
-@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=OrderResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("order_create", settings.RATE_LIMIT_ORDER_CREATE))]
+)
 async def create_order(
     order_in: OrderCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -60,154 +159,93 @@ async def create_order(
     - Calcula costo de envío
     - Descuenta del inventario de forma atómica
     - Envía email de confirmación
+
+    Si se envía un quote_token vigente de /orders/quote para el mismo
+    carrito, se usan sus precios sin recalcular.
     """
-    final_items = []
-    subtotal = 0.0
-
-    # Validar dirección
-    if order_in.shipping_address:
-        final_address = order_in.shipping_address
-    elif current_user.address:
-        final_address = current_user.address
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Se requiere una dirección de envío"
+    final_address = resolve_shipping_address(order_in.shipping_address, current_user)
+
+    priced = None
+    if order_in.quote_token:
+        priced = pricing_service.read_quote_token(
+            order_in.quote_token,
+            current_user.id,
+            order_in.items,
+            final_address,
+            order_in.shipping_method_id,
+            order_in.coupon_code
         )
 
-    # Validar todos los productos y stock
-    for item_in in order_in.items:
-        product = await Product.get(item_in.product_id)
-
-        if not product or not product.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Producto con ID: {item_in.product_id} no encontrado o no disponible"
-            )
-
-        # Determinar precio y stock según si tiene variantes
-        if product.has_variants and item_in.variant_sku:
-            variant = product.get_variant_by_sku(item_in.variant_sku)
-            if not variant:
+    # La cotización fija precios, no disponibilidad: un producto desactivado
+    # después de cotizar ya no se puede ordenar
+    if priced is not None:
+        products = await pricing_service.load_products(order_in.items)
+        for item in order_in.items:
+            product = products.get(item.product_id)
+            if not product or not product.is_active:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Variante '{item_in.variant_sku}' no encontrada para '{product.name}'"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Producto con ID: {item.product_id} no encontrado o no disponible"
                 )
 
-            if not variant.is_available or variant.stock < item_in.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente para '{product.name}' ({variant.size}/{variant.color}). Disponibles: {variant.stock}"
-                )
-
-            item_price = product.base_price + variant.price_adjustment
-            variant_info = f"{variant.size or ''} {variant.color or ''}".strip()
-
-            new_item = OrderItem(
-                product_id=product.id,
-                product_name=product.name,
-                quantity=item_in.quantity,
-                price=item_price,
-                variant_sku=variant.sku,
-                variant_info=variant_info if variant_info else None,
-                product_image=variant.image_url or product.main_image
-            )
-
-        else:
-            # Producto simple sin variantes
-            stock = product.stock or 0
-            if stock < item_in.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuficiente para '{product.name}'. Disponibles: {stock}"
-                )
-
-            new_item = OrderItem(
-                product_id=product.id,
-                product_name=product.name,
-                quantity=item_in.quantity,
-                price=product.base_price,
-                product_image=product.main_image
-            )
-
-        final_items.append(new_item)
-        subtotal += new_item.price * new_item.quantity
-
-    # Calcular envío
-    shipping_method_id = order_in.shipping_method_id or "standard_ss"
-    shipping_cost, shipping_method_name = calculate_shipping_cost(shipping_method_id, subtotal)
-
-    # Aplicar cupón si se proporciona
-    discount_amount = 0.0
-    coupon_code = None
-    coupon_discount_type = None
-    coupon_discount_value = None
+    if priced is None:
+        priced = await pricing_service.price_cart(
+            order_in.items,
+            final_address,
+            shipping_method_id=order_in.shipping_method_id,
+            coupon_code=order_in.coupon_code
+        )
 
-    if order_in.coupon_code:
-        coupon = await Coupon.find_one(Coupon.code == order_in.coupon_code.upper().strip())
+    final_items = priced.items
 
-        if coupon:
-            is_valid, error_msg = coupon.is_valid()
+    # ID asignado por adelantado para registrar la redención del cupón
+    order_id = PydanticObjectId()
 
-            if is_valid:
-                if not coupon.minimum_amount or subtotal >= coupon.minimum_amount:
-                    discount_amount = coupon.calculate_discount(subtotal)
-                    coupon_code = coupon.code
-                    coupon_discount_type = coupon.discount_type.value
-                    coupon_discount_value = coupon.discount_value
+    # Redimir el cupón de forma atómica (límite global y por usuario)
+    if priced.coupon_code:
+        coupon = await coupon_service.get_cached(priced.coupon_code)
+        is_valid, error_msg = coupon.is_valid() if coupon else (False, "Cupón no encontrado")
 
-                    # Incrementar uso del cupón
-                    coupon.current_uses += 1
-                    await coupon.save()
+        if is_valid:
+            is_valid, error_msg = await coupon_service.redeem(coupon, current_user.id, order_id)
 
-    # Calcular total
-    total_amount = subtotal - discount_amount + shipping_cost
+        if not is_valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_msg
+            )
 
     # Actualizar stock de forma atómica
-    for item_in in order_in.items:
-        product = await Product.get(item_in.product_id)
-
-        if product.has_variants and item_in.variant_sku:
-            # Actualizar stock de variante
-            for i, v in enumerate(product.variants):
-                if v.sku == item_in.variant_sku:
-                    product.variants[i].stock -= item_in.quantity
-                    break
-            await product.save()
-        else:
-            # Actualización atómica para producto simple
-            result = await Product.find_one(
-                Product.id == item_in.product_id,
-                Product.stock >= item_in.quantity
-            ).update({"$inc": {"stock": -item_in.quantity}})
-
-            if not result:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="El stock cambió durante la transacción. Por favor, intenta de nuevo."
-                )
+    for i, item in enumerate(final_items):
+        if not await decrement_stock(item.product_id, item.quantity, item.variant_sku):
+            # Revertir lo ya descontado y el uso del cupón
+            await restore_stock(final_items[:i])
+            if priced.coupon_code:
+                await coupon_service.release(order_id)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El stock cambió durante la transacción. Por favor, intenta de nuevo."
+            )
 
     # Estimar fecha de entrega
-    shipping_method = get_shipping_method(shipping_method_id)
-    estimated_delivery = None
-    if shipping_method:
-        estimated_delivery = datetime.now(timezone.utc) + timedelta(days=shipping_method.estimated_days_max)
+    estimated_delivery = datetime.now(timezone.utc) + timedelta(days=priced.estimated_days_max)
 
     # Crear orden
     new_order = Order(
+        id=order_id,
         user_id=current_user.id,
         user_email=current_user.email,
         items=final_items,
-        subtotal=round(subtotal, 2),
-        discount_amount=round(discount_amount, 2),
-        shipping_cost=round(shipping_cost, 2),
-        total_amount=round(total_amount, 2),
-        coupon_code=coupon_code,
-        coupon_discount_type=coupon_discount_type,
-        coupon_discount_value=coupon_discount_value,
+        subtotal=priced.subtotal,
+        discount_amount=priced.discount_amount,
+        shipping_cost=priced.shipping_cost,
+        total_amount=priced.total_amount,
+        coupon_code=priced.coupon_code,
+        coupon_discount_type=priced.coupon_discount_type,
+        coupon_discount_value=priced.coupon_discount_value,
         shipping_address=final_address,
-        shipping_method_id=shipping_method_id,
-        shipping_method_name=shipping_method_name,
+        shipping_method_id=priced.shipping_method_id,
+        shipping_method_name=priced.shipping_method_name,
         estimated_delivery=estimated_delivery,
         customer_notes=order_in.customer_notes,
         status=OrderStatus.PENDING
@@ -222,12 +260,8 @@ async def create_order(
 
     await new_order.create()
 
-    # Enviar email de confirmación de orden en background
-    background_tasks.add_task(
-        email_service.send_order_confirmation,
-        new_order,
-        current_user.first_name
-    )
+    # Encolar email de confirmación de orden (lo envían los workers de la cola)
+    await email_service.send_order_confirmation(new_order, current_user.first_name)
 
     return new_order
 
@@ -273,9 +307,10 @@ async def create_payment_link(
         )
 
         # Guardar link en la orden
-        order.wompi_payment_link = result["payment_link"]
-        order.payment_method = PaymentMethod.WOMPI_CARD
-        await order.save()
+        await order.set({
+            Order.wompi_payment_link: result["payment_link"],
+            Order.payment_method: PaymentMethod.WOMPI_CARD
+        })
 
         return PaymentLinkResponse(
             order_id=str(order.id),
@@ -361,41 +396,34 @@ async def cancel_order(
             detail="No tienes permiso para cancelar esta orden"
         )
 
-    if order.status not in [OrderStatus.PENDING, OrderStatus.FAILED]:
+    cancellable_statuses = [OrderStatus.PENDING, OrderStatus.FAILED]
+
+    if order.status not in cancellable_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Solo se pueden cancelar órdenes pendientes o fallidas"
         )
 
-    # Restaurar stock
-    for item in order.items:
-        product = await Product.get(item.product_id)
-        if product:
-            if item.variant_sku and product.has_variants:
-                for i, v in enumerate(product.variants):
-                    if v.sku == item.variant_sku:
-                        product.variants[i].stock += item.quantity
-                        break
-                await product.save()
-            else:
-                await Product.find_one(Product.id == item.product_id).update(
-                    {"$inc": {"stock": item.quantity}}
-                )
-
-    # Restaurar uso de cupón si se usó
-    if order.coupon_code:
-        coupon = await Coupon.find_one(Coupon.code == order.coupon_code)
-        if coupon and coupon.current_uses > 0:
-            coupon.current_uses -= 1
-            await coupon.save()
-
-    order.add_tracking_event(
+    # Transición condicional: una cancelación concurrente no restaura dos veces
+    cancelled = await order.push_tracking_event(
         status=OrderStatus.CANCELLED,
         notes="Orden cancelada por el usuario",
-        updated_by=current_user.email
+        updated_by=current_user.email,
+        conditions={"status": {"$in": [s.value for s in cancellable_statuses]}}
     )
 
-    await order.save()
+    if not cancelled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Solo se pueden cancelar órdenes pendientes o fallidas"
+        )
+
+    # Restaurar stock
+    await restore_stock(order.items)
+
+    # Liberar uso de cupón si se usó
+    if order.coupon_code:
+        await coupon_service.release(order.id, order.coupon_code)
 
     return order
 
@@ -426,7 +454,6 @@ async def get_all_orders(
 async def update_order_status(
     order_id: str,
     status_update: OrderStatusUpdate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_admin_user)
 ):
     """
@@ -442,25 +469,26 @@ async def update_order_status(
 
     old_status = order.status
 
-    order.add_tracking_event(
+    # Solo aplica si nadie cambió el estado desde que se leyó la orden
+    updated = await order.push_tracking_event(
         status=status_update.status,
         location=status_update.location,
         notes=status_update.notes,
-        updated_by=current_user.email
+        updated_by=current_user.email,
+        conditions={"status": old_status.value}
     )
 
-    await order.save()
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La orden fue modificada por otra operación. Por favor, intenta de nuevo."
+        )
 
     # Enviar notificación de envío si cambió a SHIPPED
     if status_update.status == OrderStatus.SHIPPED and old_status != OrderStatus.SHIPPED:
         user = await User.get(order.user_id)
         if user:
-            background_tasks.add_task(
-                email_service.send_shipping_notification,
-                order,
-                user.first_name,
-                None  # tracking_url
-            )
+            await email_service.send_shipping_notification(order, user.first_name, None)  # tracking_url
 
     return order
 
@@ -482,15 +510,17 @@ async def update_shipping_info(
             detail="Orden no encontrada"
         )
 
+    # Solo se envían los campos proporcionados
+    changes = {}
     if shipping_update.tracking_number:
-        order.tracking_number = shipping_update.tracking_number
+        changes[Order.tracking_number] = shipping_update.tracking_number
     if shipping_update.carrier:
-        order.carrier = shipping_update.carrier
+        changes[Order.carrier] = shipping_update.carrier
     if shipping_update.estimated_delivery:
-        order.estimated_delivery = shipping_update.estimated_delivery
+        changes[Order.estimated_delivery] = shipping_update.estimated_delivery
 
-    order.updated_at = datetime.now(timezone.utc)
-    await order.save()
+    changes[Order.updated_at] = datetime.now(timezone.utc)
+    await order.set(changes)
 
     return order
 
@@ -512,34 +542,31 @@ async def refund_order(
             detail="Orden no encontrada"
         )
 
-    if order.status == OrderStatus.REFUNDED:
+    # Las canceladas ya devolvieron su stock al cancelarse
+    non_refundable_statuses = [OrderStatus.REFUNDED, OrderStatus.CANCELLED]
+
+    if order.status in non_refundable_statuses:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La orden ya fue reembolsada"
+            detail="La orden ya fue reembolsada o cancelada"
         )
 
-    # Restaurar stock
-    for item in order.items:
-        product = await Product.get(item.product_id)
-        if product:
-            if item.variant_sku and product.has_variants:
-                for i, v in enumerate(product.variants):
-                    if v.sku == item.variant_sku:
-                        product.variants[i].stock += item.quantity
-                        break
-                await product.save()
-            else:
-                await Product.find_one(Product.id == item.product_id).update(
-                    {"$inc": {"stock": item.quantity}}
-                )
-
-    order.add_tracking_event(
+    # Transición condicional: un reembolso concurrente no restaura dos veces
+    refunded = await order.push_tracking_event(
         status=OrderStatus.REFUNDED,
         notes=f"Reembolso: {notes}",
-        updated_by=current_user.email
+        updated_by=current_user.email,
+        conditions={"status": {"$nin": [s.value for s in non_refundable_statuses]}}
     )
 
-    await order.save()
+    if not refunded:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La orden ya fue reembolsada o cancelada"
+        )
+
+    # Restaurar stock
+    await restore_stock(order.items)
 
     return order
 
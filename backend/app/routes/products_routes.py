@@ -1,15 +1,20 @@
 """
 Rutas para gestion de productos
 """
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, BackgroundTasks, Request
 from typing import List, Optional
 from datetime import datetime, timezone
-from beanie import PydanticObjectId
+from beanie import PydanticObjectId, UpdateResponse
 
 from app.models.user_model import User
 from app.models.product_model import Product, ProductVariant
 from app.schemas.product_schema import ProductCreate, ProductUpdate, ProductVariantSchema
 from app.core.dependencies import get_current_admin_user
+from app.core.config import settings
+from app.core import rate_limit
+from app.core.rate_limit import parse_rate
+from slowapi.util import get_remote_address
+from app.services.wishlist_alert_service import wishlist_alert_service
 
 router = APIRouter()
 
@@ -40,6 +45,7 @@ def product_to_response(product: Product) -> dict:
         "variants": variants_list,
         "sku": product.sku,
         "stock": product.stock,
+        "weight_kg": product.weight_kg,
         "images": product.images,
         "main_image": product.main_image or (product.images[0] if product.images else None),
         "tags": product.tags,
@@ -58,6 +64,7 @@ def product_to_response(product: Product) -> dict:
 
 @router.get("/")
 async def get_products(
+    request: Request,
     category: Optional[str] = Query(None, description="Filtrar por categoria"),
     search: Optional[str] = Query(None, description="Buscar por nombre"),
     min_price: Optional[float] = Query(None, ge=0, description="Precio minimo"),
@@ -88,6 +95,15 @@ async def get_products(
             products.append(product_to_response(prod))
         return products
 
+    # Las búsquedas por texto son costosas: se limitan por IP
+    if search:
+        limit_count, window_seconds = parse_rate(settings.RATE_LIMIT_SEARCH)
+        if not await rate_limit.rate_limiter.hit(f"search:{get_remote_address(request)}", limit_count, window_seconds):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas solicitudes. Por favor, espera un momento."
+            )
+
     # Construir query
     filters = {"is_active": True}
 
@@ -304,6 +320,7 @@ async def create_product(
 async def update_product(
     product_id: str,
     product_update: ProductUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_admin_user)
 ):
     """
@@ -334,11 +351,18 @@ async def update_product(
             ProductVariant(**v) for v in update_data["variants"]
         ]
 
-    for field, value in update_data.items():
-        setattr(product, field, value)
+    old_price = product.base_price
+    old_stock = product.get_total_stock()
+
+    # $set solo con los campos modificados
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    await product.set(update_data)
 
-    product.updated_at = datetime.now(timezone.utc)
-    await product.save()
+    # Avisos de wishlist (en segundo plano)
+    if product.base_price < old_price:
+        background_tasks.add_task(wishlist_alert_service.notify_price_drop, product.id, old_price)
+    if old_stock == 0 and product.get_total_stock() > 0:
+        background_tasks.add_task(wishlist_alert_service.notify_back_in_stock, product.id)
 
     return product_to_response(product)
 
@@ -378,9 +402,10 @@ async def deactivate_product(
             detail="Producto no encontrado"
         )
 
-    product.is_active = False
-    product.updated_at = datetime.now(timezone.utc)
-    await product.save()
+    await product.set({
+        Product.is_active: False,
+        Product.updated_at: datetime.now(timezone.utc)
+    })
 
     return product_to_response(product)
 
@@ -401,9 +426,10 @@ async def activate_product(
             detail="Producto no encontrado"
         )
 
-    product.is_active = True
-    product.updated_at = datetime.now(timezone.utc)
-    await product.save()
+    await product.set({
+        Product.is_active: True,
+        Product.updated_at: datetime.now(timezone.utc)
+    })
 
     return product_to_response(product)
 
@@ -412,6 +438,7 @@ async def activate_product(
 async def update_variant_stock(
     product_id: str,
     variant_sku: str,
+    background_tasks: BackgroundTasks,
     stock: int = Query(..., ge=0),
     current_user: User = Depends(get_current_admin_user)
 ):
@@ -426,20 +453,21 @@ async def update_variant_stock(
             detail="Producto no encontrado"
         )
 
-    variant_found = False
-    for i, v in enumerate(product.variants):
-        if v.sku == variant_sku:
-            product.variants[i].stock = stock
-            variant_found = True
-            break
+    # Actualizar solo el stock de la variante con el operador posicional
+    previous = await Product.find_one({"_id": product.id, "variants.sku": variant_sku}).update(
+        {"$set": {"variants.$.stock": stock, "updated_at": datetime.now(timezone.utc)}},
+        response_type=UpdateResponse.OLD_DOCUMENT
+    )
 
-    if not variant_found:
+    if not previous:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Variante no encontrada"
         )
 
-    product.updated_at = datetime.now(timezone.utc)
-    await product.save()
+    # Variante que vuelve a tener stock: avisar a quienes la tienen en su wishlist
+    previous_variant = previous.get_variant_by_sku(variant_sku)
+    if previous_variant.stock == 0 and stock > 0 and previous_variant.is_available:
+        background_tasks.add_task(wishlist_alert_service.notify_back_in_stock, product.id)
 
     return {"success": True, "sku": variant_sku, "new_stock": stock}
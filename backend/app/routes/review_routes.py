@@ -2,15 +2,17 @@
 Rutas para gestión de reviews de productos
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime, timezone
-from beanie import PydanticObjectId
+from beanie import PydanticObjectId, UpdateResponse
+from pymongo.errors import DuplicateKeyError
 
-from app.models.review_model import ProductReview
-from app.models.product_model import Product
+from app.models.review_model import ProductReview, ReviewHelpfulVote
+from app.models.product_model import Product, ProductReviewStats
 from app.models.orders_model import Order, OrderStatus
 from app.models.user_model import User
 from app.core.dependencies import get_current_user, get_current_admin_user
+from app.services.review_service import review_service
 from app.schemas.review_schema import (
     ReviewCreate,
     ReviewUpdate,
@@ -20,25 +22,125 @@ from app.schemas.review_schema import (
 
 router = APIRouter()
 
+# Máximo de productos por consulta de resúmenes en lote
+REVIEW_SUMMARY_BATCH_MAX = 100
 
-async def update_product_rating(product_id: PydanticObjectId):
-    """Actualiza el rating promedio de un producto"""
-    reviews = await ProductReview.find(
-        ProductReview.product_id == product_id,
-        ProductReview.is_approved == True
-    ).to_list()
 
-    if reviews:
-        avg_rating = sum(r.rating for r in reviews) / len(reviews)
-        product = await Product.get(product_id)
-        if product:
-            product.average_rating = round(avg_rating, 2)
-            product.review_count = len(reviews)
-            await product.save()
+async def adjust_product_rating(
+    product_id: PydanticObjectId,
+    rating_deltas: Dict[int, int],
+    verified_delta: int = 0
+):
+    """
+    Ajusta los agregados de rating del producto en un solo update atómico.
+
+    rating_deltas: {estrellas: cambio}, ej. {5: 1} al aprobar una review de
+    5 estrellas o {3: -1, 5: 1} al cambiar su calificación de 3 a 5.
+    verified_delta: cambio en la cantidad de reviews de compra verificada.
+    El promedio se recalcula en el mismo update (0 si no quedan reviews).
+
+    Los contadores no bajan de 0: productos anteriores a los agregados
+    (o con contadores desfasados) no quedan con valores negativos que
+    el modelo rechazaría al leerlos. scripts/recompute_ratings.py los
+    recalcula desde las reviews.
+    """
+    rating_deltas = {stars: delta for stars, delta in rating_deltas.items() if delta}
+    if not rating_deltas and not verified_delta:
+        return
+
+    increments = {
+        "review_count": sum(rating_deltas.values()),
+        "rating_sum": sum(stars * delta for stars, delta in rating_deltas.items()),
+        "verified_review_count": verified_delta
+    }
+    for stars, delta in rating_deltas.items():
+        increments[f"rating_distribution.{stars}"] = delta
+
+    pipeline = [
+        {"$set": {
+            field: {"$max": [0, {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}]}
+            for field, delta in increments.items()
+        }},
+        {"$set": {
+            "average_rating": {
+                "$cond": [
+                    {"$gt": ["$review_count", 0]},
+                    {"$min": [5, {"$round": [{"$divide": ["$rating_sum", "$review_count"]}, 2]}]},
+                    0
+                ]
+            }
+        }}
+    ]
+
+    await Product.get_pymongo_collection().update_one({"_id": product_id}, pipeline)
+
+
+async def find_verified_purchase(user_id: PydanticObjectId, product_id: PydanticObjectId) -> Optional[dict]:
+    """
+    Busca la orden enviada/entregada más reciente del usuario que contiene
+    el producto. Una sola consulta sobre user_product_orders_idx, que
+    también resuelve el orden por created_at sin un sort en memoria; la
+    proyección $elemMatch trae solo el item del producto.
+
+    Returns: {"_id": ..., "items": [item]} o None
+    """
+    return await Order.get_pymongo_collection().find_one(
+        {
+            "user_id": user_id,
+            "items.product_id": product_id,
+            "status": {"$in": [OrderStatus.SHIPPED.value, OrderStatus.DELIVERED.value]}
+        },
+        {"items": {"$elemMatch": {"product_id": product_id}}},
+        sort=[("created_at", -1)]
+    )
+
+
+def stats_to_summary(stats: ProductReviewStats) -> ReviewSummary:
+    """Convierte los agregados del producto en un ReviewSummary"""
+    return ReviewSummary(
+        product_id=str(stats.id),
+        average_rating=stats.average_rating,
+        total_reviews=stats.review_count,
+        rating_distribution={stars: stats.rating_distribution.get(str(stars), 0) for stars in range(1, 6)},
+        verified_purchase_count=stats.verified_review_count
+    )
 
 
 # ==================== ENDPOINTS PÚBLICOS ====================
 
+@router.get("/summary/batch", response_model=Dict[str, ReviewSummary])
+async def get_review_summaries_batch(
+    product_ids: str = Query(..., description="IDs de productos separados por coma")
+):
+    """
+    Obtiene los resúmenes de reviews de varios productos a la vez.
+
+    Pensado para grillas de productos: una sola consulta $in sobre los
+    agregados precalculados. La respuesta se indexa por product_id; los
+    productos inexistentes se omiten.
+    """
+    ids = list(dict.fromkeys(pid.strip() for pid in product_ids.split(",") if pid.strip()))
+
+    if len(ids) > REVIEW_SUMMARY_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {REVIEW_SUMMARY_BATCH_MAX} productos por consulta"
+        )
+
+    invalid = [pid for pid in ids if not PydanticObjectId.is_valid(pid)]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"IDs de producto inválidos: {', '.join(invalid)}"
+        )
+
+    stats_list = await Product.find(
+        {"_id": {"$in": [PydanticObjectId(pid) for pid in ids]}}
+    ).project(ProductReviewStats).to_list()
+
+    return {str(stats.id): stats_to_summary(stats) for stats in stats_list}
+
+
 @router.get("/product/{product_id}", response_model=List[ReviewResponse])
 async def get_product_reviews(
     product_id: str,
@@ -58,24 +160,7 @@ async def get_product_reviews(
             detail="Producto no encontrado"
         )
 
-    query = ProductReview.find(
-        ProductReview.product_id == PydanticObjectId(product_id),
-        ProductReview.is_approved == True
-    )
-
-    # Ordenamiento
-    if sort_by == "recent":
-        query = query.sort(-ProductReview.created_at)
-    elif sort_by == "rating_high":
-        query = query.sort(-ProductReview.rating, -ProductReview.created_at)
-    elif sort_by == "rating_low":
-        query = query.sort(ProductReview.rating, -ProductReview.created_at)
-    elif sort_by == "helpful":
-        query = query.sort(-ProductReview.helpful_count, -ProductReview.created_at)
-
-    reviews = await query.skip(skip).limit(limit).to_list()
-
-    return reviews
+    return await review_service.list_approved(PydanticObjectId(product_id), sort_by, skip, limit)
 
 
 @router.get("/product/{product_id}/summary", response_model=ReviewSummary)
@@ -84,45 +169,19 @@ async def get_product_review_summary(product_id: str):
     Obtiene un resumen de las reviews de un producto.
 
     Incluye: promedio, total de reviews, distribución por estrellas.
+    Se sirve desde los agregados del producto con una sola lectura.
     """
-    product = await Product.get(product_id)
-    if not product:
+    stats = await Product.find_one(
+        Product.id == PydanticObjectId(product_id)
+    ).project(ProductReviewStats)
+
+    if not stats:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Producto no encontrado"
         )
 
-    reviews = await ProductReview.find(
-        ProductReview.product_id == PydanticObjectId(product_id),
-        ProductReview.is_approved == True
-    ).to_list()
-
-    if not reviews:
-        return ReviewSummary(
-            product_id=product_id,
-            average_rating=0,
-            total_reviews=0,
-            rating_distribution={1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-            verified_purchase_count=0
-        )
-
-    # Calcular distribución
-    distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    verified_count = 0
-    for review in reviews:
-        distribution[review.rating] += 1
-        if review.verified_purchase:
-            verified_count += 1
-
-    avg_rating = sum(r.rating for r in reviews) / len(reviews)
-
-    return ReviewSummary(
-        product_id=product_id,
-        average_rating=round(avg_rating, 2),
-        total_reviews=len(reviews),
-        rating_distribution=distribution,
-        verified_purchase_count=verified_count
-    )
+    return stats_to_summary(stats)
 
 
 # ==================== ENDPOINTS DE USUARIO ====================
@@ -136,6 +195,8 @@ async def create_review(
     Crea una nueva review.
 
     El usuario debe haber comprado el producto para dejar una review verificada.
+    La compra se busca en sus órdenes enviadas o entregadas; la review solo
+    guarda order_id cuando la encuentra.
     """
     # Verificar que el producto existe
     product = await Product.get(review_in.product_id)
@@ -157,25 +218,22 @@ async def create_review(
         )
 
     # Verificar compra verificada
-    verified_purchase = False
+    purchase = await find_verified_purchase(current_user.id, product.id)
+    verified_purchase = purchase is not None
     variant_sku = None
     variant_info = None
+    order_id = None
 
-    if review_in.order_id:
-        order = await Order.get(review_in.order_id)
-        if order and order.user_id == current_user.id and order.status in [OrderStatus.DELIVERED, OrderStatus.SHIPPED]:
-            # Verificar que el producto está en la orden
-            for item in order.items:
-                if str(item.product_id) == review_in.product_id:
-                    verified_purchase = True
-                    variant_sku = item.variant_sku
-                    variant_info = item.variant_info
-                    break
+    if purchase:
+        item = purchase["items"][0]
+        order_id = purchase["_id"]
+        variant_sku = item.get("variant_sku")
+        variant_info = item.get("variant_info")
 
     review = ProductReview(
         product_id=PydanticObjectId(review_in.product_id),
         user_id=current_user.id,
-        order_id=PydanticObjectId(review_in.order_id) if review_in.order_id else None,
+        order_id=order_id,
         rating=review_in.rating,
         title=review_in.title,
         comment=review_in.comment,
@@ -187,9 +245,15 @@ async def create_review(
     )
 
     await review.create()
+    review_service.invalidate_product(review.product_id)
 
     # Actualizar rating del producto
-    await update_product_rating(PydanticObjectId(review_in.product_id))
+    if review.is_approved:
+        await adjust_product_rating(
+            review.product_id,
+            {review.rating: 1},
+            verified_delta=1 if review.verified_purchase else 0
+        )
 
     return review
 
@@ -234,15 +298,27 @@ async def update_review(
         )
 
     update_data = review_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.now(timezone.utc)
+
+    # El documento previo indica la calificación que se reemplaza
+    previous = await ProductReview.find_one(ProductReview.id == review.id).update(
+        {"$set": update_data},
+        response_type=UpdateResponse.OLD_DOCUMENT
+    )
+
+    if not previous:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review no encontrada"
+        )
+
     for field, value in update_data.items():
         setattr(review, field, value)
-
-    review.updated_at = datetime.now(timezone.utc)
-    await review.save()
+    review_service.invalidate_product(review.product_id)
 
     # Actualizar rating si cambió
-    if "rating" in update_data:
-        await update_product_rating(review.product_id)
+    if previous.is_approved and review.rating != previous.rating:
+        await adjust_product_rating(review.product_id, {previous.rating: -1, review.rating: 1})
 
     return review
 
@@ -269,11 +345,22 @@ async def delete_review(
             detail="No puedes eliminar esta review"
         )
 
-    product_id = review.product_id
-    await review.delete()
+    # find_one_and_delete: solo quien elimina realmente ajusta el rating
+    deleted = await ProductReview.get_pymongo_collection().find_one_and_delete({"_id": review.id})
+
+    if not deleted:
+        return
+
+    review_service.invalidate_product(review.product_id)
+    await ReviewHelpfulVote.find(ReviewHelpfulVote.review_id == review.id).delete()
 
     # Actualizar rating del producto
-    await update_product_rating(product_id)
+    if deleted.get("is_approved"):
+        await adjust_product_rating(
+            review.product_id,
+            {deleted["rating"]: -1},
+            verified_delta=-1 if deleted.get("verified_purchase") else 0
+        )
 
 
 @router.post("/{review_id}/helpful")
@@ -283,17 +370,41 @@ async def mark_review_helpful(
 ):
     """
     Marca una review como útil.
+
+    Cada usuario puede votar una sola vez por review: el voto se registra
+    con índice único y el contador se incrementa de forma atómica.
     """
-    review = await ProductReview.get(review_id)
+    if not PydanticObjectId.is_valid(review_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review no encontrada"
+        )
+
+    vote = ReviewHelpfulVote(review_id=PydanticObjectId(review_id), user_id=current_user.id)
+    try:
+        await vote.create()
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya marcaste esta review como útil"
+        )
+
+    # Incremento condicional: solo sobre reviews existentes y aprobadas
+    review = await ProductReview.find_one(
+        {"_id": vote.review_id, "is_approved": True}
+    ).update(
+        {"$inc": {"helpful_count": 1}},
+        response_type=UpdateResponse.NEW_DOCUMENT
+    )
 
     if not review:
+        await vote.delete()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Review no encontrada"
         )
 
-    review.helpful_count += 1
-    await review.save()
+    review_service.invalidate_product(review.product_id)
 
     return {"success": True, "helpful_count": review.helpful_count}
 
@@ -332,12 +443,20 @@ async def approve_review(
             detail="Review no encontrada"
         )
 
-    review.is_approved = True
-    review.updated_at = datetime.now(timezone.utc)
-    await review.save()
-
-    # Actualizar rating del producto
-    await update_product_rating(review.product_id)
+    # Transición condicional: una review solo suma al rating una vez
+    result = await ProductReview.find_one({"_id": review.id, "is_approved": False}).update({
+        "$set": {"is_approved": True, "updated_at": datetime.now(timezone.utc)}
+    })
+
+    if result.modified_count > 0:
+        review.is_approved = True
+        review_service.invalidate_product(review.product_id)
+        # Actualizar rating del producto
+        await adjust_product_rating(
+            review.product_id,
+            {review.rating: 1},
+            verified_delta=1 if review.verified_purchase else 0
+        )
 
     return review
 
@@ -358,8 +477,10 @@ async def feature_review(
             detail="Review no encontrada"
         )
 
-    review.is_featured = not review.is_featured
-    review.updated_at = datetime.now(timezone.utc)
-    await review.save()
+    await review.set({
+        ProductReview.is_featured: not review.is_featured,
+        ProductReview.updated_at: datetime.now(timezone.utc)
+    })
+    review_service.invalidate_product(review.product_id)
 
     return review
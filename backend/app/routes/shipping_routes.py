@@ -0,0 +1,126 @@
+"""
+Rutas para cotización de envíos y gestión de zonas de envío
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from datetime import datetime, timezone
+
+from app.models.shipping_model import ShippingZone
+from app.models.user_model import User
+from app.core.dependencies import get_current_admin_user
+from app.schemas.shipping_schema import (
+    ShippingQuoteRequest,
+    ShippingQuoteResponse,
+    ShippingZoneCreate,
+    ShippingZoneUpdate
+)
+from app.services.shipping_service import shipping_service, ShippingQuoteResult
+
+router = APIRouter()
+
+
+def quote_to_response(quote: ShippingQuoteResult) -> ShippingQuoteResponse:
+    """Convierte una cotización del motor a respuesta"""
+    return ShippingQuoteResponse(
+        method_id=quote.method.id,
+        name=quote.method.name,
+        description=quote.method.description,
+        carrier=quote.method.carrier,
+        cost=quote.cost,
+        estimated_days_min=quote.method.estimated_days_min,
+        estimated_days_max=quote.method.estimated_days_max,
+        zone=quote.zone_name
+    )
+
+
+# ==================== ENDPOINTS PÚBLICOS ====================
+
+@router.post("/quote", response_model=List[ShippingQuoteResponse])
+async def quote_shipping(quote_in: ShippingQuoteRequest):
+    """
+    Cotiza los métodos de envío disponibles para una dirección.
+
+    Se resuelve desde la tabla de zonas en memoria, sin consultar la base de datos.
+    """
+    await shipping_service.ensure_fresh()
+
+    quotes = shipping_service.quote(
+        quote_in.shipping_address,
+        quote_in.subtotal,
+        quote_in.weight_kg
+    )
+
+    return [quote_to_response(q) for q in quotes]
+
+
+# ==================== ENDPOINTS DE ADMIN ====================
+
+@router.get("/zones", response_model=List[ShippingZone])
+async def list_zones(current_user: User = Depends(get_current_admin_user)):
+    """
+    Lista todas las zonas de envío (solo admin).
+    """
+    return await ShippingZone.find_all().sort(ShippingZone.department).to_list()
+
+
+@router.post("/zones", response_model=ShippingZone, status_code=status.HTTP_201_CREATED)
+async def create_zone(
+    zone_in: ShippingZoneCreate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Crea una zona de envío (solo admin).
+    """
+    zone = ShippingZone(**zone_in.model_dump())
+    await zone.create()
+
+    await shipping_service.load()
+
+    return zone
+
+
+@router.patch("/zones/{zone_id}", response_model=ShippingZone)
+async def update_zone(
+    zone_id: str,
+    zone_update: ShippingZoneUpdate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Actualiza una zona de envío (solo admin).
+    """
+    zone = await ShippingZone.get(zone_id)
+
+    if not zone:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Zona de envío no encontrada"
+        )
+
+    update_data = zone_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    await zone.set(update_data)
+
+    await shipping_service.load()
+
+    return zone
+
+
+@router.delete("/zones/{zone_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_zone(
+    zone_id: str,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Elimina una zona de envío (solo admin).
+    """
+    zone = await ShippingZone.get(zone_id)
+
+    if not zone:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Zona de envío no encontrada"
+        )
+
+    await zone.delete()
+
+    await shipping_service.load()
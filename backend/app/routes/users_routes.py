@@ -1,11 +1,107 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timezone
+from typing import List, Optional, Union
+from beanie import PydanticObjectId
+import base64
+import csv
+import io
+import re
 from app.models.user_model import User
-from app.schemas.user_schema import UserResponse, UserUpdate
-from app.core.dependencies import get_current_user, get_current_admin_user
+from app.schemas.user_schema import UserResponse, UserUpdate, UserListResponse
+from app.core.dependencies import (
+    get_current_user,
+    get_current_admin_user,
+    invalidate_cached_user,
+    user_cache_stats
+)
+from app.core.security import password_pool_stats
 
 router = APIRouter()
 
+# Campos de UserResponse: el listado de admin solo trae estos
+USER_LIST_PROJECTION = {
+    ("_id" if name == "id" else name): 1 for name in UserResponse.model_fields
+}
+
+CSV_EXPORT_FIELDS = ["id", "email", "first_name", "last_name", "phone_number", "document_id", "role", "is_active", "created_at"]
+
+# Una celda que empieza con estos caracteres se evalúa como fórmula en Excel/Sheets
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def csv_safe(value):
+    """Neutraliza la inyección de fórmulas anteponiendo un apóstrofo"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def build_user_filters(
+    role: Optional[str],
+    is_active: Optional[bool],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    search: Optional[str]
+) -> dict:
+    """
+    Filtros del listado de admin.
+
+    search busca por prefijo: email en minúsculas y nombre o apellido tal
+    como se escribe o con la inicial en mayúscula. Cada prefijo es una
+    cláusula "^prefijo" separada dentro del $or: una alternancia
+    "^(?:a|b)" no se traduce a límites de índice y recorre todo el índice.
+    """
+    filters = {}
+
+    if role:
+        filters["role"] = role
+
+    if is_active is not None:
+        filters["is_active"] = is_active
+
+    if created_from or created_to:
+        filters["created_at"] = {}
+        if created_from:
+            filters["created_at"]["$gte"] = created_from
+        if created_to:
+            filters["created_at"]["$lte"] = created_to
+
+    if search and search.strip():
+        term = search.strip()
+        name_prefixes = list(dict.fromkeys([term, term[:1].upper() + term[1:]]))
+        filters["$or"] = [{"email": {"$regex": f"^{re.escape(term.lower())}"}}] + [
+            {field: {"$regex": f"^{re.escape(prefix)}"}}
+            for field in ("first_name", "last_name")
+            for prefix in name_prefixes
+        ]
+
+    return filters
+
+
+def encode_user_cursor(document: dict) -> str:
+    """Cursor opaco con la posición (created_at, _id) del último usuario"""
+    raw = f"{document['created_at'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_user_cursor(cursor: str) -> dict:
+    """Condición para continuar después del cursor (orden created_at, _id descendente)"""
+    try:
+        created_at, user_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        created_at = datetime.fromisoformat(created_at)
+        user_id = PydanticObjectId(user_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": user_id}}
+    ]}
+
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
@@ -21,16 +117,109 @@ async def update_profile(
     """Actualiza el perfil del usuario actual"""
     update_data = user_update.model_dump(exclude_unset=True)
 
-    for field, value in update_data.items():
-        setattr(current_user, field, value)
-
-    current_user.updated_at = datetime.now(timezone.utc)
-    await current_user.save()
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    await current_user.set(update_data)
+    invalidate_cached_user(current_user.email)
 
     return current_user
 
 
-@router.get("/", response_model=list[UserResponse])
-async def get_users(current_user: User = Depends(get_current_admin_user)):
-    """Lista todos los usuarios (solo admin)"""
-    return await User.find_all().to_list()
+@router.get("/", response_model=Union[List[UserResponse], UserListResponse])
+async def get_users(
+    role: Optional[str] = Query(None, description="Filtrar por rol"),
+    is_active: Optional[bool] = Query(None, description="Filtrar por estado"),
+    created_from: Optional[datetime] = Query(None, description="Registrados desde"),
+    created_to: Optional[datetime] = Query(None, description="Registrados hasta"),
+    search: Optional[str] = Query(None, min_length=2, description="Prefijo de email, nombre o apellido"),
+    paginate: bool = Query(False, description="Responder {items, next_cursor} paginado por cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (implica paginate)"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Máximo de usuarios (50 por página al paginar)"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Lista usuarios del más reciente al más antiguo (solo admin).
+
+    Por defecto responde la lista de usuarios (todos, o hasta limit).
+    Con paginate=true o un cursor responde {items, next_cursor}.
+    """
+    filters = build_user_filters(role, is_active, created_from, created_to, search)
+    paginate = paginate or cursor is not None
+    if cursor:
+        position = decode_user_cursor(cursor)
+        filters = {"$and": [filters, position]} if filters else position
+
+    query = User.get_pymongo_collection().find(
+        filters, USER_LIST_PROJECTION
+    ).sort([("created_at", -1), ("_id", -1)])
+
+    if not paginate:
+        if limit:
+            query = query.limit(limit)
+        return [UserResponse(id=doc.pop("_id"), **doc) async for doc in query]
+
+    limit = limit or 50
+    documents = await query.limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_user_cursor(documents[-1]) if has_more else None
+
+    return UserListResponse(
+        items=[UserResponse(id=doc.pop("_id"), **doc) for doc in documents],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+async def export_users_csv(
+    role: Optional[str] = Query(None, description="Filtrar por rol"),
+    is_active: Optional[bool] = Query(None, description="Filtrar por estado"),
+    created_from: Optional[datetime] = Query(None, description="Registrados desde"),
+    created_to: Optional[datetime] = Query(None, description="Registrados hasta"),
+    search: Optional[str] = Query(None, min_length=2, description="Prefijo de email, nombre o apellido"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Exporta usuarios a CSV (solo admin).
+
+    Se transmite por partes desde un cursor de Mongo: no carga todos los
+    usuarios en memoria. Las celdas que Excel interpretaría como fórmula
+    se exportan con un apóstrofo al inicio.
+    """
+    filters = build_user_filters(role, is_active, created_from, created_to, search)
+    projection = {field: 1 for field in CSV_EXPORT_FIELDS if field != "id"}
+
+    async def generate_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_EXPORT_FIELDS)
+
+        cursor = User.get_pymongo_collection().find(filters, projection).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).batch_size(500)
+
+        async for document in cursor:
+            document["id"] = str(document.pop("_id"))
+            writer.writerow([csv_safe(document.get(field, "")) for field in CSV_EXPORT_FIELDS])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    filename = f"usuarios_{datetime.now(timezone.utc).strftime('%Y%m%d')}.csv"
+    return StreamingResponse(
+        generate_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/admin/auth-stats")
+async def get_auth_stats(current_user: User = Depends(get_current_admin_user)):
+    """Métricas de autenticación: cache de usuarios y pool de bcrypt (solo admin)"""
+    return {
+        "user_cache": user_cache_stats(),
+        "password_pool": password_pool_stats()
+    }
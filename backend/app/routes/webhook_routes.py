@@ -1,7 +1,7 @@
 """
 Rutas para webhooks externos (Wompi, etc.)
 """
-from fastapi import APIRouter, Request, Header, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Request, Header, HTTPException, status
 from datetime import datetime, timezone
 import logging
 
@@ -17,7 +17,6 @@ logger = logging.getLogger(__name__)
 @router.post("/wompi")
 async def wompi_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
     x_signature: str = Header(None, alias="x-signature")
 ):
     """
@@ -67,7 +66,7 @@ async def wompi_webhook(
 
         # Procesar según el estado de la transacción
         if transaction_status == "APPROVED":
-            await process_approved_payment(order, transaction_id, transaction_data, background_tasks)
+            await process_approved_payment(order, transaction_id, transaction_data)
 
         elif transaction_status == "DECLINED":
             await process_declined_payment(order, transaction_id, transaction_data)
@@ -89,36 +88,36 @@ async def wompi_webhook(
 async def process_approved_payment(
     order: Order,
     transaction_id: str,
-    transaction_data: dict,
-    background_tasks: BackgroundTasks
+    transaction_data: dict
 ):
     """Procesa un pago aprobado"""
-    if order.status in [OrderStatus.PAID, OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.DELIVERED]:
+    processed_statuses = [OrderStatus.PAID, OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.DELIVERED]
+    if order.status in processed_statuses:
         logger.info(f"Order {order.id} already processed, skipping")
         return
 
-    order.status = OrderStatus.PAID
-    order.wompi_transaction_id = transaction_id
-    order.paid_at = datetime.now(timezone.utc)
-
-    # Agregar evento de tracking
-    order.add_tracking_event(
+    # Update condicional: un webhook duplicado concurrente no vuelve a procesar la orden
+    updated = await order.push_tracking_event(
         status=OrderStatus.PAID,
         notes=f"Pago confirmado vía Wompi (ID: {transaction_id})",
-        updated_by="wompi_webhook"
+        updated_by="wompi_webhook",
+        extra_fields={
+            "wompi_transaction_id": transaction_id,
+            "paid_at": datetime.now(timezone.utc)
+        },
+        conditions={"status": {"$nin": [s.value for s in processed_statuses]}}
     )
 
-    await order.save()
+    if not updated:
+        logger.info(f"Order {order.id} already processed, skipping")
+        return
+
     logger.info(f"Order {order.id} marked as PAID")
 
-    # Enviar email de confirmación de pago en background
+    # Encolar email de confirmación de pago
     user = await User.get(order.user_id)
     if user:
-        background_tasks.add_task(
-            email_service.send_payment_confirmation,
-            order,
-            user.first_name
-        )
+        await email_service.send_payment_confirmation(order, user.first_name)
 
 
 async def process_declined_payment(
@@ -132,15 +131,15 @@ async def process_declined_payment(
 
     decline_reason = transaction_data.get("status_message", "Pago rechazado")
 
-    order.add_tracking_event(
+    updated = await order.push_tracking_event(
         status=OrderStatus.FAILED,
         notes=f"Pago rechazado: {decline_reason} (ID: {transaction_id})",
-        updated_by="wompi_webhook"
+        updated_by="wompi_webhook",
+        conditions={"status": OrderStatus.PENDING.value}
     )
 
-    order.status = OrderStatus.FAILED
-    await order.save()
-    logger.info(f"Order {order.id} marked as FAILED (declined)")
+    if updated:
+        logger.info(f"Order {order.id} marked as FAILED (declined)")
 
 
 async def process_voided_payment(
@@ -149,14 +148,11 @@ async def process_voided_payment(
     transaction_data: dict
 ):
     """Procesa un pago anulado"""
-    order.add_tracking_event(
+    await order.push_tracking_event(
         status=OrderStatus.CANCELLED,
         notes=f"Pago anulado (ID: {transaction_id})",
         updated_by="wompi_webhook"
     )
-
-    order.status = OrderStatus.CANCELLED
-    await order.save()
     logger.info(f"Order {order.id} marked as CANCELLED (voided)")
 
 
@@ -171,15 +167,15 @@ async def process_failed_payment(
 
     error_message = transaction_data.get("status_message", "Error en el pago")
 
-    order.add_tracking_event(
+    updated = await order.push_tracking_event(
         status=OrderStatus.FAILED,
         notes=f"Error en el pago: {error_message} (ID: {transaction_id})",
-        updated_by="wompi_webhook"
+        updated_by="wompi_webhook",
+        conditions={"status": OrderStatus.PENDING.value}
     )
 
-    order.status = OrderStatus.FAILED
-    await order.save()
-    logger.info(f"Order {order.id} marked as FAILED (error)")
+    if updated:
+        logger.info(f"Order {order.id} marked as FAILED (error)")
 
 
 @router.get("/wompi/test")
@@ -2,15 +2,16 @@
 Rutas para gestión de wishlists (listas de deseos)
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from typing import List, Dict
 from datetime import datetime, timezone
 from beanie import PydanticObjectId
 
 from app.models.wishlist_model import Wishlist
-from app.models.product_model import Product
+from app.models.product_model import Product, ProductCardView
 from app.models.user_model import User
 from app.core.dependencies import get_current_user
-from pydantic import BaseModel
+from app.services.wishlist_service import wishlist_service
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
@@ -31,6 +32,16 @@ class WishlistProductResponse(BaseModel):
     in_stock: bool
 
 
+class WishlistCheckRequest(BaseModel):
+    """Productos a verificar en la wishlist"""
+    product_ids: List[str] = Field(..., max_length=100)
+
+
+class WishlistCheckResponse(BaseModel):
+    """Membresía de cada producto: {product_id: en_wishlist}"""
+    in_wishlist: Dict[str, bool]
+
+
 @router.get("/", response_model=WishlistResponse)
 async def get_wishlist(current_user: User = Depends(get_current_user)):
     """
@@ -51,30 +62,43 @@ async def get_wishlist(current_user: User = Depends(get_current_user)):
 async def get_wishlist_products(current_user: User = Depends(get_current_user)):
     """
     Obtiene la wishlist con detalles de los productos.
+
+    Una sola consulta $in con proyección; se respeta el orden de la
+    wishlist y los productos eliminados o inactivos se quitan de ella.
     """
     wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
 
     if not wishlist or not wishlist.products:
         return []
 
+    cards = await Product.find(
+        {"_id": {"$in": wishlist.products}}
+    ).project(ProductCardView).to_list()
+    cards_by_id = {card.id: card for card in cards}
+
     products = []
+    stale_ids = []
     for product_id in wishlist.products:
-        product = await Product.get(product_id)
-        if product and product.is_active:
-            # Calcular si tiene stock
-            if product.has_variants:
-                in_stock = any(v.stock > 0 and v.is_available for v in product.variants)
-            else:
-                in_stock = (product.stock or 0) > 0
-
-            products.append(WishlistProductResponse(
-                id=str(product.id),
-                name=product.name,
-                base_price=product.base_price,
-                main_image=product.main_image,
-                is_active=product.is_active,
-                in_stock=in_stock
-            ))
+        card = cards_by_id.get(product_id)
+        if not card or not card.is_active:
+            stale_ids.append(product_id)
+            continue
+
+        products.append(WishlistProductResponse(
+            id=str(card.id),
+            name=card.name,
+            base_price=card.base_price,
+            main_image=card.main_image,
+            is_active=card.is_active,
+            in_stock=card.in_stock
+        ))
+
+    if stale_ids:
+        await Wishlist.find_one(Wishlist.user_id == current_user.id).update({
+            "$pull": {"products": {"$in": stale_ids}},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        })
+        wishlist_service.invalidate(current_user.id)
 
     return products
 
@@ -95,26 +119,16 @@ async def add_to_wishlist(
             detail="Producto no encontrado"
         )
 
-    product_oid = PydanticObjectId(product_id)
-
-    # Buscar o crear wishlist
-    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
-
-    if not wishlist:
-        wishlist = Wishlist(
-            user_id=current_user.id,
-            products=[product_oid]
-        )
-        await wishlist.create()
-    elif product_oid not in wishlist.products:
-        wishlist.products.append(product_oid)
-        wishlist.updated_at = datetime.now(timezone.utc)
-        await wishlist.save()
+    result = await wishlist_service.update(current_user.id, {
+        "$addToSet": {"products": product.id},
+        "$set": {"updated_at": datetime.now(timezone.utc)},
+        "$setOnInsert": {"created_at": datetime.now(timezone.utc)}
+    })
 
     return {
         "success": True,
         "message": "Producto agregado a la wishlist",
-        "count": len(wishlist.products)
+        "count": result["count"]
     }
 
 
@@ -126,25 +140,21 @@ async def remove_from_wishlist(
     """
     Remueve un producto de la wishlist.
     """
-    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
+    result = await wishlist_service.update(current_user.id, {
+        "$pull": {"products": PydanticObjectId(product_id)},
+        "$set": {"updated_at": datetime.now(timezone.utc)}
+    }, upsert=False)
 
-    if not wishlist:
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Wishlist no encontrada"
         )
 
-    product_oid = PydanticObjectId(product_id)
-
-    if product_oid in wishlist.products:
-        wishlist.products.remove(product_oid)
-        wishlist.updated_at = datetime.now(timezone.utc)
-        await wishlist.save()
-
     return {
         "success": True,
         "message": "Producto removido de la wishlist",
-        "count": len(wishlist.products)
+        "count": result["count"]
     }
 
 
@@ -164,36 +174,45 @@ async def toggle_wishlist(
             detail="Producto no encontrado"
         )
 
-    product_oid = PydanticObjectId(product_id)
-
-    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
-
-    if not wishlist:
-        wishlist = Wishlist(
-            user_id=current_user.id,
-            products=[product_oid]
-        )
-        await wishlist.create()
-        added = True
-    elif product_oid in wishlist.products:
-        wishlist.products.remove(product_oid)
-        wishlist.updated_at = datetime.now(timezone.utc)
-        await wishlist.save()
-        added = False
-    else:
-        wishlist.products.append(product_oid)
-        wishlist.updated_at = datetime.now(timezone.utc)
-        await wishlist.save()
-        added = True
+    # Update con pipeline: la decisión agregar/remover ocurre en el servidor
+    products = {"$ifNull": ["$products", []]}
+    result = await wishlist_service.update(current_user.id, [
+        {"$set": {
+            "products": {"$cond": [
+                {"$in": [product.id, products]},
+                {"$filter": {"input": products, "cond": {"$ne": ["$$this", product.id]}}},
+                {"$concatArrays": [products, [product.id]]}
+            ]},
+            "updated_at": datetime.now(timezone.utc),
+            "created_at": {"$ifNull": ["$created_at", datetime.now(timezone.utc)]}
+        }}
+    ], product_id=product.id)
+    added = result["added"]
 
     return {
         "success": True,
         "added": added,
         "message": "Producto agregado a favoritos" if added else "Producto removido de favoritos",
-        "count": len(wishlist.products)
+        "count": result["count"]
     }
 
 
+@router.post("/check", response_model=WishlistCheckResponse)
+async def check_many_in_wishlist(
+    check_in: WishlistCheckRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Verifica varios productos a la vez (corazones de una grilla).
+    """
+    membership = await wishlist_service.get_membership(current_user.id)
+
+    return WishlistCheckResponse(in_wishlist={
+        product_id: PydanticObjectId.is_valid(product_id) and PydanticObjectId(product_id) in membership
+        for product_id in check_in.product_ids
+    })
+
+
 @router.get("/check/{product_id}")
 async def check_in_wishlist(
     product_id: str,
@@ -202,14 +221,9 @@ async def check_in_wishlist(
     """
     Verifica si un producto está en la wishlist.
     """
-    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
-
-    if not wishlist:
-        return {"in_wishlist": False}
-
-    product_oid = PydanticObjectId(product_id)
+    membership = await wishlist_service.get_membership(current_user.id)
 
-    return {"in_wishlist": product_oid in wishlist.products}
+    return {"in_wishlist": PydanticObjectId(product_id) in membership}
 
 
 @router.delete("/clear")
@@ -217,11 +231,8 @@ async def clear_wishlist(current_user: User = Depends(get_current_user)):
     """
     Vacía la wishlist del usuario.
     """
-    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
-
-    if wishlist:
-        wishlist.products = []
-        wishlist.updated_at = datetime.now(timezone.utc)
-        await wishlist.save()
+    await wishlist_service.update(current_user.id, {
+        "$set": {"products": [], "updated_at": datetime.now(timezone.utc)}
+    }, upsert=False)
 
     return {"success": True, "message": "Wishlist vaciada"}
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class BroadcastCreate(BaseModel):
+    """Schema para crear un envío masivo"""
+    name: str = Field(..., max_length=200, description="Nombre interno del envío")
+    subject: str = Field(..., max_length=200)
+    html_content: str = Field(..., description="Contenido HTML; -first_name- se reemplaza por el nombre del destinatario")
+    roles: List[str] = Field(default_factory=lambda: ["customer"], min_length=1)
+    recipients_per_second: Optional[float] = Field(None, gt=0, description="Límite de envío (None = valor por defecto)")
+    start: bool = Field(default=True, description="Iniciar el envío al crearlo")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Nueva colección de verano",
+                "subject": "Llegó la colección de verano",
+                "html_content": "<p>-first_name-, ya puedes ver las nuevas piezas hechas a mano.</p>",
+                "roles": ["customer"],
+                "recipients_per_second": 50
+            }
+        }
@@ -75,11 +75,18 @@ class CouponResponse(BaseModel):
         from_attributes = True
 
 
+class CouponCartItem(BaseModel):
+    """Línea del carrito para evaluar restricciones del cupón"""
+    product_id: str
+    quantity: int = Field(..., gt=0)
+    price: float = Field(..., ge=0)
+
+
 class CouponValidationRequest(BaseModel):
     """Schema para validar un cupón"""
     code: str
     subtotal: float = Field(..., gt=0)
-    cart_items: Optional[List[dict]] = None  # Para validar categorías/productos
+    cart_items: Optional[List[CouponCartItem]] = None  # Para validar categorías/productos
 
     class Config:
         json_schema_extra = {
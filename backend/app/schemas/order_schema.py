@@ -20,6 +20,7 @@ class OrderCreate(BaseModel):
     shipping_method_id: Optional[str] = Field(None, description="ID del método de envío")
     coupon_code: Optional[str] = Field(None, description="Código de cupón de descuento")
     customer_notes: Optional[str] = Field(None, max_length=500, description="Notas del cliente")
+    quote_token: Optional[str] = Field(None, description="Token de /orders/quote para no recalcular precios")
 
     class Config:
         json_schema_extra = {
@@ -33,6 +34,40 @@ class OrderCreate(BaseModel):
         }
 
 
+class OrderQuoteRequest(BaseModel):
+    """Schema para cotizar un carrito sin crear la orden"""
+    items: List[OrderItemInput] = Field(..., min_length=1)
+    shipping_address: Optional[Address] = None
+    shipping_method_id: Optional[str] = Field(None, description="ID del método de envío")
+    coupon_code: Optional[str] = Field(None, description="Código de cupón de descuento")
+
+
+class OrderQuoteLine(OrderItem):
+    """Línea cotizada con disponibilidad de stock"""
+    line_total: float
+    available_stock: int
+    in_stock: bool
+
+
+class OrderQuoteResponse(BaseModel):
+    """Desglose de precios de un carrito"""
+    lines: List[OrderQuoteLine]
+    subtotal: float
+    discount_amount: float
+    shipping_cost: float
+    total_amount: float
+
+    coupon_code: Optional[str] = None
+    coupon_message: Optional[str] = None
+
+    shipping_method_id: str
+    shipping_method_name: str
+
+    all_in_stock: bool
+    quote_token: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+
 class OrderStatusUpdate(BaseModel):
     """Schema para actualizar estado de una orden"""
     status: OrderStatus
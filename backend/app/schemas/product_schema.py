@@ -45,6 +45,9 @@ class ProductCreate(BaseModel):
     sku: Optional[str] = Field(None, description="SKU si es producto simple")
     stock: Optional[int] = Field(None, ge=0, description="Stock si es producto simple")
 
+    # Envío
+    weight_kg: Optional[float] = Field(None, ge=0, description="Peso en kg para el envío")
+
     # Imágenes
     images: List[str] = Field(default_factory=list, description="URLs de imágenes")
 
@@ -85,6 +88,7 @@ class ProductUpdate(BaseModel):
     base_price: Optional[float] = Field(None, gt=0)
     variants: Optional[List[ProductVariantSchema]] = None
     stock: Optional[int] = Field(None, ge=0)
+    weight_kg: Optional[float] = Field(None, ge=0)
     images: Optional[List[str]] = None
     tags: Optional[List[str]] = None
     is_featured: Optional[bool] = None
@@ -104,6 +108,7 @@ class ProductResponse(BaseModel):
 
     sku: Optional[str]
     stock: Optional[int]
+    weight_kg: Optional[float] = None
 
     images: List[str]
     main_image: Optional[str]
@@ -1,12 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from beanie import PydanticObjectId
 
 
 class ReviewCreate(BaseModel):
     """Schema para crear review"""
     product_id: str
-    order_id: Optional[str] = Field(None, description="ID de la orden (para compra verificada)")
     rating: int = Field(..., ge=1, le=5, description="Calificación 1-5 estrellas")
     title: str = Field(..., min_length=3, max_length=100)
     comment: str = Field(..., min_length=10, max_length=2000)
@@ -16,7 +16,6 @@ class ReviewCreate(BaseModel):
         json_schema_extra = {
             "example": {
                 "product_id": "507f1f77bcf86cd799439011",
-                "order_id": "507f1f77bcf86cd799439012",
                 "rating": 5,
                 "title": "¡Excelente calidad!",
                 "comment": "Las sandalias son hermosas y muy cómodas. Totalmente recomendadas.",
@@ -36,10 +35,10 @@ class ReviewUpdate(BaseModel):
 
 class ReviewResponse(BaseModel):
     """Schema para respuesta de review"""
-    id: str
-    product_id: str
-    user_id: str
-    order_id: str
+    id: PydanticObjectId
+    product_id: PydanticObjectId
+    user_id: PydanticObjectId
+    order_id: Optional[PydanticObjectId] = None
     rating: int
     title: str
     comment: str
@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from app.models.shipping_model import ShippingMethod
+from app.models.user_model import Address
+
+
+class ShippingQuoteRequest(BaseModel):
+    """Schema para cotizar envío"""
+    shipping_address: Address
+    subtotal: float = Field(default=0, ge=0, description="Subtotal del carrito")
+    weight_kg: float = Field(default=0, ge=0, description="Peso total del carrito")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "shipping_address": {
+                    "street": "Av. La Capilla 123",
+                    "city": "San Salvador",
+                    "state": "San Salvador"
+                },
+                "subtotal": 45.00,
+                "weight_kg": 1.2
+            }
+        }
+
+
+class ShippingQuoteResponse(BaseModel):
+    """Cotización de un método de envío"""
+    method_id: str
+    name: str
+    description: str
+    carrier: str
+    cost: float
+    estimated_days_min: int
+    estimated_days_max: int
+    zone: Optional[str] = None
+
+
+class ShippingZoneCreate(BaseModel):
+    """Schema para crear una zona de envío"""
+    name: str = Field(..., max_length=100)
+    department: str = Field(..., max_length=100)
+    cities: List[str] = Field(default_factory=list)
+    shipping_methods: List[ShippingMethod] = Field(default_factory=list)
+    is_active: bool = Field(default=True)
+
+
+class ShippingZoneUpdate(BaseModel):
+    """Schema para actualizar una zona de envío"""
+    name: Optional[str] = Field(None, max_length=100)
+    department: Optional[str] = Field(None, max_length=100)
+    cities: Optional[List[str]] = None
+    shipping_methods: Optional[List[ShippingMethod]] = None
+    is_active: Optional[bool] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional
+from typing import Optional, List
 from beanie import PydanticObjectId
 from datetime import datetime
 import re
@@ -65,6 +65,11 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserListResponse(BaseModel):
+    """Página del listado de usuarios (admin)"""
+    items: List[UserResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor para la siguiente página (None si no hay más)")
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -0,0 +1,273 @@
+"""
+Envíos masivos de marketing
+
+Un job por envío recorre los usuarios por _id ascendente en lotes de
+BROADCAST_BATCH_SIZE (una consulta por lote, sin cursores abiertos entre
+pausas) y envía cada lote en una sola llamada a SendGrid con una
+personalization por destinatario. Tras cada lote guarda el último _id
+enviado y el progreso en email_broadcasts, así el envío se reanuda en
+ese punto tras una pausa, un fallo o un reinicio. Un lote ya enviado
+cuyo progreso no llegó a guardarse se reenvía al reanudar.
+
+El ritmo se limita a recipients_per_second (o
+BROADCAST_RECIPIENTS_PER_SECOND) y un lease evita que dos workers
+procesen el mismo envío. Cada ejecución reclama el lease con su propio
+token: una ejecución que perdió el lease (aunque sea de esta misma
+instancia) ya no puede guardar progreso ni cerrar el envío.
+"""
+import asyncio
+import html
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.models.broadcast_model import EmailBroadcast, BroadcastStatus
+from app.models.user_model import User, UserContactView
+from app.schemas.broadcast_schema import BroadcastCreate
+from app.services import email_templates as templates
+from app.services.email_outbox import DeliveryResult
+from app.services.email_service import email_service
+from app.services.email_templates import Markup
+
+logger = logging.getLogger(__name__)
+
+# Estados desde los que un envío se puede iniciar o reanudar
+STARTABLE_STATUSES = [BroadcastStatus.PENDING, BroadcastStatus.PAUSED, BroadcastStatus.FAILED]
+
+
+class BroadcastService:
+    """Servicio para crear, ejecutar y controlar envíos masivos"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: Dict[PydanticObjectId, asyncio.Task] = {}
+
+    async def create(self, data: BroadcastCreate, created_by: str) -> EmailBroadcast:
+        """Crea el envío y, si se pide, lo inicia"""
+        broadcast = EmailBroadcast(**data.model_dump(exclude={"start"}), created_by=created_by)
+        await broadcast.insert()
+
+        if data.start:
+            return await self.start(broadcast.id) or broadcast
+        return broadcast
+
+    async def start(self, broadcast_id: PydanticObjectId) -> Optional[EmailBroadcast]:
+        """
+        Reclama el envío (pendiente, pausado, fallido o con el lease
+        vencido) y lo ejecuta en segundo plano. No se reclama mientras
+        esta instancia aún tenga una ejecución viva del mismo envío (por
+        ejemplo, pausado pero terminando su lote en curso).
+        Returns: el envío reclamado, o None si no se pudo reclamar
+        """
+        running = self._tasks.get(broadcast_id)
+        if running and not running.done():
+            return None
+
+        now = datetime.now(timezone.utc)
+        doc = await EmailBroadcast.get_pymongo_collection().find_one_and_update(
+            {
+                "_id": broadcast_id,
+                "$or": [
+                    {"status": {"$in": [s.value for s in STARTABLE_STATUSES]}},
+                    {"status": BroadcastStatus.RUNNING.value, "lease_until": {"$lt": now}}
+                ]
+            },
+            {"$set": {
+                "status": BroadcastStatus.RUNNING.value,
+                "lease_owner": f"{self.worker_id}:{uuid.uuid4().hex}",
+                "lease_until": now + timedelta(seconds=settings.BROADCAST_LEASE_SECONDS),
+                "last_error": None,
+                "updated_at": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return None
+
+        broadcast = EmailBroadcast.model_validate(doc)
+        if broadcast.started_at is None:
+            broadcast.started_at = now
+            await EmailBroadcast.get_pymongo_collection().update_one(
+                {"_id": broadcast.id, "started_at": None},
+                {"$set": {"started_at": now}}
+            )
+
+        self._tasks[broadcast.id] = asyncio.create_task(self._run(broadcast), name=f"broadcast-{broadcast.id}")
+        logger.info(f"Broadcast {broadcast.id} started (resume after {broadcast.resume_after})")
+        return broadcast
+
+    async def pause(self, broadcast_id: PydanticObjectId) -> bool:
+        """Pausa el envío; el job se detiene al terminar el lote en curso"""
+        return await self._set_status(broadcast_id, [BroadcastStatus.PENDING, BroadcastStatus.RUNNING], BroadcastStatus.PAUSED)
+
+    async def cancel(self, broadcast_id: PydanticObjectId) -> bool:
+        """Cancela el envío (no se puede reanudar)"""
+        return await self._set_status(broadcast_id, STARTABLE_STATUSES + [BroadcastStatus.RUNNING], BroadcastStatus.CANCELLED)
+
+    async def _set_status(self, broadcast_id: PydanticObjectId, allowed: List[BroadcastStatus], new_status: BroadcastStatus) -> bool:
+        # El lease se mantiene: el job en curso aún registra el lote que está enviando
+        result = await EmailBroadcast.get_pymongo_collection().update_one(
+            {"_id": broadcast_id, "status": {"$in": [s.value for s in allowed]}},
+            {"$set": {"status": new_status.value, "updated_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count > 0
+
+    async def resume_interrupted(self) -> int:
+        """Retoma los envíos en curso cuyo worker dejó vencer el lease (llamar en el startup)"""
+        now = datetime.now(timezone.utc)
+        interrupted = await EmailBroadcast.find(
+            {"status": BroadcastStatus.RUNNING.value, "lease_until": {"$lt": now}}
+        ).to_list()
+
+        resumed = 0
+        for broadcast in interrupted:
+            if await self.start(broadcast.id):
+                resumed += 1
+        return resumed
+
+    async def stop(self):
+        """Detiene los jobs de esta instancia y libera sus leases para reanudarlos enseguida"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        await EmailBroadcast.get_pymongo_collection().update_many(
+            {"lease_owner": {"$regex": f"^{re.escape(self.worker_id)}:"}, "status": BroadcastStatus.RUNNING.value},
+            {"$set": {"lease_until": datetime.now(timezone.utc)}}
+        )
+
+    async def remaining_recipients(self, broadcast: EmailBroadcast) -> int:
+        """Destinatarios que faltan por enviar"""
+        return await User.find(self._recipient_filters(broadcast.roles, broadcast.resume_after)).count()
+
+    # ==================== JOB ====================
+
+    async def _run(self, broadcast: EmailBroadcast):
+        rate = broadcast.recipients_per_second or settings.BROADCAST_RECIPIENTS_PER_SECOND
+        html_content = templates.MARKETING.render(
+            content=Markup(broadcast.html_content),
+            button=templates.BUTTON.render(url=f"{settings.FRONTEND_URL}/productos", label="Ver Productos")
+        )
+        last_id = broadcast.resume_after
+
+        try:
+            while True:
+                recipients = await self._next_chunk(broadcast.roles, last_id)
+                if not recipients:
+                    await self._finish(broadcast, BroadcastStatus.COMPLETED)
+                    return
+
+                started = time.monotonic()
+                result = await self._send_with_retry(broadcast.subject, html_content, recipients)
+                if not result.success:
+                    await self._finish(broadcast, BroadcastStatus.FAILED, result.error)
+                    return
+
+                last_id = recipients[-1].id
+                if not await self._save_progress(broadcast, last_id, len(recipients)):
+                    logger.info(f"Broadcast {broadcast.id} stopped (paused, cancelled or lease lost)")
+                    return
+
+                # Ritmo configurable: cada lote ocupa al menos len/rate segundos
+                delay = len(recipients) / rate - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast.id} failed: {str(e)}")
+            await self._finish(broadcast, BroadcastStatus.FAILED, str(e))
+        finally:
+            # Solo si la entrada sigue siendo de esta ejecución
+            if self._tasks.get(broadcast.id) is asyncio.current_task():
+                del self._tasks[broadcast.id]
+
+    @staticmethod
+    def _recipient_filters(roles: List[str], after: Optional[PydanticObjectId]) -> dict:
+        filters = {"is_active": True, "role": {"$in": roles}}
+        if after:
+            filters["_id"] = {"$gt": after}
+        return filters
+
+    async def _next_chunk(self, roles: List[str], after: Optional[PydanticObjectId]) -> List[UserContactView]:
+        """Siguiente lote de destinatarios, por _id ascendente"""
+        batch_size = min(settings.BROADCAST_BATCH_SIZE, 1000)
+        return await User.find(self._recipient_filters(roles, after)).sort("+_id").limit(batch_size).project(UserContactView).to_list()
+
+    async def _send_with_retry(self, subject: str, html_content: str, recipients: List[UserContactView]) -> DeliveryResult:
+        """Envía un lote; reintenta fallos transitorios con backoff exponencial"""
+        personalizations = [
+            {
+                "to": [{"email": r.email, "name": r.first_name}],
+                "substitutions": {"-first_name-": html.escape(r.first_name)}
+            }
+            for r in recipients
+        ]
+
+        attempt = 1
+        while True:
+            result = await email_service.send_batch(subject, html_content, personalizations)
+            if result.success or not result.retryable or attempt >= settings.EMAIL_MAX_ATTEMPTS:
+                return result
+
+            delay = settings.EMAIL_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+            logger.warning(f"Broadcast batch failed (attempt {attempt}), retrying in {delay:.0f}s: {result.error}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _save_progress(self, broadcast: EmailBroadcast, last_id: PydanticObjectId, sent: int) -> bool:
+        """
+        Guarda el punto de reanudación y renueva el lease. El lote enviado
+        se registra aunque el envío se haya pausado o cancelado mientras tanto.
+        Returns: False si el envío ya no es de esta ejecución o no sigue en curso
+        """
+        now = datetime.now(timezone.utc)
+        collection = EmailBroadcast.get_pymongo_collection()
+        doc = await collection.find_one_and_update(
+            {"_id": broadcast.id, "lease_owner": broadcast.lease_owner},
+            {
+                "$set": {
+                    "resume_after": last_id,
+                    "lease_until": now + timedelta(seconds=settings.BROADCAST_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"sent_count": sent, "batches_sent": 1}
+            },
+            projection={"status": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return False
+
+        if doc["status"] != BroadcastStatus.RUNNING.value:
+            await collection.update_one(
+                {"_id": broadcast.id, "lease_owner": broadcast.lease_owner},
+                {"$set": {"lease_owner": None, "lease_until": None}}
+            )
+            return False
+        return True
+
+    async def _finish(self, broadcast: EmailBroadcast, status: BroadcastStatus, error: Optional[str] = None):
+        now = datetime.now(timezone.utc)
+        fields = {"status": status.value, "lease_owner": None, "lease_until": None, "last_error": error, "updated_at": now}
+        if status == BroadcastStatus.COMPLETED:
+            fields["finished_at"] = now
+
+        await EmailBroadcast.get_pymongo_collection().update_one(
+            {"_id": broadcast.id, "status": BroadcastStatus.RUNNING.value, "lease_owner": broadcast.lease_owner},
+            {"$set": fields}
+        )
+        logger.info(f"Broadcast {broadcast.id} finished with status {status.value}")
+
+
+# Instancia global
+broadcast_service = BroadcastService()
@@ -0,0 +1,155 @@
+"""
+Servicio de cupones: búsqueda cacheada y redención
+
+El contador global (current_uses < max_uses) se incrementa con un $inc
+condicional y el límite por usuario se apoya en el índice único de
+coupon_redemptions, así checkouts concurrentes no pueden exceder ninguno
+de los dos límites.
+
+Las búsquedas públicas por código pasan por un cache en memoria (con
+entradas negativas para códigos inexistentes) y un limitador de intentos
+por IP, de modo que adivinar códigos no cuesta lecturas a Mongo.
+"""
+import logging
+from typing import Optional
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core import rate_limit
+from app.models.coupon_model import Coupon, CouponRedemption
+
+logger = logging.getLogger(__name__)
+
+_NOT_CACHED = object()
+
+
+class CouponService:
+    """Servicio para consultar, redimir y liberar usos de cupones"""
+
+    def __init__(self):
+        self._cache = TTLCache(ttl_seconds=settings.COUPON_CACHE_TTL_SECONDS, max_size=2048)
+
+    @staticmethod
+    def normalize_code(code: str) -> str:
+        """Normaliza un código de cupón (mayúsculas, sin espacios)"""
+        return code.upper().strip()
+
+    async def get_cached(self, code: str) -> Optional[Coupon]:
+        """
+        Busca un cupón por código usando el cache.
+        El documento retornado es compartido: no debe modificarse.
+        """
+        code = self.normalize_code(code)
+        coupon = self._cache.get(code, _NOT_CACHED)
+
+        if coupon is _NOT_CACHED:
+            coupon = await Coupon.find_one(Coupon.code == code)
+            ttl = None if coupon else settings.COUPON_NEGATIVE_CACHE_TTL_SECONDS
+            self._cache.set(code, coupon, ttl_seconds=ttl)
+
+        return coupon
+
+    def invalidate(self, code: str):
+        """Descarta el cupón del cache (llamar tras crear/modificar/eliminar)"""
+        self._cache.invalidate(self.normalize_code(code))
+
+    async def allow_attempt(self, client_ip: str, code: str) -> bool:
+        """
+        Registra un intento de validación.
+        Returns: False si la IP excedió los intentos o los códigos fallidos
+        """
+        window = settings.COUPON_VALIDATE_WINDOW_SECONDS
+        if await rate_limit.rate_limiter.is_blocked(f"coupon_miss:{client_ip}", settings.COUPON_VALIDATE_MAX_MISSES, window):
+            return False
+        return await rate_limit.rate_limiter.hit(
+            f"coupon_validate:{client_ip}:{self.normalize_code(code)}",
+            settings.COUPON_VALIDATE_MAX_ATTEMPTS,
+            window
+        )
+
+    async def record_miss(self, client_ip: str):
+        """Registra un intento con un código inexistente"""
+        await rate_limit.rate_limiter.hit(
+            f"coupon_miss:{client_ip}",
+            settings.COUPON_VALIDATE_MAX_MISSES,
+            settings.COUPON_VALIDATE_WINDOW_SECONDS
+        )
+
+    async def redeem(
+        self,
+        coupon: Coupon,
+        user_id: PydanticObjectId,
+        order_id: PydanticObjectId
+    ) -> tuple[bool, str]:
+        """
+        Registra un uso del cupón para el usuario y la orden.
+        Returns: (redimido, mensaje de error)
+        """
+        redemption = await self._claim_user_slot(coupon, user_id, order_id)
+        if not redemption:
+            return (False, "Ya usaste este cupón el máximo de veces permitido")
+
+        # Incremento condicional: solo si quedan usos disponibles
+        result = await Coupon.find_one({
+            "_id": coupon.id,
+            "is_active": True,
+            "$or": [
+                {"max_uses": None},
+                {"$expr": {"$lt": ["$current_uses", "$max_uses"]}}
+            ]
+        }).update({"$inc": {"current_uses": 1}})
+
+        if result.modified_count == 0:
+            await redemption.delete()
+            return (False, "Cupón sin usos disponibles")
+
+        return (True, "")
+
+    async def release(self, order_id: PydanticObjectId, coupon_code: Optional[str] = None):
+        """
+        Libera el uso de cupón asociado a una orden (cancelación).
+        """
+        redemption = await CouponRedemption.find_one(CouponRedemption.order_id == order_id)
+
+        if redemption:
+            await redemption.delete()
+            coupon_filter = {"_id": redemption.coupon_id}
+        elif coupon_code:
+            # Órdenes previas al registro de redenciones
+            coupon_filter = {"code": coupon_code}
+        else:
+            return
+
+        await Coupon.find_one({**coupon_filter, "current_uses": {"$gt": 0}}).update(
+            {"$inc": {"current_uses": -1}}
+        )
+
+    async def _claim_user_slot(
+        self,
+        coupon: Coupon,
+        user_id: PydanticObjectId,
+        order_id: PydanticObjectId
+    ) -> Optional[CouponRedemption]:
+        """Ocupa el primer slot libre del usuario; None si ya agotó su límite"""
+        for slot in range(coupon.max_uses_per_user):
+            redemption = CouponRedemption(
+                coupon_id=coupon.id,
+                coupon_code=coupon.code,
+                user_id=user_id,
+                order_id=order_id,
+                slot=slot
+            )
+            try:
+                await redemption.create()
+                return redemption
+            except DuplicateKeyError:
+                continue
+
+        logger.info(f"User {user_id} reached usage limit for coupon {coupon.code}")
+        return None
+
+
+# Instancia global
+coupon_service = CouponService()
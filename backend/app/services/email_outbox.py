@@ -0,0 +1,331 @@
+"""
+Cola de salida de emails persistida en Mongo
+
+Las rutas guardan el email en la colección email_outbox dentro de la
+misma solicitud que lo origina, así un deploy o una caída no lo pierden.
+Un reclamador toma lotes de pendientes con find_one_and_update (un lease
+con token propio por reclamo) y los reparte entre workers async. El
+worker renueva el lease al empezar y durante la entrega, así un envío
+lento no queda a merced de otra instancia. Cada intento queda
+registrado; los fallos transitorios se reintentan con backoff
+exponencial y los definitivos quedan en FAILED para reenviarlos desde
+admin.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Deque, List, Optional
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+from pymongo import ASCENDING, ReturnDocument
+
+from app.core.config import settings
+from app.models.email_outbox_model import (
+    EmailOutboxMessage,
+    EmailOutboxStatus,
+    EmailOutboxSummary,
+    EmailDeliveryAttempt
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryResult(BaseModel):
+    """Resultado de un intento de entrega"""
+    success: bool
+    retryable: bool = False
+    error: Optional[str] = None
+
+
+DeliverFunc = Callable[[EmailOutboxMessage], Awaitable[DeliveryResult]]
+
+
+class EmailOutbox:
+    """Reclamo con lease, workers, reintentos y métricas de la cola de emails"""
+
+    def __init__(self):
+        # Prefijo de los tokens de lease de esta instancia
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._workers: List[asyncio.Task] = []
+        self._deliver: Optional[DeliverFunc] = None
+        self._in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self._counters = {"enqueued": 0, "claimed": 0, "sent": 0, "failed": 0, "retried": 0, "lease_lost": 0}
+
+    def start(self, deliver: DeliverFunc):
+        """Inicia el reclamador y los workers (llamar en el startup de la API)"""
+        if self._workers:
+            return
+        self._deliver = deliver
+        self._queue = asyncio.Queue(maxsize=settings.EMAIL_CLAIM_BATCH_SIZE)
+        self._wakeup = asyncio.Event()
+        self._poller = asyncio.create_task(self._poll(), name="email-outbox-poller")
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"email-worker-{i}")
+            for i in range(settings.EMAIL_WORKERS)
+        ]
+        logger.info(f"Email outbox started ({self.worker_id}) with {settings.EMAIL_WORKERS} workers")
+
+    async def stop(self, timeout: float = 10):
+        """
+        Deja de reclamar y espera (hasta timeout) a que se entreguen los ya
+        reclamados. Lo que quede sin entregar se retoma al vencer el lease.
+        """
+        if not self._workers:
+            return
+        self._poller.cancel()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Email outbox stopped with {self._queue.qsize()} claimed messages pending")
+
+        for task in [self._poller, *self._workers]:
+            task.cancel()
+        await asyncio.gather(self._poller, *self._workers, return_exceptions=True)
+        self._poller = None
+        self._workers = []
+
+    async def enqueue(self, message: EmailOutboxMessage) -> bool:
+        """Guarda el email como pendiente y despierta al reclamador"""
+        await message.insert()
+        self._counters["enqueued"] += 1
+        if self._wakeup:
+            self._wakeup.set()
+        return True
+
+    async def enqueue_many(self, messages: List[EmailOutboxMessage]) -> int:
+        """Guarda varios emails con un solo insert_many (avisos masivos)"""
+        if not messages:
+            return 0
+        await EmailOutboxMessage.insert_many(messages)
+        self._counters["enqueued"] += len(messages)
+        if self._wakeup:
+            self._wakeup.set()
+        return len(messages)
+
+    # ==================== RECLAMO Y ENTREGA ====================
+
+    async def claim(self) -> Optional[EmailOutboxMessage]:
+        """
+        Reclama un email listo para enviar: pendiente con next_attempt_at
+        vencido, o en envío con el lease vencido (worker caído). Cada
+        reclamo lleva su propio token en lease_owner: un reclamo anterior
+        del mismo email ya no puede registrar su resultado.
+        """
+        now = datetime.now(timezone.utc)
+        doc = await EmailOutboxMessage.get_pymongo_collection().find_one_and_update(
+            {"$or": [
+                {"status": EmailOutboxStatus.PENDING.value, "next_attempt_at": {"$lte": now}},
+                {"status": EmailOutboxStatus.SENDING.value, "lease_until": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": EmailOutboxStatus.SENDING.value,
+                    "lease_owner": f"{self.worker_id}:{uuid.uuid4().hex}",
+                    "lease_until": now + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return EmailOutboxMessage.model_validate(doc) if doc else None
+
+    async def claim_batch(self, limit: int) -> List[EmailOutboxMessage]:
+        """Reclama hasta limit emails, uno por find_one_and_update (atómico entre instancias)"""
+        claimed = []
+        while len(claimed) < limit:
+            message = await self.claim()
+            if not message:
+                break
+            claimed.append(message)
+        self._counters["claimed"] += len(claimed)
+        return claimed
+
+    async def _poll(self):
+        while True:
+            # Limpiar antes de reclamar: un enqueue durante el reclamo no se pierde
+            self._wakeup.clear()
+            capacity = self._queue.maxsize - self._queue.qsize()
+            claimed = []
+            if capacity > 0:
+                try:
+                    claimed = await self.claim_batch(capacity)
+                except Exception as e:
+                    logger.error(f"Error claiming outbox emails: {str(e)}")
+
+            for message in claimed:
+                self._queue.put_nowait(message)
+
+            if claimed and len(claimed) == capacity:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._process(message)
+            except Exception as e:
+                logger.error(f"Unexpected error delivering '{message.kind}' email {message.id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+                self._wakeup.set()
+
+    async def _process(self, message: EmailOutboxMessage):
+        # Mientras esperaba en la cola el lease pudo vencer y otra instancia retomarlo
+        if not await self._renew_lease(message):
+            self._counters["lease_lost"] += 1
+            logger.warning(f"Lease lost for '{message.kind}' email {message.id} before delivery, skipped")
+            return
+
+        self._in_flight += 1
+        heartbeat = asyncio.create_task(self._heartbeat(message))
+        started = time.perf_counter()
+        try:
+            result = await self._deliver(message)
+        except Exception as e:
+            result = DeliveryResult(success=False, retryable=True, error=str(e))
+        finally:
+            heartbeat.cancel()
+            self._in_flight -= 1
+        duration = time.perf_counter() - started
+        self._latencies.append(duration)
+
+        await self._record(message, result, duration)
+
+    async def _renew_lease(self, message: EmailOutboxMessage) -> bool:
+        """Extiende el lease del reclamo. Returns: False si ya no es de este reclamo"""
+        result = await EmailOutboxMessage.get_pymongo_collection().update_one(
+            {"_id": message.id, "lease_owner": message.lease_owner, "status": EmailOutboxStatus.SENDING.value},
+            {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)}}
+        )
+        return result.matched_count > 0
+
+    async def _heartbeat(self, message: EmailOutboxMessage):
+        """Renueva el lease cada tercio de EMAIL_LEASE_SECONDS mientras dura la entrega"""
+        while True:
+            await asyncio.sleep(settings.EMAIL_LEASE_SECONDS / 3)
+            if not await self._renew_lease(message):
+                logger.warning(f"Lease lost for '{message.kind}' email {message.id} during delivery")
+                return
+
+    async def _record(self, message: EmailOutboxMessage, result: DeliveryResult, duration: float):
+        """Registra el intento y deja el email en SENT, PENDING (reintento) o FAILED"""
+        now = datetime.now(timezone.utc)
+        attempt = EmailDeliveryAttempt(
+            attempted_at=now,
+            success=result.success,
+            error=result.error,
+            duration_ms=round(duration * 1000, 1)
+        )
+        fields = {"lease_owner": None, "lease_until": None, "last_error": result.error}
+
+        if result.success:
+            counter = "sent"
+            fields.update(
+                status=EmailOutboxStatus.SENT.value,
+                sent_at=now,
+                expires_at=now + timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+            )
+        elif result.retryable and message.attempts < settings.EMAIL_MAX_ATTEMPTS:
+            counter = "retried"
+            delay = settings.EMAIL_RETRY_BASE_SECONDS * (2 ** (message.attempts - 1))
+            fields.update(status=EmailOutboxStatus.PENDING.value, next_attempt_at=now + timedelta(seconds=delay))
+            logger.warning(
+                f"'{message.kind}' email to {message.to_email} failed (attempt {message.attempts}), "
+                f"retrying in {delay:.0f}s: {result.error}"
+            )
+        else:
+            counter = "failed"
+            fields.update(status=EmailOutboxStatus.FAILED.value)
+            logger.error(f"'{message.kind}' email to {message.to_email} failed permanently: {result.error}")
+
+        # Solo el reclamo dueño del lease registra el resultado
+        update = await EmailOutboxMessage.get_pymongo_collection().update_one(
+            {"_id": message.id, "lease_owner": message.lease_owner, "status": EmailOutboxStatus.SENDING.value},
+            {
+                "$set": fields,
+                "$push": {"attempt_log": {
+                    "$each": [attempt.model_dump()],
+                    "$slice": -settings.EMAIL_ATTEMPT_LOG_SIZE
+                }}
+            }
+        )
+        if update.matched_count:
+            self._counters[counter] += 1
+        else:
+            self._counters["lease_lost"] += 1
+            logger.warning(f"Lease lost for '{message.kind}' email {message.id}, result not recorded")
+
+    # ==================== ADMIN ====================
+
+    async def list_failed(self, kind: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[EmailOutboxSummary]:
+        """Emails en FAILED, los más recientes primero"""
+        filters = {"status": EmailOutboxStatus.FAILED.value}
+        if kind:
+            filters["kind"] = kind
+        return await EmailOutboxMessage.find(filters).sort("-created_at").skip(skip).limit(limit).project(EmailOutboxSummary).to_list()
+
+    async def replay(self, message_id: PydanticObjectId) -> bool:
+        """Vuelve a poner en cola un email fallido, con el presupuesto de reintentos completo"""
+        result = await EmailOutboxMessage.get_pymongo_collection().update_one(
+            {"_id": message_id, "status": EmailOutboxStatus.FAILED.value},
+            {"$set": self._replay_fields()}
+        )
+        self._notify()
+        return result.modified_count > 0
+
+    async def replay_failed(self, kind: Optional[str] = None) -> int:
+        """Vuelve a poner en cola todos los fallidos (opcionalmente de un tipo)"""
+        filters = {"status": EmailOutboxStatus.FAILED.value}
+        if kind:
+            filters["kind"] = kind
+        result = await EmailOutboxMessage.get_pymongo_collection().update_many(filters, {"$set": self._replay_fields()})
+        self._notify()
+        return result.modified_count
+
+    @staticmethod
+    def _replay_fields() -> dict:
+        return {
+            "status": EmailOutboxStatus.PENDING.value,
+            "attempts": 0,
+            "next_attempt_at": datetime.now(timezone.utc)
+        }
+
+    def _notify(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def stats(self) -> dict:
+        """Métricas: emails por estado, contadores de esta instancia y latencia de envío"""
+        by_status = await EmailOutboxMessage.get_pymongo_collection().aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+
+        latencies = sorted(self._latencies)
+        return {
+            "worker_id": self.worker_id,
+            "workers": len(self._workers),
+            "by_status": {status.value: 0 for status in EmailOutboxStatus} | {s["_id"]: s["count"] for s in by_status},
+            "claimed_queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self._in_flight,
+            **self._counters,
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "latency_p95_ms": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 1) if latencies else 0.0
+        }
+
+
+# Instancia global
+email_outbox = EmailOutbox()
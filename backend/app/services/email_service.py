@@ -1,13 +1,24 @@
 """
 Servicio de envío de emails usando SendGrid
+
+Los métodos send_* renderizan el email y lo guardan en la colección
+email_outbox; la entrega a SendGrid (deliver) la hacen los workers de la
+cola.
 """
+import asyncio
 import logging
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
+from beanie import PydanticObjectId
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
 from app.core.config import settings
 from app.models.orders_model import Order, OrderItem
+from app.models.product_model import Product
+from app.models.email_outbox_model import EmailOutboxMessage
+from app.services.email_outbox import email_outbox, DeliveryResult
+from app.services import email_templates as templates
+from app.services.email_templates import Markup, money, render_if
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +30,7 @@ class EmailService:
         self.api_key = settings.SENDGRID_API_KEY
         self.from_email = settings.EMAIL_FROM
         self.from_name = settings.EMAIL_FROM_NAME
-        self.sg = SendGridAPIClient(self.api_key) if self.api_key else None
+        self.sg = SendGridAPIClient(self.api_key, host=settings.SENDGRID_API_HOST) if self.api_key else None
 
     async def send_order_confirmation(self, order: Order, user_name: str) -> bool:
         """
@@ -33,7 +44,9 @@ class EmailService:
             return await self._send_email(
                 to_email=order.user_email,
                 subject=subject,
-                html_content=html_content
+                html_content=html_content,
+                kind="order_confirmation",
+                order_id=order.id
             )
 
         except Exception as e:
@@ -52,7 +65,9 @@ class EmailService:
             return await self._send_email(
                 to_email=order.user_email,
                 subject=subject,
-                html_content=html_content
+                html_content=html_content,
+                kind="payment_confirmation",
+                order_id=order.id
             )
 
         except Exception as e:
@@ -76,7 +91,9 @@ class EmailService:
             return await self._send_email(
                 to_email=order.user_email,
                 subject=subject,
-                html_content=html_content
+                html_content=html_content,
+                kind="shipping_notification",
+                order_id=order.id
             )
 
         except Exception as e:
@@ -95,184 +112,204 @@ class EmailService:
             return await self._send_email(
                 to_email=email,
                 subject=subject,
-                html_content=html_content
+                html_content=html_content,
+                kind="welcome"
             )
 
         except Exception as e:
             logger.error(f"Error sending welcome email: {str(e)}")
             return False
 
+    async def send_back_in_stock_alerts(self, recipients: List[Tuple[str, str]], product: Product) -> int:
+        """
+        Encola en bloque el aviso de producto disponible.
+        recipients: (email, nombre) de cada destinatario
+        Returns: cantidad de emails encolados
+        """
+        try:
+            subject = f"¡{product.name} está disponible de nuevo!"
+            context = self._product_alert_context(product)
+            html_contents = templates.BACK_IN_STOCK.render_many(
+                {**context, "name": name} for _, name in recipients
+            )
+            return await self._send_many(recipients, subject, html_contents, kind="back_in_stock")
+
+        except Exception as e:
+            logger.error(f"Error sending back in stock alerts: {str(e)}")
+            return 0
+
+    async def send_price_drop_alerts(self, recipients: List[Tuple[str, str]], product: Product, old_price: float) -> int:
+        """
+        Encola en bloque el aviso de baja de precio.
+        recipients: (email, nombre) de cada destinatario
+        Returns: cantidad de emails encolados
+        """
+        try:
+            subject = f"¡{product.name} bajó de precio!"
+            context = {**self._product_alert_context(product), "old_price": money(old_price)}
+            html_contents = templates.PRICE_DROP.render_many(
+                {**context, "name": name} for _, name in recipients
+            )
+            return await self._send_many(recipients, subject, html_contents, kind="price_drop")
+
+        except Exception as e:
+            logger.error(f"Error sending price drop alerts: {str(e)}")
+            return 0
+
+    async def _send_many(
+        self,
+        recipients: List[Tuple[str, str]],
+        subject: str,
+        html_contents: List[str],
+        kind: str
+    ) -> int:
+        """
+        Guarda un lote de emails en la cola de salida con un solo insert.
+        Returns: cantidad de emails encolados
+        """
+        if not self.sg:
+            logger.warning("SendGrid not configured, emails not sent")
+            return 0
+
+        return await email_outbox.enqueue_many([
+            EmailOutboxMessage(to_email=email, subject=subject, html_content=html_content, kind=kind)
+            for (email, _), html_content in zip(recipients, html_contents)
+        ])
+
     async def _send_email(
         self,
         to_email: str,
         subject: str,
         html_content: str,
-        cc: Optional[List[str]] = None
+        cc: Optional[List[str]] = None,
+        kind: str = "generic",
+        order_id: Optional[PydanticObjectId] = None
     ) -> bool:
-        """Envía un email usando SendGrid"""
+        """
+        Guarda un email en la cola de salida.
+        Returns: True si quedó en la cola
+        """
         if not self.sg:
             logger.warning("SendGrid not configured, email not sent")
             return False
 
+        return await email_outbox.enqueue(EmailOutboxMessage(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            cc=cc,
+            kind=kind,
+            order_id=order_id
+        ))
+
+    async def deliver(self, email: EmailOutboxMessage) -> DeliveryResult:
+        """
+        Entrega un email a SendGrid (usado por los workers de la cola).
+        La llamada HTTP bloqueante del cliente corre en un hilo.
+        """
+        if not self.sg:
+            return DeliveryResult(success=False, error="SendGrid not configured")
+
         try:
             message = Mail(
                 from_email=Email(self.from_email, self.from_name),
-                to_emails=To(to_email),
-                subject=subject,
-                html_content=Content("text/html", html_content)
+                to_emails=To(email.to_email),
+                subject=email.subject,
+                html_content=Content("text/html", email.html_content)
             )
 
-            if cc:
-                message.add_cc(cc)
+            if email.cc:
+                message.add_cc(email.cc)
+
+        except Exception as e:
+            return DeliveryResult(success=False, error=str(e))
 
-            response = self.sg.send(message)
+        result = await self._post_mail(message.get())
+        if result.success:
+            logger.info(f"Email sent successfully to {email.to_email}")
+        return result
 
-            if response.status_code in [200, 201, 202]:
-                logger.info(f"Email sent successfully to {to_email}")
-                return True
-            else:
-                logger.error(f"SendGrid error: {response.status_code} - {response.body}")
-                return False
+    async def send_batch(self, subject: str, html_content: str, personalizations: List[Dict]) -> DeliveryResult:
+        """
+        Envía un mismo email a varios destinatarios en una sola llamada
+        (hasta 1000 personalizations, cada una con sus substitutions).
+        """
+        if not self.sg:
+            return DeliveryResult(success=False, error="SendGrid not configured")
+
+        return await self._post_mail({
+            "personalizations": personalizations,
+            "from": {"email": self.from_email, "name": self.from_name},
+            "subject": subject,
+            "content": [{"type": "text/html", "value": html_content}]
+        })
+
+    async def _post_mail(self, body: Dict) -> DeliveryResult:
+        """POST /v3/mail/send en un hilo (el cliente de SendGrid es bloqueante)"""
+        try:
+            response = await asyncio.to_thread(self.sg.client.mail.send.post, request_body=body)
 
         except Exception as e:
-            logger.error(f"Error sending email via SendGrid: {str(e)}")
-            return False
+            # Errores HTTP de SendGrid: 4xx (salvo 429) no se reintentan
+            status_code = getattr(e, "status_code", None)
+            retryable = status_code is None or status_code == 429 or status_code >= 500
+            return DeliveryResult(success=False, retryable=retryable, error=str(e))
+
+        if response.status_code in [200, 201, 202]:
+            return DeliveryResult(success=True)
+
+        return DeliveryResult(
+            success=False,
+            retryable=response.status_code == 429 or response.status_code >= 500,
+            error=f"SendGrid error: {response.status_code} - {response.body}"
+        )
+
+    def _button(self, path: str, label: str) -> Markup:
+        """Botón de llamada a la acción hacia el frontend"""
+        return templates.BUTTON.render(url=f"{settings.FRONTEND_URL}{path}", label=label)
 
     def _render_order_confirmation(self, order: Order, user_name: str) -> str:
         """Renderiza el HTML del email de confirmación de orden"""
-        items_html = ""
-        for item in order.items:
-            variant_info = f" ({item.variant_info})" if item.variant_info else ""
-            items_html += f"""
-            <tr>
-                <td style="padding: 10px; border-bottom: 1px solid #eee;">
-                    {item.product_name}{variant_info}
-                </td>
-                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: center;">
-                    {item.quantity}
-                </td>
-                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">
-                    ${item.price:.2f}
-                </td>
-                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">
-                    ${item.subtotal:.2f}
-                </td>
-            </tr>
-            """
-
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: #000; color: #fff; padding: 20px; text-align: center;">
-                <h1 style="margin: 0;">CALERO</h1>
-            </div>
-
-            <div style="padding: 30px; background: #f9f9f9;">
-                <h2>¡Gracias por tu orden, {user_name}!</h2>
-                <p>Hemos recibido tu orden <strong>#{order.id}</strong> y está siendo procesada.</p>
-
-                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
-                    <h3>Resumen de Orden</h3>
-                    <table style="width: 100%; border-collapse: collapse;">
-                        <thead>
-                            <tr style="background: #f0f0f0;">
-                                <th style="padding: 10px; text-align: left;">Producto</th>
-                                <th style="padding: 10px; text-align: center;">Cantidad</th>
-                                <th style="padding: 10px; text-align: right;">Precio</th>
-                                <th style="padding: 10px; text-align: right;">Subtotal</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {items_html}
-                        </tbody>
-                    </table>
-
-                    <div style="margin-top: 20px; padding-top: 10px; border-top: 2px solid #000;">
-                        <table style="width: 100%;">
-                            <tr>
-                                <td style="text-align: right; padding: 5px;"><strong>Subtotal:</strong></td>
-                                <td style="text-align: right; padding: 5px;">${order.subtotal:.2f}</td>
-                            </tr>
-                            {f'''<tr>
-                                <td style="text-align: right; padding: 5px;"><strong>Descuento:</strong></td>
-                                <td style="text-align: right; padding: 5px; color: green;">-${order.discount_amount:.2f}</td>
-                            </tr>''' if order.discount_amount > 0 else ''}
-                            <tr>
-                                <td style="text-align: right; padding: 5px;"><strong>Envío:</strong></td>
-                                <td style="text-align: right; padding: 5px;">${order.shipping_cost:.2f}</td>
-                            </tr>
-                            <tr style="font-size: 1.2em;">
-                                <td style="text-align: right; padding: 10px;"><strong>TOTAL:</strong></td>
-                                <td style="text-align: right; padding: 10px;"><strong>${order.total_amount:.2f}</strong></td>
-                            </tr>
-                        </table>
-                    </div>
-                </div>
-
-                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
-                    <h3>Dirección de Envío</h3>
-                    <p>
-                        {order.shipping_address.street}<br>
-                        {order.shipping_address.city}, {order.shipping_address.state}<br>
-                        {order.shipping_address.country} {order.shipping_address.zip_code or ''}
-                    </p>
-                </div>
-
-                <p style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.FRONTEND_URL}/mi-cuenta/ordenes/{order.id}"
-                       style="background: #000; color: #fff; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Ver Estado de Orden
-                    </a>
-                </p>
-            </div>
-
-            <div style="text-align: center; padding: 20px; color: #666; font-size: 0.9em;">
-                <p>Si tienes alguna pregunta, contáctanos respondiendo a este email.</p>
-                <p>&copy; 2026 CALERO. Todos los derechos reservados.</p>
-            </div>
-        </body>
-        </html>
-        """
+        items = templates.ORDER_ITEM_ROW.render_each(
+            {
+                "product_name": item.product_name,
+                "variant_info": f" ({item.variant_info})" if item.variant_info else "",
+                "quantity": item.quantity,
+                "price": money(item.price),
+                "subtotal": money(item.subtotal)
+            }
+            for item in order.items
+        )
+
+        address = order.shipping_address
+        return templates.ORDER_CONFIRMATION.render(
+            user_name=user_name,
+            order_id=order.id,
+            items=items,
+            subtotal=money(order.subtotal),
+            discount_row=render_if(
+                order.discount_amount > 0,
+                templates.ORDER_DISCOUNT_ROW,
+                discount=money(order.discount_amount)
+            ),
+            shipping_cost=money(order.shipping_cost),
+            total_amount=money(order.total_amount),
+            street=address.street,
+            city=address.city,
+            state=address.state,
+            country=address.country,
+            zip_code=address.zip_code,
+            button=self._button(f"/mi-cuenta/ordenes/{order.id}", "Ver Estado de Orden")
+        )
 
     def _render_payment_confirmation(self, order: Order, user_name: str) -> str:
         """Renderiza el HTML del email de confirmación de pago"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: #4CAF50; color: #fff; padding: 20px; text-align: center;">
-                <h1 style="margin: 0;">✓ ¡Pago Confirmado!</h1>
-            </div>
-
-            <div style="padding: 30px; background: #f9f9f9;">
-                <h2>Hola {user_name},</h2>
-                <p>¡Excelentes noticias! Tu pago ha sido confirmado exitosamente.</p>
-
-                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
-                    <h3>Orden #{order.id}</h3>
-                    <p style="font-size: 1.5em; color: #4CAF50; margin: 20px 0;">
-                        <strong>${order.total_amount:.2f}</strong>
-                    </p>
-                    <p>Estado: <strong style="color: #4CAF50;">PAGADO</strong></p>
-                </div>
-
-                <p>Tu orden está siendo preparada para envío. Te notificaremos cuando sea despachada.</p>
-
-                <p style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.FRONTEND_URL}/mi-cuenta/ordenes/{order.id}"
-                       style="background: #000; color: #fff; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Ver Detalles de Orden
-                    </a>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
+        return templates.PAYMENT_CONFIRMATION.render(
+            user_name=user_name,
+            order_id=order.id,
+            total_amount=money(order.total_amount),
+            button=self._button(f"/mi-cuenta/ordenes/{order.id}", "Ver Detalles de Orden")
+        )
 
     def _render_shipping_notification(
         self,
@@ -281,90 +318,47 @@ class EmailService:
         tracking_url: Optional[str]
     ) -> str:
         """Renderiza el HTML del email de notificación de envío"""
-        tracking_section = ""
-        if order.tracking_number:
-            tracking_section = f"""
-            <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
-                <h3>Número de Rastreo</h3>
-                <p style="font-size: 1.3em; font-family: monospace; background: #f0f0f0; padding: 10px;">
-                    {order.tracking_number}
-                </p>
-                {f'<a href="{tracking_url}" style="color: #007bff;">Rastrear Envío</a>' if tracking_url else ''}
-            </div>
-            """
-
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: #2196F3; color: #fff; padding: 20px; text-align: center;">
-                <h1 style="margin: 0;">📦 ¡Tu Orden está en Camino!</h1>
-            </div>
-
-            <div style="padding: 30px; background: #f9f9f9;">
-                <h2>Hola {user_name},</h2>
-                <p>¡Buenas noticias! Tu orden <strong>#{order.id}</strong> ha sido enviada.</p>
-
-                {tracking_section}
-
-                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
-                    <h3>Información de Envío</h3>
-                    <p><strong>Transportista:</strong> {order.carrier or 'Por confirmar'}</p>
-                    <p><strong>Método:</strong> {order.shipping_method_name or 'Estándar'}</p>
-                    {f'<p><strong>Entrega Estimada:</strong> {order.estimated_delivery.strftime("%d %b %Y")}</p>' if order.estimated_delivery else ''}
-                </div>
-
-                <p style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.FRONTEND_URL}/mi-cuenta/ordenes/{order.id}"
-                       style="background: #000; color: #fff; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Ver Estado de Envío
-                    </a>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
+        tracking_section = render_if(
+            order.tracking_number,
+            templates.SHIPPING_TRACKING,
+            tracking_number=order.tracking_number,
+            tracking_link=render_if(tracking_url, templates.SHIPPING_TRACKING_LINK, tracking_url=tracking_url)
+        )
+
+        return templates.SHIPPING_NOTIFICATION.render(
+            user_name=user_name,
+            order_id=order.id,
+            tracking_section=tracking_section,
+            carrier=order.carrier or "Por confirmar",
+            shipping_method=order.shipping_method_name or "Estándar",
+            estimated_delivery=render_if(
+                order.estimated_delivery,
+                templates.SHIPPING_ESTIMATED_DELIVERY,
+                estimated_delivery=order.estimated_delivery.strftime("%d %b %Y") if order.estimated_delivery else None
+            ),
+            button=self._button(f"/mi-cuenta/ordenes/{order.id}", "Ver Estado de Envío")
+        )
 
     def _render_welcome_email(self, name: str) -> str:
         """Renderiza el HTML del email de bienvenida"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: #000; color: #fff; padding: 30px; text-align: center;">
-                <h1 style="margin: 0; font-size: 2.5em;">CALERO</h1>
-                <p style="margin: 10px 0 0 0;">Productos Artesanales</p>
-            </div>
-
-            <div style="padding: 30px; background: #f9f9f9;">
-                <h2>¡Bienvenido, {name}!</h2>
-                <p>Gracias por unirte a la familia CALERO. Estamos emocionados de tenerte con nosotros.</p>
-
-                <p>En CALERO encontrarás productos artesanales de la más alta calidad, hechos con amor y dedicación.</p>
-
-                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
-                    <h3>¿Qué sigue?</h3>
-                    <ul style="line-height: 2;">
-                        <li>Explora nuestro catálogo de productos</li>
-                        <li>Agrega tus favoritos a la wishlist</li>
-                        <li>Disfruta de envíos gratis en compras sobre $50</li>
-                    </ul>
-                </div>
-
-                <p style="text-align: center; margin-top: 30px;">
-                    <a href="{settings.FRONTEND_URL}/productos"
-                       style="background: #000; color: #fff; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                        Comenzar a Comprar
-                    </a>
-                </p>
-            </div>
-
-            <div style="text-align: center; padding: 20px; color: #666; font-size: 0.9em;">
-                <p>&copy; 2026 CALERO. Todos los derechos reservados.</p>
-            </div>
-        </body>
-        </html>
-        """
+        return templates.WELCOME.render(
+            name=name,
+            button=self._button("/productos", "Comenzar a Comprar")
+        )
+
+    def _product_alert_context(self, product: Product) -> dict:
+        """Campos comunes a todos los destinatarios de un aviso de wishlist"""
+        return {
+            "product_name": product.name,
+            "price": money(product.base_price),
+            "image": render_if(
+                product.main_image,
+                templates.PRODUCT_IMAGE,
+                image_url=product.main_image,
+                product_name=product.name
+            ),
+            "button": self._button(f"/productos/{product.id}", "Ver Producto")
+        }
 
 
 # Instancia global
@@ -0,0 +1,372 @@
+"""
+Plantillas HTML de los emails
+
+Cada plantilla se compila una sola vez al importar el módulo: el texto
+se parte en literales (la parte estática, ya lista) y campos $nombre.
+Renderizar es solo unir los literales con los valores, escapados como
+HTML salvo que ya sean Markup (HTML seguro, p. ej. otra plantilla
+renderizada). Los bucles se arman con render_each sobre una plantilla
+de fila; render_many renderiza muchos emails para envíos masivos.
+
+Se usa string.Template de la librería estándar para no agregar una
+dependencia de motor de plantillas.
+"""
+import html
+from string import Template
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+
+class Markup(str):
+    """HTML seguro: no se vuelve a escapar al insertarlo en una plantilla"""
+
+
+def escape(value: Any) -> Markup:
+    """Escapa un valor como HTML (Markup se deja igual, None queda vacío)"""
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return Markup("")
+    return Markup(html.escape(str(value), quote=True))
+
+
+def money(amount: float) -> str:
+    """Formatea un monto como $0.00"""
+    return f"${amount:.2f}"
+
+
+class EmailTemplate:
+    """Plantilla compilada con campos $nombre / ${nombre} autoescapados"""
+
+    def __init__(self, source: str):
+        self.fields: Tuple[str, ...] = ()
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        self._compile(source)
+
+    def _compile(self, source: str):
+        parts = []
+        literal = []
+        position = 0
+        for match in Template.pattern.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+
+            if match.group("escaped") is not None:
+                literal.append("$")
+                continue
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                raise ValueError(f"Invalid placeholder in email template at position {match.start()}")
+
+            parts.append(("".join(literal), name))
+            literal = []
+
+        literal.append(source[position:])
+        parts.append(("".join(literal), None))
+
+        self._parts = parts
+        self.fields = tuple(dict.fromkeys(name for _, name in parts if name))
+
+    def render(self, context: Optional[Mapping[str, Any]] = None, **values: Any) -> Markup:
+        """Renderiza la plantilla; un campo faltante lanza KeyError"""
+        if context:
+            values = {**context, **values}
+        chunks = []
+        append = chunks.append
+        for literal, name in self._parts:
+            append(literal)
+            if name is not None:
+                value = values[name]
+                if isinstance(value, Markup):
+                    append(value)
+                elif value is not None:
+                    append(html.escape(str(value), quote=True))
+        return Markup("".join(chunks))
+
+    def render_each(self, rows: Iterable[Mapping[str, Any]]) -> Markup:
+        """Bucle: renderiza la plantilla por cada fila y concatena el resultado"""
+        return Markup("".join(self.render(row) for row in rows))
+
+    def render_many(self, contexts: Iterable[Mapping[str, Any]]) -> List[Markup]:
+        """Renderizado masivo: un HTML por contexto, reutilizando la compilación"""
+        return [self.render(context) for context in contexts]
+
+
+def render_if(condition: Any, template: EmailTemplate, **values: Any) -> Markup:
+    """Sección condicional: la plantilla renderizada o vacío"""
+    return template.render(values) if condition else Markup("")
+
+
+# ==================== PLANTILLAS ====================
+
+BUTTON = EmailTemplate("""
+                <p style="text-align: center; margin-top: 30px;">
+                    <a href="$url"
+                       style="background: #000; color: #fff; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
+                        $label
+                    </a>
+                </p>""")
+
+ORDER_ITEM_ROW = EmailTemplate("""
+            <tr>
+                <td style="padding: 10px; border-bottom: 1px solid #eee;">
+                    $product_name$variant_info
+                </td>
+                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: center;">
+                    $quantity
+                </td>
+                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">
+                    $price
+                </td>
+                <td style="padding: 10px; border-bottom: 1px solid #eee; text-align: right;">
+                    $subtotal
+                </td>
+            </tr>
+            """)
+
+ORDER_DISCOUNT_ROW = EmailTemplate("""<tr>
+                                <td style="text-align: right; padding: 5px;"><strong>Descuento:</strong></td>
+                                <td style="text-align: right; padding: 5px; color: green;">-$discount</td>
+                            </tr>""")
+
+ORDER_CONFIRMATION = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        </head>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #000; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">CALERO</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>¡Gracias por tu orden, $user_name!</h2>
+                <p>Hemos recibido tu orden <strong>#$order_id</strong> y está siendo procesada.</p>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
+                    <h3>Resumen de Orden</h3>
+                    <table style="width: 100%; border-collapse: collapse;">
+                        <thead>
+                            <tr style="background: #f0f0f0;">
+                                <th style="padding: 10px; text-align: left;">Producto</th>
+                                <th style="padding: 10px; text-align: center;">Cantidad</th>
+                                <th style="padding: 10px; text-align: right;">Precio</th>
+                                <th style="padding: 10px; text-align: right;">Subtotal</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            $items
+                        </tbody>
+                    </table>
+
+                    <div style="margin-top: 20px; padding-top: 10px; border-top: 2px solid #000;">
+                        <table style="width: 100%;">
+                            <tr>
+                                <td style="text-align: right; padding: 5px;"><strong>Subtotal:</strong></td>
+                                <td style="text-align: right; padding: 5px;">$subtotal</td>
+                            </tr>
+                            $discount_row
+                            <tr>
+                                <td style="text-align: right; padding: 5px;"><strong>Envío:</strong></td>
+                                <td style="text-align: right; padding: 5px;">$shipping_cost</td>
+                            </tr>
+                            <tr style="font-size: 1.2em;">
+                                <td style="text-align: right; padding: 10px;"><strong>TOTAL:</strong></td>
+                                <td style="text-align: right; padding: 10px;"><strong>$total_amount</strong></td>
+                            </tr>
+                        </table>
+                    </div>
+                </div>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
+                    <h3>Dirección de Envío</h3>
+                    <p>
+                        $street<br>
+                        $city, $state<br>
+                        $country $zip_code
+                    </p>
+                </div>
+$button
+            </div>
+
+            <div style="text-align: center; padding: 20px; color: #666; font-size: 0.9em;">
+                <p>Si tienes alguna pregunta, contáctanos respondiendo a este email.</p>
+                <p>&copy; 2026 CALERO. Todos los derechos reservados.</p>
+            </div>
+        </body>
+        </html>
+        """)
+
+PAYMENT_CONFIRMATION = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #4CAF50; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">✓ ¡Pago Confirmado!</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>Hola $user_name,</h2>
+                <p>¡Excelentes noticias! Tu pago ha sido confirmado exitosamente.</p>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
+                    <h3>Orden #$order_id</h3>
+                    <p style="font-size: 1.5em; color: #4CAF50; margin: 20px 0;">
+                        <strong>$total_amount</strong>
+                    </p>
+                    <p>Estado: <strong style="color: #4CAF50;">PAGADO</strong></p>
+                </div>
+
+                <p>Tu orden está siendo preparada para envío. Te notificaremos cuando sea despachada.</p>
+$button
+            </div>
+        </body>
+        </html>
+        """)
+
+SHIPPING_TRACKING = EmailTemplate("""
+            <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
+                <h3>Número de Rastreo</h3>
+                <p style="font-size: 1.3em; font-family: monospace; background: #f0f0f0; padding: 10px;">
+                    $tracking_number
+                </p>
+                $tracking_link
+            </div>
+            """)
+
+SHIPPING_TRACKING_LINK = EmailTemplate("""<a href="$tracking_url" style="color: #007bff;">Rastrear Envío</a>""")
+
+SHIPPING_ESTIMATED_DELIVERY = EmailTemplate("""<p><strong>Entrega Estimada:</strong> $estimated_delivery</p>""")
+
+SHIPPING_NOTIFICATION = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #2196F3; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">📦 ¡Tu Orden está en Camino!</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>Hola $user_name,</h2>
+                <p>¡Buenas noticias! Tu orden <strong>#$order_id</strong> ha sido enviada.</p>
+
+                $tracking_section
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
+                    <h3>Información de Envío</h3>
+                    <p><strong>Transportista:</strong> $carrier</p>
+                    <p><strong>Método:</strong> $shipping_method</p>
+                    $estimated_delivery
+                </div>
+$button
+            </div>
+        </body>
+        </html>
+        """)
+
+WELCOME = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #000; color: #fff; padding: 30px; text-align: center;">
+                <h1 style="margin: 0; font-size: 2.5em;">CALERO</h1>
+                <p style="margin: 10px 0 0 0;">Productos Artesanales</p>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>¡Bienvenido, $name!</h2>
+                <p>Gracias por unirte a la familia CALERO. Estamos emocionados de tenerte con nosotros.</p>
+
+                <p>En CALERO encontrarás productos artesanales de la más alta calidad, hechos con amor y dedicación.</p>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px;">
+                    <h3>¿Qué sigue?</h3>
+                    <ul style="line-height: 2;">
+                        <li>Explora nuestro catálogo de productos</li>
+                        <li>Agrega tus favoritos a la wishlist</li>
+                        <li>Disfruta de envíos gratis en compras sobre $$50</li>
+                    </ul>
+                </div>
+$button
+            </div>
+
+            <div style="text-align: center; padding: 20px; color: #666; font-size: 0.9em;">
+                <p>&copy; 2026 CALERO. Todos los derechos reservados.</p>
+            </div>
+        </body>
+        </html>
+        """)
+
+PRODUCT_IMAGE = EmailTemplate("""<img src="$image_url" alt="$product_name" style="max-width: 200px;">""")
+
+BACK_IN_STOCK = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #000; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">¡De vuelta en stock!</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>Hola $name,</h2>
+                <p>Un producto de tu wishlist está disponible de nuevo:</p>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
+                    $image
+                    <h3>$product_name</h3>
+                    <p style="font-size: 1.3em;"><strong>$price</strong></p>
+                </div>
+$button
+            </div>
+        </body>
+        </html>
+        """)
+
+PRICE_DROP = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #4CAF50; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">¡Bajó de precio!</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>Hola $name,</h2>
+                <p>Un producto de tu wishlist ahora tiene mejor precio:</p>
+
+                <div style="background: #fff; padding: 20px; margin: 20px 0; border-radius: 5px; text-align: center;">
+                    $image
+                    <h3>$product_name</h3>
+                    <p style="font-size: 1.3em;">
+                        <span style="text-decoration: line-through; color: #999;">$old_price</span>
+                        <strong>$price</strong>
+                    </p>
+                </div>
+$button
+            </div>
+        </body>
+        </html>
+        """)
+
+# Envíos masivos: -first_name- lo reemplaza SendGrid por destinatario (substitutions)
+MARKETING = EmailTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: #000; color: #fff; padding: 20px; text-align: center;">
+                <h1 style="margin: 0;">CALERO</h1>
+            </div>
+
+            <div style="padding: 30px; background: #f9f9f9;">
+                <h2>Hola -first_name-,</h2>
+                $content
+$button
+            </div>
+
+            <div style="text-align: center; padding: 20px; color: #666; font-size: 0.9em;">
+                <p>&copy; 2026 CALERO. Todos los derechos reservados.</p>
+            </div>
+        </body>
+        </html>
+        """)
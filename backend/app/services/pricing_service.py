@@ -0,0 +1,303 @@
+"""
+Servicio de precios del carrito
+
+Calcula items, ajustes de variantes, cupón y envío con la misma lógica
+para la cotización (/orders/quote) y la creación de órdenes. La
+cotización entrega un token firmado de vida corta que create_order puede
+usar para no volver a calcular precios.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Dict
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
+from jose import jwt, JWTError, ExpiredSignatureError
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.models.orders_model import OrderItem
+from app.models.product_model import Product
+from app.models.user_model import Address
+from app.services.coupon_service import coupon_service
+from app.services.shipping_service import shipping_service, ShippingQuoteResult
+
+logger = logging.getLogger(__name__)
+
+QUOTE_TOKEN_TYPE = "order_quote"
+
+
+class PricedLine(BaseModel):
+    """Línea del carrito con precio y disponibilidad"""
+    item: OrderItem
+    available_stock: int
+    in_stock: bool
+
+
+class PricedCart(BaseModel):
+    """Resultado de calcular precios de un carrito"""
+    lines: List[PricedLine]
+    subtotal: float
+    discount_amount: float = 0
+    shipping_cost: float = 0
+    total_amount: float
+
+    coupon_code: Optional[str] = None
+    coupon_discount_type: Optional[str] = None
+    coupon_discount_value: Optional[float] = None
+    coupon_message: Optional[str] = None
+
+    shipping_method_id: str
+    shipping_method_name: str
+    estimated_days_max: int
+
+    @property
+    def items(self) -> List[OrderItem]:
+        return [line.item for line in self.lines]
+
+    @property
+    def all_in_stock(self) -> bool:
+        return all(line.in_stock for line in self.lines)
+
+
+def resolve_shipping_quote(
+    method_id: Optional[str],
+    address: Address,
+    subtotal: float,
+    weight_kg: float
+) -> ShippingQuoteResult:
+    """
+    Cotiza el método de envío elegido desde la tabla de zonas en memoria.
+    Sin método elegido, usa el más económico disponible para la dirección.
+    """
+    if method_id:
+        quote = shipping_service.quote_method(method_id, address, subtotal, weight_kg)
+        if not quote:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Método de envío no disponible para esta dirección"
+            )
+        return quote
+
+    quotes = shipping_service.quote(address, subtotal, weight_kg)
+    if not quotes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No hay métodos de envío disponibles para esta dirección"
+        )
+    return quotes[0]
+
+
+class PricingService:
+    """Servicio para calcular precios de carritos y emitir cotizaciones"""
+
+    async def load_products(self, items) -> Dict[PydanticObjectId, Product]:
+        """Carga todos los productos del carrito en una sola consulta"""
+        product_ids = list({item.product_id for item in items})
+        products = await Product.find({"_id": {"$in": product_ids}}).to_list()
+        return {p.id: p for p in products}
+
+    async def price_cart(
+        self,
+        items,
+        address: Address,
+        shipping_method_id: Optional[str] = None,
+        coupon_code: Optional[str] = None,
+        require_stock: bool = True
+    ) -> PricedCart:
+        """
+        Calcula el precio de un carrito.
+
+        - require_stock: si es True, falla cuando una línea no tiene stock;
+          si es False (cotización), la línea se marca como no disponible.
+        """
+        products = await self.load_products(items)
+
+        lines = []
+        coupon_lines = []  # (product_id, categoría, subtotal) para el cupón
+        subtotal = 0.0
+        total_weight = 0.0
+
+        for item_in in items:
+            product = products.get(item_in.product_id)
+
+            if not product or not product.is_active:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Producto con ID: {item_in.product_id} no encontrado o no disponible"
+                )
+
+            # Determinar precio y stock según si tiene variantes
+            if product.has_variants and item_in.variant_sku:
+                variant = product.get_variant_by_sku(item_in.variant_sku)
+                if not variant:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Variante '{item_in.variant_sku}' no encontrada para '{product.name}'"
+                    )
+
+                available = variant.stock if variant.is_available else 0
+                stock_error = f"Stock insuficiente para '{product.name}' ({variant.size}/{variant.color}). Disponibles: {variant.stock}"
+                variant_info = f"{variant.size or ''} {variant.color or ''}".strip()
+
+                new_item = OrderItem(
+                    product_id=product.id,
+                    product_name=product.name,
+                    quantity=item_in.quantity,
+                    price=product.base_price + variant.price_adjustment,
+                    variant_sku=variant.sku,
+                    variant_info=variant_info if variant_info else None,
+                    product_image=variant.image_url or product.main_image
+                )
+
+            else:
+                # Producto simple sin variantes
+                available = product.stock or 0
+                stock_error = f"Stock insuficiente para '{product.name}'. Disponibles: {available}"
+
+                new_item = OrderItem(
+                    product_id=product.id,
+                    product_name=product.name,
+                    quantity=item_in.quantity,
+                    price=product.base_price,
+                    product_image=product.main_image
+                )
+
+            in_stock = available >= item_in.quantity
+            if require_stock and not in_stock:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=stock_error
+                )
+
+            lines.append(PricedLine(item=new_item, available_stock=available, in_stock=in_stock))
+            line_total = new_item.price * new_item.quantity
+            coupon_lines.append((str(product.id), product.category, line_total))
+            subtotal += line_total
+            total_weight += (product.weight_kg or 0) * item_in.quantity
+
+        # Calcular envío (tabla de zonas en memoria, sin consultas por cotización)
+        await shipping_service.ensure_fresh()
+        shipping_quote = resolve_shipping_quote(shipping_method_id, address, subtotal, total_weight)
+
+        priced = PricedCart(
+            lines=lines,
+            subtotal=round(subtotal, 2),
+            shipping_cost=round(shipping_quote.cost, 2),
+            total_amount=0,
+            shipping_method_id=shipping_quote.method.id,
+            shipping_method_name=shipping_quote.method.name,
+            estimated_days_max=shipping_quote.method.estimated_days_max
+        )
+
+        if coupon_code:
+            await self._apply_coupon(priced, coupon_code, coupon_lines, subtotal)
+
+        priced.total_amount = round(subtotal - priced.discount_amount + priced.shipping_cost, 2)
+        return priced
+
+    async def _apply_coupon(self, priced: PricedCart, code: str, coupon_lines: list, subtotal: float):
+        """Aplica el cupón al carrito; si no aplica, deja el motivo en coupon_message"""
+        coupon = await coupon_service.get_cached(code)
+
+        if not coupon:
+            priced.coupon_message = "Cupón no encontrado"
+            return
+
+        is_valid, error_msg = coupon.is_valid()
+        if not is_valid:
+            priced.coupon_message = error_msg
+            return
+
+        if coupon.minimum_amount and subtotal < coupon.minimum_amount:
+            priced.coupon_message = f"Compra mínima requerida: ${coupon.minimum_amount:.2f}"
+            return
+
+        # Subtotal de las líneas a las que aplica el cupón
+        eligible_subtotal = coupon.eligible_subtotal(coupon_lines)
+        if eligible_subtotal <= 0:
+            priced.coupon_message = "El cupón no aplica a los productos del carrito"
+            return
+
+        priced.discount_amount = round(coupon.calculate_discount(eligible_subtotal), 2)
+        priced.coupon_code = coupon.code
+        priced.coupon_discount_type = coupon.discount_type.value
+        priced.coupon_discount_value = coupon.discount_value
+
+    # ==================== TOKEN DE COTIZACIÓN ====================
+
+    def create_quote_token(
+        self,
+        priced: PricedCart,
+        user_id: PydanticObjectId,
+        items,
+        address: Address,
+        shipping_method_id: Optional[str],
+        coupon_code: Optional[str]
+    ) -> tuple[str, datetime]:
+        """
+        Firma la cotización para que create_order la acepte sin recalcular.
+        Returns: (token, expira)
+        """
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.QUOTE_TOKEN_EXPIRE_MINUTES)
+        payload = {
+            "type": QUOTE_TOKEN_TYPE,
+            "exp": expires_at,
+            "sub": str(user_id),
+            "fp": self._fingerprint(items, address, shipping_method_id, coupon_code),
+            "cart": priced.model_dump(mode="json")
+        }
+        token = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return (token, expires_at)
+
+    def read_quote_token(
+        self,
+        token: str,
+        user_id: PydanticObjectId,
+        items,
+        address: Address,
+        shipping_method_id: Optional[str],
+        coupon_code: Optional[str]
+    ) -> Optional[PricedCart]:
+        """
+        Recupera la cotización firmada si es del mismo usuario y corresponde
+        exactamente al carrito recibido.
+
+        Returns: None si la cotización expiró (se vuelve a calcular).
+        Raises: 400 si el token no es válido o no corresponde al carrito.
+        """
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except ExpiredSignatureError:
+            return None
+        except JWTError:
+            payload = {}
+
+        if (
+            payload.get("type") != QUOTE_TOKEN_TYPE
+            or payload.get("sub") != str(user_id)
+            or payload.get("fp") != self._fingerprint(items, address, shipping_method_id, coupon_code)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La cotización no corresponde a este carrito. Vuelve a cotizar."
+            )
+
+        return PricedCart.model_validate(payload["cart"])
+
+    @staticmethod
+    def _fingerprint(items, address: Address, shipping_method_id: Optional[str], coupon_code: Optional[str]) -> str:
+        """Huella del carrito: cualquier cambio invalida la cotización"""
+        data = {
+            "items": [[str(i.product_id), i.variant_sku, i.quantity] for i in items],
+            "address": address.model_dump(mode="json"),
+            "shipping_method_id": shipping_method_id,
+            "coupon_code": coupon_service.normalize_code(coupon_code) if coupon_code else None
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# Instancia global
+pricing_service = PricingService()
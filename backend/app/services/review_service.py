@@ -0,0 +1,76 @@
+"""
+Servicio de listado de reviews
+
+La primera página de reviews de cada producto se guarda en cache por
+orden (recent, rating_high, rating_low, helpful), así la pestaña de
+reviews de productos populares no consulta Mongo en cada visita. Toda
+escritura sobre reviews de un producto invalida sus páginas cacheadas.
+"""
+from typing import List, Optional
+from beanie import PydanticObjectId
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.review_model import ProductReview
+
+# Orden de cada sort_by; cada uno tiene su índice compuesto en product_reviews
+REVIEW_SORTS = {
+    "recent": ["-created_at"],
+    "rating_high": ["-rating", "-created_at"],
+    "rating_low": ["+rating", "-created_at"],
+    "helpful": ["-helpful_count", "-created_at"],
+}
+
+
+class ReviewService:
+    """Servicio para listar reviews aprobadas con cache de primera página"""
+
+    def __init__(self):
+        self._first_pages = TTLCache(ttl_seconds=settings.REVIEW_PAGE_CACHE_TTL_SECONDS, max_size=4096)
+
+    async def list_approved(
+        self,
+        product_id: PydanticObjectId,
+        sort_by: str,
+        skip: int,
+        limit: int
+    ) -> List[ProductReview]:
+        """
+        Lista reviews aprobadas de un producto.
+        Las listas retornadas desde cache son compartidas: no deben modificarse.
+        """
+        cacheable = sort_by in REVIEW_SORTS and skip == 0 and limit <= settings.REVIEW_FIRST_PAGE_SIZE
+
+        if cacheable:
+            page = self._first_pages.get((product_id, sort_by))
+            if page is not None:
+                return page[:limit]
+
+        query = ProductReview.find(
+            ProductReview.product_id == product_id,
+            ProductReview.is_approved == True
+        )
+        if sort_by in REVIEW_SORTS:
+            query = query.sort(*REVIEW_SORTS[sort_by])
+
+        if not cacheable:
+            return await query.skip(skip).limit(limit).to_list()
+
+        page = await query.limit(settings.REVIEW_FIRST_PAGE_SIZE).to_list()
+        self._first_pages.set((product_id, sort_by), page)
+        return page[:limit]
+
+    def invalidate_product(self, product_id: Optional[PydanticObjectId]):
+        """Descarta las páginas cacheadas de un producto (llamar tras escribir reviews)"""
+        if product_id is None:
+            return
+        for sort_by in REVIEW_SORTS:
+            self._first_pages.invalidate((product_id, sort_by))
+
+    def cache_stats(self) -> dict:
+        """Métricas del cache de primeras páginas"""
+        return self._first_pages.stats()
+
+
+# Instancia global
+review_service = ReviewService()
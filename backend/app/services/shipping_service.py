@@ -0,0 +1,134 @@
+"""
+Motor de tarifas de envío por zonas
+
+Las ShippingZone activas se cargan en una tabla en memoria indexada por
+departamento y ciudad, así cotizar un envío no requiere consultas a Mongo.
+La tabla se recarga cuando un admin modifica las zonas y, como respaldo
+entre workers, cada SHIPPING_RATES_REFRESH_SECONDS.
+"""
+import logging
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.models.shipping_model import ShippingZone, ShippingMethod, DEFAULT_SHIPPING_METHODS
+from app.models.user_model import Address
+
+logger = logging.getLogger(__name__)
+
+# IDs fijos del frontend (DEFAULT_SHIPPING_METHODS). En una zona con métodos
+# propios se traducen al equivalente: los estándar al más económico y
+# express al más rápido.
+LEGACY_METHOD_IDS = {
+    "standard_ss": "cheapest",
+    "standard_national": "cheapest",
+    "express": "fastest"
+}
+
+
+class ShippingQuoteResult(BaseModel):
+    """Cotización de un método de envío para una dirección"""
+    method: ShippingMethod
+    cost: float
+    zone_name: Optional[str] = None
+
+
+def normalize_place(name: Optional[str]) -> str:
+    """Normaliza un nombre de lugar (minúsculas, sin tildes ni espacios extra)"""
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.lower().split())
+
+
+class ShippingService:
+    """Servicio para cotizar envíos desde la tabla de zonas en memoria"""
+
+    def __init__(self):
+        self._by_city: Dict[Tuple[str, str], ShippingZone] = {}
+        self._by_department: Dict[str, ShippingZone] = {}
+        self._loaded_at: Optional[float] = None
+
+    async def load(self):
+        """Carga (o recarga) las zonas activas en la tabla en memoria"""
+        zones = await ShippingZone.find(ShippingZone.is_active == True).to_list()
+
+        by_city: Dict[Tuple[str, str], ShippingZone] = {}
+        by_department: Dict[str, ShippingZone] = {}
+        for zone in zones:
+            department = normalize_place(zone.department)
+            if zone.cities:
+                for city in zone.cities:
+                    by_city[(department, normalize_place(city))] = zone
+            else:
+                by_department[department] = zone
+
+        # Reemplazo de referencias: las lecturas concurrentes ven la tabla vieja o la nueva
+        self._by_city = by_city
+        self._by_department = by_department
+        self._loaded_at = time.monotonic()
+        logger.info(f"Shipping rate table loaded: {len(zones)} zones")
+
+    async def ensure_fresh(self):
+        """Recarga la tabla si nunca se cargó o si expiró"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > settings.SHIPPING_RATES_REFRESH_SECONDS:
+            await self.load()
+
+    def resolve_zone(self, address: Optional[Address]) -> Optional[ShippingZone]:
+        """Resuelve la zona de una dirección (ciudad primero, luego departamento)"""
+        if not address:
+            return None
+        department = normalize_place(address.state)
+        zone = self._by_city.get((department, normalize_place(address.city)))
+        return zone or self._by_department.get(department)
+
+    def get_methods(self, address: Optional[Address]) -> Tuple[List[ShippingMethod], Optional[ShippingZone]]:
+        """Métodos activos para una dirección; los predefinidos si no hay zona"""
+        zone = self.resolve_zone(address)
+        methods = zone.shipping_methods if zone else list(DEFAULT_SHIPPING_METHODS.values())
+        return ([m for m in methods if m.is_active], zone)
+
+    def quote(
+        self,
+        address: Optional[Address],
+        subtotal: float,
+        weight_kg: float = 0
+    ) -> List[ShippingQuoteResult]:
+        """Cotiza todos los métodos disponibles, del más barato al más caro"""
+        methods, zone = self.get_methods(address)
+        quotes = []
+        for method in methods:
+            cost = method.calculate_cost(subtotal, weight_kg)
+            if cost is not None:
+                quotes.append(ShippingQuoteResult(method=method, cost=cost, zone_name=zone.name if zone else None))
+        return sorted(quotes, key=lambda q: q.cost)
+
+    def quote_method(
+        self,
+        method_id: str,
+        address: Optional[Address],
+        subtotal: float,
+        weight_kg: float = 0
+    ) -> Optional[ShippingQuoteResult]:
+        """
+        Cotiza un método específico; None si no está disponible para la dirección o el peso.
+        Acepta también los IDs de LEGACY_METHOD_IDS en zonas con métodos propios.
+        """
+        quotes = self.quote(address, subtotal, weight_kg)
+        for quote in quotes:
+            if quote.method.id == method_id:
+                return quote
+
+        legacy = LEGACY_METHOD_IDS.get(method_id)
+        if not quotes or not legacy:
+            return None
+        if legacy == "fastest":
+            return min(quotes, key=lambda q: (q.method.estimated_days_max, q.cost))
+        return quotes[0]  # quote() ya viene del más barato al más caro
+
+
+# Instancia global
+shipping_service = ShippingService()
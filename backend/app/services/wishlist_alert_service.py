@@ -0,0 +1,137 @@
+"""
+Avisos de wishlist: vuelta a stock y baja de precio
+
+Cuando un producto vuelve a tener stock o baja de precio se avisa por
+email a los usuarios que lo tienen en su wishlist. Los usuarios se
+obtienen con el índice multikey wishlists.products y se procesan por
+lotes. Dos ventanas evitan ráfagas de envíos:
+
+- por producto y tipo: una sola difusión por ventana aunque el stock o el
+  precio cambien varias veces seguidas;
+- por usuario, producto y tipo: un usuario no recibe el mismo aviso dos
+  veces dentro de la ventana.
+
+Ambas se reclaman con un upsert condicional sobre wishlist_alerts, así
+funcionan aunque haya varios workers.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.product_model import Product
+from app.models.user_model import User, UserContactView
+from app.models.wishlist_model import Wishlist, WishlistAlert, WishlistAlertKind
+from app.services.email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+
+class WishlistAlertService:
+    """Servicio para difundir avisos de wishlist por lotes"""
+
+    async def notify_back_in_stock(self, product_id: PydanticObjectId) -> int:
+        """
+        Avisa que el producto volvió a estar disponible.
+        Returns: cantidad de emails encolados
+        """
+        product = await Product.get(product_id)
+        if not product or not product.is_active or product.get_total_stock() <= 0:
+            return 0
+
+        return await self._broadcast(product, WishlistAlertKind.BACK_IN_STOCK)
+
+    async def notify_price_drop(self, product_id: PydanticObjectId, old_price: float) -> int:
+        """
+        Avisa que el producto bajó de precio respecto a old_price.
+        Returns: cantidad de emails encolados
+        """
+        product = await Product.get(product_id)
+        if not product or not product.is_active or product.base_price >= old_price:
+            return 0
+
+        return await self._broadcast(product, WishlistAlertKind.PRICE_DROP, old_price=old_price)
+
+    async def _broadcast(
+        self,
+        product: Product,
+        kind: WishlistAlertKind,
+        old_price: Optional[float] = None
+    ) -> int:
+        """Recorre las wishlists que contienen el producto y envía por lotes"""
+        product_window = timedelta(minutes=settings.WISHLIST_ALERT_PRODUCT_WINDOW_MINUTES)
+        if not await self._claim(product.id, kind, None, product_window):
+            logger.info(f"Wishlist alert {kind.value} for product {product.id} throttled")
+            return 0
+
+        batch_size = settings.WISHLIST_ALERT_BATCH_SIZE
+        cursor = Wishlist.get_pymongo_collection().find(
+            {"products": product.id}, {"_id": 0, "user_id": 1}
+        ).batch_size(batch_size)
+
+        sent = 0
+        user_ids: List[PydanticObjectId] = []
+        async for document in cursor:
+            user_ids.append(document["user_id"])
+            if len(user_ids) >= batch_size:
+                sent += await self._send_batch(product, kind, user_ids, old_price)
+                user_ids = []
+
+        if user_ids:
+            sent += await self._send_batch(product, kind, user_ids, old_price)
+
+        logger.info(f"Wishlist alert {kind.value} for product {product.id}: {sent} emails queued")
+        return sent
+
+    async def _send_batch(
+        self,
+        product: Product,
+        kind: WishlistAlertKind,
+        user_ids: List[PydanticObjectId],
+        old_price: Optional[float]
+    ) -> int:
+        """Encola un lote: usuarios activos que no recibieron el aviso en la ventana"""
+        users = await User.find(
+            {"_id": {"$in": user_ids}, "is_active": True}
+        ).project(UserContactView).to_list()
+
+        user_window = timedelta(hours=settings.WISHLIST_ALERT_USER_WINDOW_HOURS)
+        claims = await asyncio.gather(*[
+            self._claim(product.id, kind, user.id, user_window) for user in users
+        ])
+        recipients = [user for user, claimed in zip(users, claims) if claimed]
+
+        # Un solo insert_many en la cola de salida; la entrega la hacen sus workers
+        contacts = [(u.email, u.first_name) for u in recipients]
+        if kind == WishlistAlertKind.BACK_IN_STOCK:
+            return await email_service.send_back_in_stock_alerts(contacts, product)
+        return await email_service.send_price_drop_alerts(contacts, product, old_price)
+
+    @staticmethod
+    async def _claim(
+        product_id: PydanticObjectId,
+        kind: WishlistAlertKind,
+        user_id: Optional[PydanticObjectId],
+        window: timedelta
+    ) -> bool:
+        """
+        Reclama el envío de un aviso de forma atómica.
+        Returns: False si ya se envió dentro de la ventana
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            await WishlistAlert.get_pymongo_collection().update_one(
+                {"product_id": product_id, "kind": kind.value, "user_id": user_id, "sent_at": {"$lt": now - window}},
+                {"$set": {"sent_at": now}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+
+# Instancia global
+wishlist_alert_service = WishlistAlertService()
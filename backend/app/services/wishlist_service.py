@@ -0,0 +1,85 @@
+"""
+Servicio de wishlists: mutaciones atómicas y cache de membresía
+
+Las mutaciones son un solo find_one_and_update sobre la wishlist del
+usuario. Los conjuntos de productos de cada usuario se cachean por poco
+tiempo para responder los corazones de las grillas sin leer la wishlist
+en cada tarjeta; toda mutación invalida el conjunto del usuario.
+"""
+from typing import FrozenSet, Optional
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.wishlist_model import Wishlist
+
+
+class WishlistService:
+    """Servicio para modificar wishlists y consultar membresía"""
+
+    def __init__(self):
+        self._memberships = TTLCache(ttl_seconds=settings.WISHLIST_CACHE_TTL_SECONDS, max_size=10000)
+
+    async def update(
+        self,
+        user_id: PydanticObjectId,
+        update,
+        upsert: bool = True,
+        product_id: Optional[PydanticObjectId] = None
+    ) -> Optional[dict]:
+        """
+        Aplica un update atómico a la wishlist del usuario (creándola si no
+        existe) y retorna el resultado proyectado del documento final:
+        {"count": n} y, si se indica product_id, {"added": bool}.
+        None si la wishlist no existe y upsert es False.
+        """
+        products = {"$ifNull": ["$products", []]}
+        projection = {"_id": 0, "count": {"$size": products}}
+        if product_id is not None:
+            projection["added"] = {"$in": [product_id, products]}
+
+        collection = Wishlist.get_pymongo_collection()
+        try:
+            result = await collection.find_one_and_update(
+                {"user_id": user_id}, update,
+                projection=projection, upsert=upsert, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Dos upserts concurrentes crearon la wishlist: el reintento la actualiza
+            result = await collection.find_one_and_update(
+                {"user_id": user_id}, update,
+                projection=projection, upsert=upsert, return_document=ReturnDocument.AFTER
+            )
+
+        self.invalidate(user_id)
+        return result
+
+    async def get_membership(self, user_id: PydanticObjectId) -> FrozenSet[PydanticObjectId]:
+        """
+        Conjunto de productos en la wishlist del usuario (cacheado).
+        Una sola lectura proyectada al expirar o tras una mutación.
+        """
+        membership = self._memberships.get(user_id)
+
+        if membership is None:
+            document = await Wishlist.get_pymongo_collection().find_one(
+                {"user_id": user_id}, {"_id": 0, "products": 1}
+            )
+            membership = frozenset(document.get("products", [])) if document else frozenset()
+            self._memberships.set(user_id, membership)
+
+        return membership
+
+    def invalidate(self, user_id: PydanticObjectId):
+        """Descarta la membresía cacheada del usuario (llamar tras modificar su wishlist)"""
+        self._memberships.invalidate(user_id)
+
+    def cache_stats(self) -> dict:
+        """Métricas del cache de membresía"""
+        return self._memberships.stats()
+
+
+# Instancia global
+wishlist_service = WishlistService()
@@ -0,0 +1,46 @@
+"""
+Script para auditar que las consultas de las rutas usen índices.
+
+Uso:
+    python -m scripts.audit_indexes
+
+Ejecuta explain() sobre cada forma de consulta registrada en
+app/db/index_audit.py y reporta las que harían COLLSCAN u ordenarían en
+memoria. Termina con código 1 si encuentra algún COLLSCAN.
+"""
+import asyncio
+import sys
+import os
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.connection import init_db
+from app.db.index_audit import audit_indexes
+
+
+async def run_audit() -> int:
+    """Audita los índices y retorna la cantidad de COLLSCAN encontrados."""
+    print("🔧 Inicializando conexión a la base de datos...")
+    await init_db()
+
+    print("\n🔍 Auditando consultas con explain()")
+    print("-" * 50)
+
+    results = await audit_indexes()
+    collscans = 0
+    for result in results:
+        if result.collscan:
+            collscans += 1
+            print(f"❌ {result.route} [{result.collection}]: COLLSCAN")
+        elif result.in_memory_sort:
+            print(f"⚠️  {result.route} [{result.collection}]: SORT en memoria ({', '.join(result.index_names)})")
+        else:
+            print(f"✅ {result.route} [{result.collection}]: {', '.join(result.index_names)}")
+
+    print(f"\n📊 Consultas auditadas: {len(results)} | COLLSCAN: {collscans}")
+    return collscans
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(run_audit()) else 0)
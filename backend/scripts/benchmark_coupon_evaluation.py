@@ -0,0 +1,94 @@
+"""
+Benchmark de la evaluación de cupones por línea (evaluaciones por segundo).
+
+Uso:
+    python -m scripts.benchmark_coupon_evaluation [iteraciones]
+
+Mide eligible_subtotal + calculate_discount con carritos de muchas líneas
+y listas de exclusión grandes, frente a la búsqueda lineal en listas.
+No necesita base de datos: el cupón se arma en memoria.
+"""
+import sys
+import os
+import time
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone, timedelta
+from beanie import PydanticObjectId
+from app.models.coupon_model import Coupon, DiscountType
+
+CATEGORIES = ["bolsos", "sandalias", "hamacas", "ceramica", "textiles"]
+
+
+def build_coupon(excluded_count: int) -> Coupon:
+    """Cupón de ejemplo (model_construct: sin inicializar Beanie)"""
+    now = datetime.now(timezone.utc)
+    return Coupon.model_construct(
+        code="BENCH10",
+        description="Cupón de benchmark",
+        discount_type=DiscountType.PERCENTAGE,
+        discount_value=10,
+        minimum_amount=None,
+        maximum_discount=None,
+        max_uses=None,
+        max_uses_per_user=1,
+        current_uses=0,
+        applicable_categories=CATEGORIES[:3],
+        excluded_products=[str(PydanticObjectId()) for _ in range(excluded_count)],
+        is_active=True,
+        valid_from=now - timedelta(days=1),
+        valid_until=now + timedelta(days=1)
+    )
+
+
+def build_lines(coupon: Coupon, line_count: int):
+    """Líneas (product_id, categoría, subtotal); una de cada diez está excluida"""
+    return [
+        (
+            coupon.excluded_products[i % len(coupon.excluded_products)] if i % 10 == 0 else str(PydanticObjectId()),
+            CATEGORIES[i % len(CATEGORIES)],
+            10.0 + i % 7
+        )
+        for i in range(line_count)
+    ]
+
+
+def naive_eligible_subtotal(coupon: Coupon, lines) -> float:
+    """Referencia: búsquedas en las listas tal como vienen del documento"""
+    return sum(
+        line_total
+        for product_id, category, line_total in lines
+        if product_id not in coupon.excluded_products and category in coupon.applicable_categories
+    )
+
+
+def measure(label: str, evaluate, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        evaluate()
+    elapsed = time.perf_counter() - started
+    rate = iterations / elapsed
+    print(f"  {label:<14} {rate:>12,.0f} evaluaciones/s")
+    return rate
+
+
+def run_benchmark(iterations: int):
+    print(f"📊 Evaluación de cupones por línea ({iterations:,} iteraciones por caso)\n")
+    for line_count, excluded_count in [(10, 100), (100, 1000), (500, 10000)]:
+        coupon = build_coupon(excluded_count)
+        lines = build_lines(coupon, line_count)
+        assert coupon.eligible_subtotal(lines) == naive_eligible_subtotal(coupon, lines)
+
+        # La referencia lineal es mucho más lenta: menos iteraciones
+        naive_iterations = max(iterations // (line_count * excluded_count // 1000 + 1), 1)
+
+        print(f"🛒 {line_count} líneas, {excluded_count:,} productos excluidos")
+        fast = measure("sets", lambda: coupon.calculate_discount(coupon.eligible_subtotal(lines)), iterations)
+        slow = measure("listas", lambda: coupon.calculate_discount(naive_eligible_subtotal(coupon, lines)), naive_iterations)
+        print(f"  {'mejora':<14} {fast / slow:>12,.1f}x\n")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,87 @@
+"""
+Benchmark del renderizado de plantillas de email (renders por segundo).
+
+Uso:
+    python -m scripts.benchmark_email_templates [iteraciones]
+
+No necesita base de datos: arma una orden y un producto en memoria.
+"""
+import sys
+import os
+import time
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone
+from beanie import PydanticObjectId
+from app.models.orders_model import Order, OrderItem
+from app.models.product_model import Product
+from app.models.user_model import Address
+from app.services.email_service import email_service
+from app.services import email_templates as templates
+from app.services.email_templates import money
+
+
+def build_sample_order(item_count: int = 5) -> Order:
+    """Orden de ejemplo (model_construct: sin inicializar Beanie)"""
+    items = [
+        OrderItem(
+            product_id=PydanticObjectId(),
+            product_name=f"Producto artesanal {i}",
+            quantity=i % 3 + 1,
+            price=12.5 + i,
+            variant_info="M / Rojo" if i % 2 else None
+        )
+        for i in range(item_count)
+    ]
+    subtotal = sum(item.subtotal for item in items)
+    return Order.model_construct(
+        id=PydanticObjectId(),
+        user_id=PydanticObjectId(),
+        user_email="cliente@example.com",
+        items=items,
+        subtotal=subtotal,
+        discount_amount=5,
+        shipping_cost=3.5,
+        total_amount=subtotal - 5 + 3.5,
+        shipping_address=Address(street="Av. La Capilla 123", city="San Salvador", state="San Salvador"),
+        tracking_number="TRK123456",
+        carrier="Correos",
+        shipping_method_name="Estándar",
+        estimated_delivery=datetime.now(timezone.utc)
+    )
+
+
+def measure(label: str, render, iterations: int, per_call: int = 1):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {iterations * per_call / elapsed:>12,.0f} renders/s")
+
+
+def run_benchmark(iterations: int):
+    order = build_sample_order()
+    product = Product.model_construct(id=PydanticObjectId(), name="Bolso de cuero", base_price=45.0, main_image="https://example.com/bolso.jpg")
+
+    print(f"📊 Renderizado de plantillas ({iterations:,} iteraciones)\n")
+    measure("order_confirmation", lambda: email_service._render_order_confirmation(order, "María"), iterations)
+    measure("payment_confirmation", lambda: email_service._render_payment_confirmation(order, "María"), iterations)
+    measure("shipping_notification", lambda: email_service._render_shipping_notification(order, "María", "https://t.example.com"), iterations)
+    measure("welcome", lambda: email_service._render_welcome_email("María"), iterations)
+
+    # Render masivo: la parte común se renderiza una vez para todo el lote,
+    # como en send_price_drop_alerts y los broadcasts
+    batch = 1000
+    button = email_service._button("/productos", "Comenzar a Comprar")
+    contexts = [{"name": f"Cliente {i}", "button": button} for i in range(batch)]
+    measure(f"welcome bulk (x{batch})", lambda: templates.WELCOME.render_many(contexts), max(iterations // batch, 1), batch)
+
+    alert = {**email_service._product_alert_context(product), "old_price": money(60.0)}
+    alert_contexts = [{**alert, "name": f"Cliente {i}"} for i in range(batch)]
+    measure(f"price_drop bulk (x{batch})", lambda: templates.PRICE_DROP.render_many(alert_contexts), max(iterations // batch, 1), batch)
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
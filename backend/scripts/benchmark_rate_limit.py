@@ -0,0 +1,56 @@
+"""
+Benchmark del costo por solicitud del rate limiter.
+
+Uso:
+    python -m scripts.benchmark_rate_limit [solicitudes] [--mongo]
+
+Mide hit() del backend en memoria con una sola clave (cliente que
+insiste, siempre bloqueado) y con muchas claves distintas (tráfico
+normal). Con --mongo mide también MongoRateLimitBackend contra la base
+configurada en .env (usa claves "bench:*" que el TTL elimina).
+"""
+import asyncio
+import sys
+import os
+import time
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.rate_limit import RateLimitBackend, MemoryRateLimitBackend, MongoRateLimitBackend
+
+LIMIT = 5
+WINDOW = 60
+
+
+async def measure(label: str, backend: RateLimitBackend, requests: int, key_count: int):
+    keys = [f"bench:{i}" for i in range(key_count)]
+    started = time.perf_counter()
+    for i in range(requests):
+        await backend.hit(keys[i % key_count], LIMIT, WINDOW)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed / requests * 1_000_000:>10.1f} µs/solicitud   {requests / elapsed:>12,.0f} solicitudes/s")
+
+
+async def run_benchmark(requests: int, with_mongo: bool):
+    print(f"📊 Costo del rate limiter ({requests:,} solicitudes, límite {LIMIT}/{WINDOW}s)\n")
+
+    print("🧠 Memoria")
+    await measure("una clave (bloqueada)", MemoryRateLimitBackend(), requests, 1)
+    await measure("10,000 claves", MemoryRateLimitBackend(), requests, 10000)
+    await measure("50,000 claves (desalojo)", MemoryRateLimitBackend(), requests, 50000)
+
+    if with_mongo:
+        from app.db.connection import init_db
+        await init_db()
+
+        # Cada hit son dos viajes a Mongo en paralelo: menos solicitudes
+        mongo_requests = max(requests // 100, 100)
+        print("\n🍃 Mongo")
+        await measure("una clave (bloqueada)", MongoRateLimitBackend(), mongo_requests, 1)
+        await measure("1,000 claves", MongoRateLimitBackend(), mongo_requests, 1000)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    asyncio.run(run_benchmark(int(args[0]) if args else 200000, "--mongo" in sys.argv))
@@ -0,0 +1,170 @@
+"""
+Benchmark de la carga de productos de la wishlist (GET /wishlist/products).
+
+Uso:
+    python -m scripts.benchmark_wishlist_hydration [--mongo] [--rtt-ms N]
+
+Compara la ruta actual (una consulta $in con proyección de tarjeta) con
+la versión anterior, que hacía un Product.get por producto y leía el
+documento completo. Barre wishlists de 1, 10, 50 y 200 productos.
+
+Por defecto corre contra mongomock (sin servidor) y suma --rtt-ms de
+latencia simulada por consulta (1 ms por defecto); con --mongo usa la
+base del .env y su latencia real. Los productos tienen 20 variantes y
+una descripción larga, como los del catálogo.
+"""
+import asyncio
+import sys
+import os
+import time
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WISHLIST_SIZES = [1, 10, 50, 200]
+REPETITIONS = 5
+
+queries = {"count": 0}
+
+
+def patch_mongomock(rtt_seconds: float):
+    """Cuenta las consultas y les suma la latencia de un round trip"""
+    from mongomock_motor import AsyncMongoMockCollection, AsyncCursor
+
+    original_find_one = AsyncMongoMockCollection.find_one
+    original_to_list = AsyncCursor.to_list
+
+    async def find_one(self, *args, **kwargs):
+        queries["count"] += 1
+        await asyncio.sleep(rtt_seconds)
+        return await original_find_one(self, *args, **kwargs)
+
+    async def to_list(self, *args, **kwargs):
+        queries["count"] += 1
+        await asyncio.sleep(rtt_seconds)
+        return await original_to_list(self, *args, **kwargs)
+
+    AsyncMongoMockCollection.find_one = find_one
+    AsyncCursor.to_list = to_list
+
+
+async def init(use_mongo: bool, rtt_seconds: float):
+    if use_mongo:
+        from app.db.connection import init_db
+        await init_db()
+        return
+
+    os.environ.setdefault("PROJECT_NAME", "benchmark")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "benchmark")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    for name in ("CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    from app.db import connection
+
+    patch_mongomock(rtt_seconds)
+    models = [m for m in vars(connection).values() if isinstance(m, type) and hasattr(m, "get_settings") and m.__module__.startswith("app.models")]
+    await init_beanie(database=AsyncMongoMockClient()["benchmark"], document_models=models)
+
+
+async def build_wishlist(size: int):
+    """Usuario con una wishlist de `size` productos activos; retorna (usuario, ids)"""
+    from beanie import PydanticObjectId
+    from app.models.product_model import Product, ProductVariant
+    from app.models.user_model import User
+    from app.models.wishlist_model import Wishlist
+
+    products = [
+        Product(
+            name=f"Sandalia de cuero {i}", description="Hecha a mano " * 40, base_price=35.0 + i,
+            category="sandalias", has_variants=True,
+            images=[f"https://res.cloudinary.com/demo/image/upload/sandalia-{i}-{j}.jpg" for j in range(6)],
+            variants=[ProductVariant(sku=f"SAND-{size}-{i}-{j}", size=str(35 + j % 9), color="Negro", stock=j % 3) for j in range(20)]
+        )
+        for i in range(size)
+    ]
+    result = await Product.insert_many(products)
+    product_ids = [PydanticObjectId(product_id) for product_id in result.inserted_ids]
+
+    user = User.model_construct(id=PydanticObjectId(), email=f"bench{size}@example.com", role="customer")
+    await Wishlist(user_id=user.id, products=product_ids).create()
+    return user, product_ids
+
+
+async def cleanup(created):
+    """Elimina los productos y wishlists de prueba (relevante con --mongo)"""
+    from app.models.product_model import Product
+    from app.models.wishlist_model import Wishlist
+
+    for user, product_ids in created:
+        await Product.find({"_id": {"$in": product_ids}}).delete()
+        await Wishlist.find(Wishlist.user_id == user.id).delete()
+
+
+async def per_product_gets(current_user):
+    """Versión anterior: un Product.get por producto con el documento completo"""
+    from app.models.product_model import Product
+    from app.models.wishlist_model import Wishlist
+    from app.routes.wishlist_routes import WishlistProductResponse
+
+    wishlist = await Wishlist.find_one(Wishlist.user_id == current_user.id)
+    products = []
+    for product_id in wishlist.products:
+        product = await Product.get(product_id)
+        if product and product.is_active:
+            if product.has_variants:
+                in_stock = any(v.stock > 0 and v.is_available for v in product.variants)
+            else:
+                in_stock = (product.stock or 0) > 0
+            products.append(WishlistProductResponse(
+                id=str(product.id), name=product.name, base_price=product.base_price,
+                main_image=product.main_image, is_active=product.is_active, in_stock=in_stock
+            ))
+    return products
+
+
+async def measure(load, user, use_mongo: bool):
+    """Retorna (ms por request, consultas por request, respuesta)"""
+    queries["count"] = 0
+    started = time.perf_counter()
+    for _ in range(REPETITIONS):
+        result = await load(current_user=user)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / REPETITIONS
+    per_request = None if use_mongo else queries["count"] // REPETITIONS
+    return elapsed_ms, per_request, result
+
+
+async def run_benchmark(use_mongo: bool, rtt_ms: float):
+    await init(use_mongo, rtt_ms / 1000)
+
+    from app.routes.wishlist_routes import get_wishlist_products
+
+    latency = "real" if use_mongo else f"{rtt_ms:g} ms simulados"
+    print(f"📊 GET /wishlist/products ({'Mongo' if use_mongo else 'mongomock'}, latencia {latency})\n")
+    print(f"  {'productos':>9}   {'por producto':>20}   {'$in + proyección':>20}   mejora")
+
+    def describe(ms, count):
+        return f"{ms:8.1f} ms" + (f" {count:>4} q" if count is not None else "")
+
+    created = []
+    try:
+        for size in WISHLIST_SIZES:
+            user, product_ids = await build_wishlist(size)
+            created.append((user, product_ids))
+            old_ms, old_queries, old_result = await measure(per_product_gets, user, use_mongo)
+            new_ms, new_queries, new_result = await measure(get_wishlist_products, user, use_mongo)
+            assert [p.id for p in new_result] == [p.id for p in old_result]
+
+            print(f"  {size:>9}   {describe(old_ms, old_queries):>20}   {describe(new_ms, new_queries):>20}   {old_ms / new_ms:5.1f}x")
+    finally:
+        await cleanup(created)
+
+
+if __name__ == "__main__":
+    rtt = 1.0
+    if "--rtt-ms" in sys.argv:
+        rtt = float(sys.argv[sys.argv.index("--rtt-ms") + 1])
+    asyncio.run(run_benchmark("--mongo" in sys.argv, rtt))
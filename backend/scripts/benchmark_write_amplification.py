@@ -0,0 +1,190 @@
+"""
+Benchmark de amplificación de escritura: save() (documento completo)
+frente a los updates parciales ($set/$push/$inc) que usan las rutas.
+
+Uso:
+    python -m scripts.benchmark_write_amplification [--mongo]
+
+Por defecto corre contra mongomock (sin servidor) y mide los bytes BSON
+de cada comando de escritura (filtro + update). Con --mongo usa la base
+del .env, mide los comandos reales con un CommandListener de pymongo y,
+si la base es un replica set, también el tamaño de la entrada del oplog.
+Órdenes con 20 items y 30 eventos de tracking; producto con 20 variantes.
+"""
+import asyncio
+import sys
+import os
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from pymongo import monitoring
+
+WRITE_COMMANDS = {"update", "findAndModify"}
+
+
+class WriteSizeListener(monitoring.CommandListener):
+    """Acumula el tamaño BSON de los comandos de escritura"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def started(self, event):
+        if event.command_name in WRITE_COMMANDS:
+            self.bytes += len(bson.encode(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+listener = WriteSizeListener()
+
+
+def patch_mongomock():
+    """En mongomock no hay protocolo: se mide el filtro + update de cada llamada"""
+    from mongomock_motor import AsyncMongoMockCollection
+
+    for name in ("update_one", "find_one_and_update", "replace_one"):
+        original = getattr(AsyncMongoMockCollection, name)
+
+        def measured(self, filter, update, *args, __original=original, **kwargs):
+            spec = {"q": filter, "u": update if isinstance(update, dict) else {"pipeline": update}}
+            listener.bytes += len(bson.encode(spec))
+            return __original(self, filter, update, *args, **kwargs)
+
+        setattr(AsyncMongoMockCollection, name, measured)
+
+
+async def init(use_mongo: bool):
+    if use_mongo:
+        monitoring.register(listener)
+        from app.db.connection import init_db
+        await init_db()
+        return
+
+    os.environ.setdefault("PROJECT_NAME", "benchmark")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "benchmark")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    for name in ("CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    from app.db import connection
+
+    patch_mongomock()
+    models = [m for m in vars(connection).values() if isinstance(m, type) and hasattr(m, "get_settings") and m.__module__.startswith("app.models")]
+    await init_beanie(database=AsyncMongoMockClient()["benchmark"], document_models=models)
+
+
+async def last_oplog_size(use_mongo: bool):
+    """Tamaño de la última entrada del oplog (None si no es replica set)"""
+    if not use_mongo:
+        return None
+    from app.models.orders_model import Order
+    client = Order.get_pymongo_collection().database.client
+    try:
+        entry = await client["local"]["oplog.rs"].find_one(sort=[("$natural", -1)])
+    except Exception:
+        return None
+    return len(bson.encode(entry)) if entry else None
+
+
+async def build_order():
+    from beanie import PydanticObjectId
+    from app.models.orders_model import Order, OrderItem, OrderStatus
+    from app.models.user_model import Address
+
+    items = [
+        OrderItem(product_id=PydanticObjectId(), product_name=f"Producto artesanal {i}", quantity=1 + i % 3,
+                  price=12.5 + i, variant_sku=f"SKU-{i}", variant_info="M / Rojo")
+        for i in range(20)
+    ]
+    order = Order(
+        user_id=PydanticObjectId(), user_email="cliente@example.com", items=items,
+        subtotal=500, shipping_cost=5, total_amount=505,
+        shipping_address=Address(street="Av. La Capilla 123", city="San Salvador", state="San Salvador"),
+        shipping_method_id="standard_ss", shipping_method_name="Envío Estándar"
+    )
+    for i in range(30):
+        order.add_tracking_event(status=OrderStatus.PROCESSING, location="Bodega central", notes=f"Evento {i}", updated_by="system")
+    await order.create()
+    return order
+
+
+async def build_product():
+    from app.models.product_model import Product, ProductVariant
+
+    product = Product(
+        name="Sandalia de cuero", description="Hecha a mano " * 40, base_price=35.0, category="sandalias",
+        images=[f"https://res.cloudinary.com/demo/image/upload/sandalia-{i}.jpg" for i in range(6)],
+        variants=[ProductVariant(sku=f"SAND-{i}", size=str(35 + i % 9), color="Negro", stock=50) for i in range(20)],
+        has_variants=True, stock=200
+    )
+    await product.create()
+    return product
+
+
+async def measure(label: str, build, full_update, partial_update, use_mongo: bool):
+    """Aplica el mismo cambio con save() y con el update parcial, cada uno sobre un documento nuevo"""
+    results = []
+    for update in (full_update, partial_update):
+        target = await build()
+        listener.bytes = 0
+        await update(target)
+        results.append((listener.bytes, await last_oplog_size(use_mongo)))
+
+    (full, full_oplog), (partial, partial_oplog) = results
+    oplog = f"   oplog {full_oplog:>7,} → {partial_oplog:>6,} B" if full_oplog and partial_oplog else ""
+    print(f"  {label:<22} save() {full:>7,} B   parcial {partial:>6,} B   {full / partial:>6.1f}x{oplog}")
+
+
+async def run_benchmark(use_mongo: bool):
+    await init(use_mongo)
+
+    from app.models.orders_model import OrderStatus
+    from app.routes.order_routes import decrement_stock
+
+    async def tracking_save(order):
+        order.add_tracking_event(status=OrderStatus.SHIPPED, notes="Enviado", updated_by="admin@example.com")
+        order.status = OrderStatus.SHIPPED
+        await order.save()
+
+    async def tracking_partial(order):
+        await order.push_tracking_event(status=OrderStatus.SHIPPED, notes="Enviado", updated_by="admin@example.com")
+
+    async def shipping_save(order):
+        order.tracking_number, order.carrier = "TRK123456", "Correos"
+        await order.save()
+
+    async def shipping_partial(order):
+        await order.set({"tracking_number": "TRK123456", "carrier": "Correos"})
+
+    async def stock_save(product):
+        product.stock -= 1
+        await product.save()
+
+    async def stock_partial(product):
+        await decrement_stock(product.id, 1)
+
+    async def variant_save(product):
+        product.variants[7].stock -= 1
+        await product.save()
+
+    async def variant_partial(product):
+        await decrement_stock(product.id, 1, "SAND-7")
+
+    print(f"📊 Bytes escritos por operación ({'Mongo' if use_mongo else 'mongomock'})\n")
+    await measure("evento de tracking", build_order, tracking_save, tracking_partial, use_mongo)
+    await measure("datos de envío", build_order, shipping_save, shipping_partial, use_mongo)
+    await measure("descuento de stock", build_product, stock_save, stock_partial, use_mongo)
+    await measure("stock de variante", build_product, variant_save, variant_partial, use_mongo)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark("--mongo" in sys.argv))
@@ -0,0 +1,80 @@
+"""
+Servidor falso de SendGrid para probar envíos en local.
+
+Acepta POST /v3/mail/send, responde 202 e imprime los destinatarios de
+cada llamada. Con FAIL_EVERY=n responde 503 a cada n-ésima llamada para
+probar los reintentos. Con FORCE_STATUSES=429,500,400 las primeras
+llamadas responden esos códigos, en orden (los tests usan el atributo
+forced_statuses).
+
+Uso:
+    python -m scripts.fake_sendgrid [puerto]
+
+y en el .env de la API:
+    SENDGRID_API_KEY=fake
+    SENDGRID_API_HOST=http://127.0.0.1:8025
+"""
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeSendGridHandler(BaseHTTPRequestHandler):
+    calls = 0
+    recipients = 0
+    sent_to = []  # Emails de cada destinatario aceptado, en orden
+    fail_every = int(os.getenv("FAIL_EVERY", "0"))
+    # Códigos a responder en las próximas llamadas, en orden
+    forced_statuses = [int(code) for code in os.getenv("FORCE_STATUSES", "").split(",") if code.strip()]
+
+    def do_POST(self):
+        if self.path != "/v3/mail/send":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        cls = type(self)
+        cls.calls += 1
+
+        if cls.forced_statuses:
+            forced = cls.forced_statuses.pop(0)
+            print(f"💥 Llamada {cls.calls}: {forced} forzado")
+            self.send_error_response(forced)
+            return
+
+        if cls.fail_every and cls.calls % cls.fail_every == 0:
+            print(f"💥 Llamada {cls.calls}: 503 simulado")
+            self.send_error_response(503)
+            return
+
+        personalizations = body.get("personalizations", [])
+        cls.recipients += len(personalizations)
+        cls.sent_to.extend(p["to"][0]["email"] for p in personalizations)
+        first = personalizations[0]["to"][0]["email"] if personalizations else "-"
+        print(f"📧 Llamada {cls.calls}: {len(personalizations)} destinatarios (desde {first}), total {cls.recipients}")
+
+        self.send_response(202)
+        self.end_headers()
+
+    def send_error_response(self, status: int):
+        """Respuesta de error con el cuerpo JSON que usa SendGrid"""
+        body = json.dumps({"errors": [{"message": f"Simulated {status}"}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(port: int):
+    print(f"🚀 SendGrid falso escuchando en http://127.0.0.1:{port}")
+    ThreadingHTTPServer(("127.0.0.1", port), FakeSendGridHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8025)
@@ -0,0 +1,100 @@
+"""
+Prueba de carga: latencia del catálogo mientras se martilla el login.
+
+Uso:
+    python -m scripts.load_test_login [url] [logins_concurrentes] [segundos]
+
+Ejemplo:
+    python -m scripts.load_test_login http://localhost:8000 32 20
+
+Mide GET /products/ primero sin carga y luego con logins fallidos en
+paralelo contra un email existente (cada uno ejecuta una verificación
+bcrypt), y muestra p50/p95/p99 de ambos. Los 429 del rate limit de
+login y los 503 del pool de bcrypt se cuentan aparte: para medir bcrypt
+y no el límite, levantar la API con RATE_LIMIT_LOGIN alto (ej. 100000/minute).
+
+Variables de entorno: LOAD_TEST_EMAIL (requerida, email de un usuario registrado).
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+CATALOG_PATH = "/products/"
+CATALOG_CLIENTS = 4
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return samples * 3 if samples else [0.0, 0.0, 0.0]
+    cuts = statistics.quantiles(samples, n=100)
+    return [cuts[49], cuts[94], cuts[98]]
+
+
+def report(label: str, samples):
+    p50, p95, p99 = (value * 1000 for value in percentiles(samples))
+    print(f"  {label:<18} {len(samples):>6} req   p50 {p50:>7.1f} ms   p95 {p95:>7.1f} ms   p99 {p99:>7.1f} ms")
+
+
+async def catalog_client(client: httpx.AsyncClient, stop: asyncio.Event, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(CATALOG_PATH)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+
+async def login_client(client: httpx.AsyncClient, stop: asyncio.Event, email: str, statuses: Counter):
+    while not stop.is_set():
+        response = await client.post("/auth/login", data={"username": email, "password": "contraseña-incorrecta"})
+        statuses[response.status_code] += 1
+
+
+async def measure_catalog(client: httpx.AsyncClient, seconds: float, extra=()):
+    stop = asyncio.Event()
+    latencies = []
+    tasks = [asyncio.create_task(catalog_client(client, stop, latencies)) for _ in range(CATALOG_CLIENTS)]
+    tasks += [asyncio.create_task(factory(stop)) for factory in extra]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def run_load_test(base_url: str, concurrent_logins: int, seconds: float):
+    email = os.getenv("LOAD_TEST_EMAIL")
+    if not email:
+        print("❌ Define LOAD_TEST_EMAIL con el email de un usuario registrado")
+        return
+
+    limits = httpx.Limits(max_connections=concurrent_logins + CATALOG_CLIENTS)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        print(f"📊 Catálogo ({CATALOG_PATH}) con {CATALOG_CLIENTS} clientes, {seconds:.0f}s por fase\n")
+
+        baseline = await measure_catalog(client, seconds)
+        report("sin carga", baseline)
+
+        statuses = Counter()
+        loaded = await measure_catalog(
+            client,
+            seconds,
+            [lambda stop: login_client(client, stop, email, statuses) for _ in range(concurrent_logins)]
+        )
+        report(f"{concurrent_logins} logins", loaded)
+
+        print(f"\n🔐 Logins: {sum(statuses.values())} ({dict(sorted(statuses.items()))})")
+        if statuses.get(429):
+            print("⚠️  Hubo 429: el rate limit de login cortó la carga (subir RATE_LIMIT_LOGIN para la prueba)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_load_test(
+        sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000",
+        int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    ))
@@ -0,0 +1,88 @@
+"""
+Script para recalcular desde cero los agregados de rating de los productos
+(average_rating, review_count, rating_sum, rating_distribution y
+verified_review_count).
+
+Uso:
+    python -m scripts.recompute_ratings
+
+Ejecutarlo una vez tras desplegar los contadores incrementales, y cuando
+se sospeche que los agregados quedaron desincronizados.
+"""
+import asyncio
+import sys
+import os
+
+# Agregar el directorio raíz al path para poder importar app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from app.models.product_model import Product
+from app.models.review_model import ProductReview
+from app.db.connection import init_db
+
+
+async def recompute_ratings():
+    """Recalcula los agregados de rating con una sola agregación."""
+    print("🔧 Inicializando conexión a la base de datos...")
+    await init_db()
+
+    # Una sola agregación: conteo por (producto, estrellas) de reviews aprobadas
+    pipeline = [
+        {"$match": {"is_approved": True}},
+        {"$group": {
+            "_id": {"product_id": "$product_id", "rating": "$rating"},
+            "count": {"$sum": 1},
+            "verified": {"$sum": {"$cond": ["$verified_purchase", 1, 0]}}
+        }},
+        {"$group": {
+            "_id": "$_id.product_id",
+            "ratings": {"$push": {"rating": "$_id.rating", "count": "$count"}},
+            "verified": {"$sum": "$verified"}
+        }}
+    ]
+    results = await ProductReview.get_pymongo_collection().aggregate(pipeline).to_list(length=None)
+
+    operations = []
+    for result in results:
+        distribution = {str(stars): 0 for stars in range(1, 6)}
+        for entry in result["ratings"]:
+            distribution[str(entry["rating"])] = entry["count"]
+
+        review_count = sum(distribution.values())
+        rating_sum = sum(int(stars) * count for stars, count in distribution.items())
+
+        operations.append(UpdateOne(
+            {"_id": result["_id"]},
+            {"$set": {
+                "review_count": review_count,
+                "rating_sum": rating_sum,
+                "rating_distribution": distribution,
+                "verified_review_count": result["verified"],
+                "average_rating": round(rating_sum / review_count, 2)
+            }}
+        ))
+
+    collection = Product.get_pymongo_collection()
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+    # Productos sin reviews aprobadas vuelven a cero
+    reviewed_ids = [result["_id"] for result in results]
+    reset = await collection.update_many(
+        {"_id": {"$nin": reviewed_ids}},
+        {"$set": {
+            "review_count": 0,
+            "rating_sum": 0,
+            "rating_distribution": {str(stars): 0 for stars in range(1, 6)},
+            "verified_review_count": 0,
+            "average_rating": 0
+        }}
+    )
+
+    print(f"\n✅ Productos con reviews actualizados: {len(operations)}")
+    print(f"🔄 Productos sin reviews reiniciados: {reset.modified_count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(recompute_ratings())
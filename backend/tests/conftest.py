@@ -0,0 +1,291 @@
+"""
+Fixtures compartidas de los tests
+
+Los tests corren contra una base en memoria (mongomock-motor) con todos
+los modelos de init_db registrados, así no necesitan un MongoDB real.
+Cada test recibe una base nueva y los caches globales vacíos.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import sys
+import threading
+
+# Variables mínimas para construir Settings sin un .env
+for key, value in {
+    "PROJECT_NAME": "CALERO Test",
+    "MONGO_URL": "mongodb://localhost:27017",
+    "DB_NAME": "calero_test",
+    "SECRET_KEY": "test-secret-key",
+    "CLOUDINARY_CLOUD_NAME": "test",
+    "CLOUDINARY_API_KEY": "test",
+    "CLOUDINARY_API_SECRET": "test",
+}.items():
+    os.environ.setdefault(key, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone, timedelta
+
+from http.server import ThreadingHTTPServer
+
+import httpx
+import pytest
+from beanie import init_beanie
+import mongomock_motor
+from mongomock import aggregate as mongomock_aggregate
+from mongomock import collection as mongomock_collection
+from mongomock_motor import AsyncMongoMockClient
+from sendgrid import SendGridAPIClient
+
+from app.core import rate_limit as rate_limit_module
+from app.core.dependencies import _user_cache, get_current_user, get_current_admin_user
+from app.core.config import settings
+from app.core.rate_limit import MemoryRateLimitBackend
+from app.db import connection
+from app.models.user_model import User, Address
+from app.services.coupon_service import coupon_service
+from app.services.email_service import email_service
+from app.services.review_service import review_service
+from app.services.shipping_service import shipping_service
+from app.services.wishlist_service import wishlist_service
+from scripts.fake_sendgrid import FakeSendGridHandler
+
+
+def _support_round_expression():
+    """
+    mongomock no implementa $round en expresiones de agregación, que
+    adjust_product_rating usa en su pipeline update. Se agrega con la misma
+    semántica de MongoDB: [valor, decimales], redondeo a par y null si el
+    valor es null.
+    """
+    handle = mongomock_aggregate._Parser._handle_arithmetic_operator
+
+    def handle_with_round(self, operator, values):
+        if operator != "$round":
+            return handle(self, operator, values)
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        number, places = (list(self.parse_many(values)) + [0])[:2]
+        if number is None:
+            return None
+        return round(number, places)
+
+    mongomock_aggregate.arithmetic_operators.add("$round")
+    mongomock_aggregate._Parser._handle_arithmetic_operator = handle_with_round
+
+
+def _support_bulk_sort_argument():
+    """
+    pymongo 4.11+ pasa sort= a UpdateOne/ReplaceOne al armar un bulk_write
+    y mongomock no lo acepta. Sin sort (el caso de la app) la operación es
+    la misma, así que se descarta.
+    """
+    builder = mongomock_collection.BulkOperationBuilder
+
+    def without_sort(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock no soporta sort en operaciones de bulk_write")
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    builder.add_update = without_sort(builder.add_update)
+    builder.add_replace = without_sort(builder.add_replace)
+
+
+def _support_projection_expressions():
+    """
+    mongomock solo acepta $elemMatch y $slice en proyecciones, y
+    WishlistService.update proyecta expresiones ($size, $in) del documento
+    final de find_one_and_update. Se evalúan con el parser de agregación
+    sobre el documento completo.
+    """
+    find_and_modify = mongomock_collection.Collection._find_and_modify
+
+    def with_expressions(self, query, projection=None, *args, **kwargs):
+        expressions = {
+            field: value for field, value in (projection or {}).items()
+            if isinstance(value, dict) and not set(value) <= {"$elemMatch", "$slice"}
+        }
+        if not expressions:
+            return find_and_modify(self, query, projection, *args, **kwargs)
+
+        document = find_and_modify(self, query, None, *args, **kwargs)
+        if document is None:
+            return None
+
+        result = {"_id": document["_id"]} if projection.get("_id", 1) else {}
+        for field, value in projection.items():
+            if field in expressions:
+                result[field] = mongomock_aggregate._parse_expression(value, document)
+            elif field != "_id" and value and field in document:
+                result[field] = document[field]
+        return result
+
+    mongomock_collection.Collection._find_and_modify = with_expressions
+
+
+_support_round_expression()
+_support_bulk_sort_argument()
+_support_projection_expressions()
+
+
+DOCUMENT_MODELS = [
+    model for model in vars(connection).values()
+    if isinstance(model, type) and hasattr(model, "get_settings") and model.__module__.startswith("app.models")
+]
+
+
+@pytest.fixture
+async def db(monkeypatch):
+    """Base de datos en memoria con los modelos inicializados"""
+    client = AsyncMongoMockClient()
+    await init_beanie(database=client["calero_test"], document_models=DOCUMENT_MODELS)
+
+    # Caches globales: un test no debe ver datos del anterior
+    coupon_service._cache.clear()
+    review_service._first_pages.clear()
+    wishlist_service._memberships.clear()
+    _user_cache.clear()
+    shipping_service._loaded_at = None
+    monkeypatch.setattr(rate_limit_module, "rate_limiter", MemoryRateLimitBackend())
+
+    yield client["calero_test"]
+
+
+@pytest.fixture
+def interleaved_io(monkeypatch):
+    """
+    Hace que cada operación de la base ceda el event loop antes y después
+    de ejecutarse, como lo haría un round trip real. Sin esto mongomock
+    ejecuta todo de forma síncrona y las corrutinas "concurrentes" de un
+    stress test nunca se intercalan.
+    """
+    def yielding(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            await asyncio.sleep(0)
+            result = await method(*args, **kwargs)
+            await asyncio.sleep(0)
+            return result
+        return wrapper
+
+    for cls in (mongomock_motor.AsyncMongoMockCollection, mongomock_motor.AsyncCursor):
+        for name in dir(cls):
+            method = getattr(cls, name, None)
+            if not name.startswith("_") and inspect.iscoroutinefunction(method):
+                monkeypatch.setattr(cls, name, yielding(method))
+
+
+@pytest.fixture
+def query_log(monkeypatch):
+    """
+    Registra las lecturas contra la base como (colección, método, filtro),
+    para verificar cuántas consultas hace una ruta.
+    """
+    log = []
+
+    def recording(name, method):
+        def record(self, *args, **kwargs):
+            log.append((self.name, name, args[0] if args else kwargs.get("filter", kwargs.get("pipeline"))))
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def wrapper(self, *args, **kwargs):
+                record(self, *args, **kwargs)
+                return await method(self, *args, **kwargs)
+        else:
+            @functools.wraps(method)
+            def wrapper(self, *args, **kwargs):
+                record(self, *args, **kwargs)
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    cls = mongomock_motor.AsyncMongoMockCollection
+    for name in ("find", "find_one", "aggregate", "count_documents"):
+        monkeypatch.setattr(cls, name, recording(name, getattr(cls, name)))
+
+    return log
+
+
+@pytest.fixture
+def fake_sendgrid(monkeypatch):
+    """
+    SendGrid falso (scripts/fake_sendgrid.py) en un hilo, en un puerto libre,
+    con SENDGRID_API_HOST y el cliente de email_service apuntando a él.
+    """
+    monkeypatch.setattr(FakeSendGridHandler, "calls", 0)
+    monkeypatch.setattr(FakeSendGridHandler, "recipients", 0)
+    monkeypatch.setattr(FakeSendGridHandler, "sent_to", [])
+    monkeypatch.setattr(FakeSendGridHandler, "fail_every", 0)
+    monkeypatch.setattr(FakeSendGridHandler, "forced_statuses", [])
+    monkeypatch.setattr(FakeSendGridHandler, "log_message", lambda *args: None)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSendGridHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(settings, "SENDGRID_API_HOST", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(email_service, "sg", SendGridAPIClient("fake", host=settings.SENDGRID_API_HOST))
+    yield FakeSendGridHandler
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Crea usuarios de prueba con dirección de envío"""
+    counter = {"n": 0}
+
+    async def factory(role: str = "customer", **fields) -> User:
+        counter["n"] += 1
+        data = dict(
+            email=f"user{counter['n']}@example.com",
+            hashed_password="hashed",
+            first_name=f"Usuario{counter['n']}",
+            last_name="Prueba",
+            phone_number="7000-0000",
+            role=role,
+            address=Address(street="Av. La Capilla 123", city="San Salvador", state="San Salvador")
+        )
+        user = User(**{**data, **fields})
+        await user.create()
+        return user
+
+    return factory
+
+
+@pytest.fixture
+async def client_as(db):
+    """
+    Cliente HTTP contra la app (sin levantar servidor) autenticado como el
+    usuario indicado: client = await client_as(user)
+    """
+    from app.main import app
+
+    clients = []
+
+    async def factory(user: User) -> httpx.AsyncClient:
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_admin_user] = lambda: user
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        clients.append(client)
+        return client
+
+    yield factory
+
+    for client in clients:
+        await client.aclose()
+    app.dependency_overrides.clear()
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def days(n: int) -> timedelta:
+    return timedelta(days=n)
@@ -0,0 +1,157 @@
+"""
+Dependencias de autenticación: cache de usuarios resueltos desde el token
+(copias por request, invalidación y métricas) y admins confiando en los
+claims firmados con TRUST_TOKEN_ROLE_CLAIM.
+"""
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import cache as cache_module
+from app.core.config import settings
+from app.core.dependencies import (
+    get_current_admin_user,
+    get_current_user,
+    invalidate_cached_user,
+    user_cache_stats
+)
+from app.core.security import create_access_context
+from app.models.user_model import User
+
+
+def token_for(user: User) -> str:
+    return create_access_context(subject=user.email, role=user.role, user_id=user.id)
+
+
+def user_reads(query_log) -> int:
+    return sum(1 for entry in query_log if entry[0] == "users")
+
+
+@pytest.fixture
+async def api(db):
+    """Cliente HTTP contra la app con autenticación real por token"""
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_repeated_requests_hit_the_cache(make_user, query_log):
+    user = await make_user()
+    token = token_for(user)
+    stats = user_cache_stats()
+    query_log.clear()
+
+    for _ in range(3):
+        assert (await get_current_user(token)).id == user.id
+
+    assert user_reads(query_log) == 1
+    after = user_cache_stats()
+    assert after["hits"] - stats["hits"] == 2
+    assert after["misses"] - stats["misses"] == 1
+    assert after["size"] == 1
+
+
+async def test_each_request_gets_its_own_copy(make_user):
+    user = await make_user(first_name="Ana")
+    token = token_for(user)
+
+    first = await get_current_user(token)
+    first.first_name = "Modificado en el request"
+    first.address.city = "Santa Ana"
+
+    second = await get_current_user(token)
+    assert second is not first
+    assert second.first_name == "Ana"
+    assert second.address.city == "San Salvador"
+
+
+async def test_update_profile_invalidates_the_cached_user(make_user, api):
+    user = await make_user(first_name="Ana")
+    headers = {"Authorization": f"Bearer {token_for(user)}"}
+
+    assert (await api.get("/users/me", headers=headers)).json()["first_name"] == "Ana"
+
+    response = await api.patch("/users/me", headers=headers, json={"first_name": "Beatriz"})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Beatriz"
+
+    assert (await api.get("/users/me", headers=headers)).json()["first_name"] == "Beatriz"
+
+
+async def test_role_and_status_changes_apply_after_invalidation(make_user):
+    admin = await make_user(role="admin")
+    token = token_for(admin)
+    assert (await get_current_admin_user(token)).id == admin.id
+
+    # Cambio hecho por fuera del request (ej. otro admin o un script)
+    await User.find_one(User.id == admin.id).update({"$set": {"role": "customer", "is_active": False}})
+    assert (await get_current_admin_user(token)).role == "admin"
+
+    invalidate_cached_user(admin.email)
+    with pytest.raises(HTTPException) as error:
+        await get_current_admin_user(token)
+    assert error.value.status_code == 403
+    assert (await get_current_user(token)).is_active is False
+
+
+async def test_cached_users_expire_after_the_ttl(make_user, monkeypatch):
+    user = await make_user()
+    token = token_for(user)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock["now"])
+
+    await get_current_user(token)
+    await User.find_one(User.id == user.id).update({"$set": {"role": "admin"}})
+    assert (await get_current_user(token)).role == "customer"
+
+    clock["now"] += settings.USER_CACHE_TTL_SECONDS + 1
+    assert (await get_current_user(token)).role == "admin"
+
+
+async def test_auth_stats_reports_the_cache_hit_rate(make_user, api):
+    admin = await make_user(role="admin")
+    headers = {"Authorization": f"Bearer {token_for(admin)}"}
+
+    await api.get("/users/me", headers=headers)
+    response = await api.get("/users/admin/auth-stats", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["user_cache"] == user_cache_stats()
+    assert 0 < response.json()["user_cache"]["hit_rate"] <= 1
+
+
+async def test_trust_mode_builds_the_admin_from_claims(make_user, query_log, monkeypatch):
+    monkeypatch.setattr(settings, "TRUST_TOKEN_ROLE_CLAIM", True)
+    admin = await make_user(role="admin")
+    customer = await make_user()
+    query_log.clear()
+
+    identity = await get_current_admin_user(token_for(admin))
+
+    assert (identity.id, identity.email, identity.role) == (admin.id, admin.email, "admin")
+    with pytest.raises(HTTPException) as error:
+        await get_current_admin_user(token_for(customer))
+    assert error.value.status_code == 403
+    assert user_reads(query_log) == 0
+
+
+async def test_trust_mode_falls_back_to_lookup_for_tokens_without_uid(make_user, query_log, monkeypatch):
+    monkeypatch.setattr(settings, "TRUST_TOKEN_ROLE_CLAIM", True)
+    admin = await make_user(role="admin")
+    query_log.clear()
+
+    identity = await get_current_admin_user(create_access_context(subject=admin.email, role="admin"))
+
+    assert identity.first_name == admin.first_name
+    assert user_reads(query_log) == 1
+
+
+async def test_without_trust_mode_the_stored_role_decides(make_user):
+    """Un token con rol admin de antes de una degradación no da acceso"""
+    customer = await make_user()
+    stale_claim = create_access_context(subject=customer.email, role="admin", user_id=customer.id)
+
+    with pytest.raises(HTTPException) as error:
+        await get_current_admin_user(stale_claim)
+    assert error.value.status_code == 403
@@ -0,0 +1,110 @@
+"""
+Envíos masivos contra el SendGrid falso de scripts/fake_sendgrid.py
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.models.broadcast_model import EmailBroadcast, BroadcastStatus
+from app.schemas.broadcast_schema import BroadcastCreate
+from app.services.broadcast_service import BroadcastService
+
+RECIPIENTS = 25
+
+
+@pytest.fixture(autouse=True)
+def broadcast_settings(monkeypatch):
+    """Lotes chicos y reintentos inmediatos"""
+    monkeypatch.setattr(settings, "BROADCAST_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 0)
+
+
+@pytest.fixture
+async def recipients(make_user):
+    await make_user(role="admin")
+    return [await make_user() for _ in range(RECIPIENTS)]
+
+
+def broadcast_in(**fields) -> BroadcastCreate:
+    data = dict(name="Colección de verano", subject="Llegó el verano", html_content="<p>Hola -first_name-</p>")
+    data.update(fields)
+    return BroadcastCreate(**data)
+
+
+async def wait_for_tasks(service: BroadcastService):
+    await asyncio.gather(*list(service._tasks.values()))
+
+
+async def test_broadcast_reaches_every_recipient_once(db, fake_sendgrid, recipients):
+    service = BroadcastService()
+    broadcast = await service.create(broadcast_in(recipients_per_second=10000), created_by="admin@example.com")
+    await wait_for_tasks(service)
+
+    stored = await EmailBroadcast.get(broadcast.id)
+    assert stored.status == BroadcastStatus.COMPLETED
+    assert stored.sent_count == RECIPIENTS
+    assert stored.lease_owner is None
+    assert fake_sendgrid.calls == 3  # lotes de 10, 10 y 5
+    assert sorted(fake_sendgrid.sent_to) == sorted(u.email for u in recipients)
+
+
+async def test_broadcast_retries_transient_errors(db, fake_sendgrid, recipients):
+    fake_sendgrid.fail_every = 2
+    service = BroadcastService()
+    broadcast = await service.create(broadcast_in(recipients_per_second=10000), created_by="admin@example.com")
+    await wait_for_tasks(service)
+
+    stored = await EmailBroadcast.get(broadcast.id)
+    assert stored.status == BroadcastStatus.COMPLETED
+    assert fake_sendgrid.calls > 3
+    assert sorted(fake_sendgrid.sent_to) == sorted(u.email for u in recipients)
+
+
+async def test_start_is_refused_while_local_run_is_alive(db, fake_sendgrid, recipients):
+    service = BroadcastService()
+    # 10 destinatarios por segundo: cada lote espera ~1s antes del siguiente
+    broadcast = await service.create(broadcast_in(recipients_per_second=10), created_by="admin@example.com")
+    while fake_sendgrid.calls == 0:
+        await asyncio.sleep(0.01)
+
+    # Pausado pero con la ejecución aún viva: no se puede reanudar todavía
+    assert await service.pause(broadcast.id)
+    assert await service.start(broadcast.id) is None
+
+    await wait_for_tasks(service)
+    stored = await EmailBroadcast.get(broadcast.id)
+    assert stored.status == BroadcastStatus.PAUSED
+    assert stored.sent_count == len(fake_sendgrid.sent_to) < RECIPIENTS
+
+    # Terminada la ejecución, reanuda donde quedó y sin repetir destinatarios
+    await EmailBroadcast.get_pymongo_collection().update_one(
+        {"_id": broadcast.id}, {"$set": {"recipients_per_second": 10000}}
+    )
+    assert await service.start(broadcast.id)
+    await wait_for_tasks(service)
+
+    stored = await EmailBroadcast.get(broadcast.id)
+    assert stored.status == BroadcastStatus.COMPLETED
+    assert sorted(fake_sendgrid.sent_to) == sorted(u.email for u in recipients)
+
+
+async def test_superseded_run_cannot_save_progress(db, fake_sendgrid, recipients):
+    service = BroadcastService()
+    broadcast = await service.create(broadcast_in(start=False), created_by="admin@example.com")
+
+    first_run = await service.start(broadcast.id)
+    service._tasks[broadcast.id].cancel()
+    await asyncio.gather(*service._tasks.values(), return_exceptions=True)
+    await service.stop()  # libera el lease de la ejecución cancelada
+    await asyncio.sleep(0.01)
+
+    second_run = await service.start(broadcast.id)
+    assert second_run.lease_owner != first_run.lease_owner
+    await wait_for_tasks(service)
+
+    # El lote de la primera ejecución ya no se registra
+    assert not await service._save_progress(first_run, recipients[-1].id, 10)
+    stored = await EmailBroadcast.get(broadcast.id)
+    assert stored.status == BroadcastStatus.COMPLETED
+    assert stored.sent_count == RECIPIENTS
@@ -0,0 +1,145 @@
+"""
+Evaluación de cupones por línea: applicable_categories y excluded_products
+"""
+from app.models.coupon_model import Coupon, DiscountType
+from app.models.product_model import Product
+from app.models.user_model import Address
+from app.schemas.order_schema import OrderItemInput
+from app.services.pricing_service import pricing_service
+from tests.conftest import utc_now, days
+
+ADDRESS = Address(street="Av. La Capilla 123", city="San Salvador", state="San Salvador")
+
+
+def build_coupon(**fields) -> Coupon:
+    """Cupón sin base de datos: solo se evalúa, no se guarda"""
+    data = dict(
+        code="PROMO",
+        description="Cupón de prueba",
+        discount_type=DiscountType.PERCENTAGE,
+        discount_value=10,
+        minimum_amount=None,
+        maximum_discount=None,
+        max_uses=None,
+        max_uses_per_user=1,
+        current_uses=0,
+        applicable_categories=[],
+        excluded_products=[],
+        is_active=True,
+        valid_from=utc_now() - days(1),
+        valid_until=utc_now() + days(1)
+    )
+    data.update(fields)
+    return Coupon.model_construct(**data)
+
+
+LINES = [
+    ("p1", "bolsos", 40.0),
+    ("p2", "sandalias", 30.0),
+    ("p3", "bolsos", 20.0),
+]
+
+
+def test_eligible_subtotal_without_restrictions_uses_all_lines():
+    assert build_coupon().eligible_subtotal(LINES) == 90.0
+
+
+def test_eligible_subtotal_filters_by_category():
+    coupon = build_coupon(applicable_categories=["bolsos"])
+    assert coupon.eligible_subtotal(LINES) == 60.0
+
+
+def test_eligible_subtotal_skips_excluded_products():
+    coupon = build_coupon(excluded_products=["p1"])
+    assert coupon.eligible_subtotal(LINES) == 50.0
+
+
+def test_eligible_subtotal_combines_category_and_exclusions():
+    excluded = [f"x{i}" for i in range(10000)] + ["p3"]
+    coupon = build_coupon(applicable_categories=["bolsos"], excluded_products=excluded)
+    assert coupon.eligible_subtotal(LINES) == 40.0
+
+
+def test_calculate_discount_caps_at_maximum_and_eligible_subtotal():
+    coupon = build_coupon(discount_value=50, maximum_discount=15)
+    assert coupon.calculate_discount(60.0) == 15
+
+    fixed = build_coupon(discount_type=DiscountType.FIXED, discount_value=25)
+    assert fixed.calculate_discount(20.0) == 20.0
+
+
+async def create_products():
+    bag = Product(name="Bolso", base_price=40.0, category="bolsos", stock=10)
+    sandal = Product(name="Sandalia", base_price=30.0, category="sandalias", stock=10)
+    await bag.create()
+    await sandal.create()
+    return bag, sandal
+
+
+async def create_coupon(**fields) -> Coupon:
+    coupon = Coupon(
+        code="BOLSOS10",
+        description="10% en bolsos",
+        discount_type=DiscountType.PERCENTAGE,
+        discount_value=10,
+        valid_from=utc_now() - days(1),
+        valid_until=utc_now() + days(1),
+        **fields
+    )
+    await coupon.create()
+    return coupon
+
+
+async def test_price_cart_applies_coupon_only_to_eligible_lines(db):
+    bag, sandal = await create_products()
+    await create_coupon(applicable_categories=["bolsos"])
+
+    priced = await pricing_service.price_cart(
+        [OrderItemInput(product_id=bag.id, quantity=1), OrderItemInput(product_id=sandal.id, quantity=2)],
+        ADDRESS,
+        coupon_code="bolsos10"
+    )
+
+    assert priced.subtotal == 100.0
+    assert priced.discount_amount == 4.0  # 10% de los $40 en bolsos
+    assert priced.coupon_code == "BOLSOS10"
+
+
+async def test_price_cart_reports_coupon_that_does_not_apply(db):
+    bag, sandal = await create_products()
+    await create_coupon(excluded_products=[str(sandal.id)], applicable_categories=["sandalias"])
+
+    priced = await pricing_service.price_cart(
+        [OrderItemInput(product_id=sandal.id, quantity=1)],
+        ADDRESS,
+        coupon_code="BOLSOS10"
+    )
+
+    assert priced.discount_amount == 0
+    assert priced.coupon_code is None
+    assert priced.coupon_message == "El cupón no aplica a los productos del carrito"
+
+
+async def test_validate_coupon_uses_cart_lines(db, client_as, make_user):
+    bag, sandal = await create_products()
+    await create_coupon(applicable_categories=["bolsos"])
+    client = await client_as(await make_user())
+
+    response = await client.post("/coupons/validate", json={
+        "code": "BOLSOS10",
+        "subtotal": 100.0,
+        "cart_items": [
+            {"product_id": str(bag.id), "quantity": 1, "price": 40.0},
+            {"product_id": str(sandal.id), "quantity": 2, "price": 30.0}
+        ]
+    })
+    assert response.status_code == 200
+    assert response.json()["discount_amount"] == 4.0
+    assert response.json()["new_total"] == 96.0
+
+    response = await client.post("/coupons/validate", json={
+        "code": "BOLSOS10",
+        "subtotal": 60.0,
+        "cart_items": [{"product_id": str(sandal.id), "quantity": 2, "price": 30.0}]
+    })
+    assert response.status_code == 400
@@ -0,0 +1,242 @@
+"""
+Cola de salida de emails con una entrega falsa: reintentos, backoff,
+FAILED, reenvío y leases. Al final, la entrega real de EmailService
+contra el SendGrid falso de scripts/fake_sendgrid.py.
+"""
+import asyncio
+from datetime import timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.email_outbox_model import EmailOutboxMessage, EmailOutboxStatus
+from app.services.email_outbox import EmailOutbox, DeliveryResult
+from app.services.email_service import email_service
+from tests.conftest import utc_now
+
+
+class FakeDeliver:
+    """Entrega falsa: devuelve los resultados indicados en orden (luego éxito)"""
+
+    def __init__(self, *results: DeliveryResult, delay: float = 0):
+        self.results = list(results)
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, message: EmailOutboxMessage) -> DeliveryResult:
+        self.calls.append(message.id)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.results.pop(0) if self.results else DeliveryResult(success=True)
+
+
+TRANSIENT = DeliveryResult(success=False, retryable=True, error="SendGrid 503")
+PERMANENT = DeliveryResult(success=False, retryable=False, error="SendGrid 400")
+
+
+@pytest.fixture
+def outbox_settings(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(settings, "EMAIL_LEASE_SECONDS", 120)
+
+
+def build_outbox(deliver) -> EmailOutbox:
+    outbox = EmailOutbox()
+    outbox._deliver = deliver
+    return outbox
+
+
+async def enqueue(outbox: EmailOutbox) -> EmailOutboxMessage:
+    message = EmailOutboxMessage(to_email="cliente@example.com", subject="Hola", html_content="<p>Hola</p>", kind="welcome")
+    await outbox.enqueue(message)
+    return message
+
+
+async def make_ready(message: EmailOutboxMessage):
+    """Adelanta el reintento programado"""
+    await EmailOutboxMessage.get_pymongo_collection().update_one(
+        {"_id": message.id}, {"$set": {"next_attempt_at": utc_now()}}
+    )
+
+
+async def deliver_once(outbox: EmailOutbox) -> EmailOutboxMessage:
+    claimed = await outbox.claim()
+    assert claimed is not None
+    await outbox._process(claimed)
+    return await EmailOutboxMessage.get(claimed.id)
+
+
+async def test_transient_failures_are_retried_with_exponential_backoff(db, outbox_settings):
+    deliver = FakeDeliver(TRANSIENT, TRANSIENT)
+    outbox = build_outbox(deliver)
+    message = await enqueue(outbox)
+
+    delays = []
+    for _ in range(2):
+        before = utc_now()
+        stored = await deliver_once(outbox)
+        assert stored.status == EmailOutboxStatus.PENDING
+        assert stored.lease_owner is None
+        delays.append((stored.next_attempt_at.replace(tzinfo=timezone.utc) - before).total_seconds())
+
+        # Antes del reintento no se puede reclamar
+        assert await outbox.claim() is None
+        await make_ready(message)
+
+    assert [round(d) for d in delays] == [10, 20]
+
+    stored = await deliver_once(outbox)
+    assert stored.status == EmailOutboxStatus.SENT
+    assert stored.attempts == 3
+    assert [a.success for a in stored.attempt_log] == [False, False, True]
+
+
+async def test_message_fails_after_max_attempts_and_can_be_replayed(db, outbox_settings):
+    deliver = FakeDeliver(TRANSIENT, TRANSIENT, TRANSIENT)
+    outbox = build_outbox(deliver)
+    message = await enqueue(outbox)
+
+    for _ in range(settings.EMAIL_MAX_ATTEMPTS):
+        stored = await deliver_once(outbox)
+        await make_ready(message)
+
+    assert stored.status == EmailOutboxStatus.FAILED
+    assert stored.attempts == settings.EMAIL_MAX_ATTEMPTS
+    assert stored.last_error == "SendGrid 503"
+    assert await outbox.claim() is None
+    assert [m.id for m in await outbox.list_failed()] == [message.id]
+
+    # El reenvío restablece el presupuesto de reintentos
+    assert await outbox.replay(message.id)
+    stored = await deliver_once(outbox)
+    assert stored.status == EmailOutboxStatus.SENT
+    assert stored.attempts == 1
+    assert len(deliver.calls) == settings.EMAIL_MAX_ATTEMPTS + 1
+
+
+async def test_permanent_failure_is_not_retried(db, outbox_settings):
+    outbox = build_outbox(FakeDeliver(PERMANENT))
+    await enqueue(outbox)
+
+    stored = await deliver_once(outbox)
+    assert stored.status == EmailOutboxStatus.FAILED
+    assert stored.attempts == 1
+
+
+async def test_stale_claim_is_skipped_after_another_instance_takes_over(db, outbox_settings):
+    first_deliver, second_deliver = FakeDeliver(), FakeDeliver()
+    first, second = build_outbox(first_deliver), build_outbox(second_deliver)
+    message = await enqueue(first)
+
+    stale = await first.claim()
+    # El lease vence mientras el email espera en la cola de la primera instancia
+    await EmailOutboxMessage.get_pymongo_collection().update_one(
+        {"_id": message.id}, {"$set": {"lease_until": utc_now() - timedelta(seconds=1)}}
+    )
+    fresh = await second.claim()
+    assert fresh.lease_owner != stale.lease_owner
+
+    await first._process(stale)
+    assert first_deliver.calls == []
+    assert first._counters["lease_lost"] == 1
+
+    await second._process(fresh)
+    stored = await EmailOutboxMessage.get(message.id)
+    assert stored.status == EmailOutboxStatus.SENT
+    assert second_deliver.calls == [message.id]
+
+
+async def test_lease_is_renewed_during_slow_delivery(db, outbox_settings, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_LEASE_SECONDS", 0.3)
+    slow = FakeDeliver(delay=1.0)
+    first, second = build_outbox(slow), build_outbox(FakeDeliver())
+    message = await enqueue(first)
+
+    claimed = await first.claim()
+    delivery = asyncio.create_task(first._process(claimed))
+
+    # Durante la entrega el lease se mantiene vigente: nadie más lo reclama
+    for _ in range(5):
+        await asyncio.sleep(0.2)
+        assert await second.claim() is None
+
+    await delivery
+    stored = await EmailOutboxMessage.get(message.id)
+    assert stored.status == EmailOutboxStatus.SENT
+    assert first._counters["lease_lost"] == 0
+
+
+async def test_workers_deliver_enqueued_messages(db, outbox_settings):
+    deliver = FakeDeliver(TRANSIENT)
+    outbox = EmailOutbox()
+    outbox.start(deliver)
+    try:
+        message = await enqueue(outbox)
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            stored = await EmailOutboxMessage.get(message.id)
+            if stored.status == EmailOutboxStatus.PENDING and stored.attempts == 1:
+                break
+        assert stored.next_attempt_at.replace(tzinfo=timezone.utc) > utc_now()
+
+        await make_ready(message)
+        outbox._notify()
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            stored = await EmailOutboxMessage.get(message.id)
+            if stored.status == EmailOutboxStatus.SENT:
+                break
+        assert stored.status == EmailOutboxStatus.SENT
+    finally:
+        await outbox.stop(timeout=1)
+
+
+# ==================== Entrega real contra el SendGrid falso ====================
+
+@pytest.mark.parametrize("status, retryable", [(429, True), (500, True), (503, True), (400, False), (401, False)])
+async def test_sendgrid_errors_are_classified_by_status(db, fake_sendgrid, status, retryable):
+    fake_sendgrid.forced_statuses = [status]
+    message = EmailOutboxMessage(to_email="cliente@example.com", subject="Hola", html_content="<p>Hola</p>", kind="welcome")
+
+    result = await email_service.deliver(message)
+
+    assert result.success is False
+    assert result.retryable is retryable
+    assert str(status) in result.error
+    assert fake_sendgrid.calls == 1 and fake_sendgrid.sent_to == []
+
+
+async def test_sendgrid_accepts_the_message(db, fake_sendgrid):
+    message = EmailOutboxMessage(to_email="cliente@example.com", subject="Hola", html_content="<p>Hola</p>", kind="welcome")
+
+    assert await email_service.deliver(message) == DeliveryResult(success=True)
+    assert fake_sendgrid.sent_to == ["cliente@example.com"]
+
+
+async def test_outbox_retries_sendgrid_rate_limits_until_sent(db, outbox_settings, fake_sendgrid):
+    fake_sendgrid.forced_statuses = [429, 503]
+    outbox = build_outbox(email_service.deliver)
+    message = await enqueue(outbox)
+
+    for _ in range(2):
+        stored = await deliver_once(outbox)
+        assert stored.status == EmailOutboxStatus.PENDING
+        await make_ready(message)
+
+    stored = await deliver_once(outbox)
+    assert stored.status == EmailOutboxStatus.SENT
+    assert [a.success for a in stored.attempt_log] == [False, False, True]
+    assert fake_sendgrid.sent_to == ["cliente@example.com"]
+
+
+async def test_outbox_fails_permanently_on_sendgrid_client_errors(db, outbox_settings, fake_sendgrid):
+    fake_sendgrid.forced_statuses = [400]
+    outbox = build_outbox(email_service.deliver)
+    await enqueue(outbox)
+
+    stored = await deliver_once(outbox)
+    assert stored.status == EmailOutboxStatus.FAILED
+    assert stored.attempts == 1
+    assert "400" in stored.last_error
+    assert fake_sendgrid.calls == 1
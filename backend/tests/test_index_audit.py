@@ -0,0 +1,70 @@
+"""
+Auditoría de índices: lectura de planes clásicos y SBE
+"""
+from app.db.index_audit import _collect_plan, QUERY_SHAPES
+from app.routes.users_routes import build_user_filters
+
+CLASSIC_PLAN = {
+    "stage": "SORT",
+    "inputStage": {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "indexName": "user_product_orders_idx"}
+    }
+}
+
+
+def collect(plan):
+    stages, index_names = [], []
+    _collect_plan(plan, stages, index_names)
+    return stages, index_names
+
+
+def test_collect_classic_plan():
+    assert collect(CLASSIC_PLAN) == (["SORT", "FETCH", "IXSCAN"], ["user_product_orders_idx"])
+
+
+def test_collect_sbe_plan_unwraps_query_plan():
+    sbe_plan = {"queryPlan": CLASSIC_PLAN, "slotBasedPlan": {"stages": "[2] sort ..."}}
+    assert collect(sbe_plan) == collect(CLASSIC_PLAN)
+
+
+def test_collect_or_plan_with_input_stages():
+    plan = {"queryPlan": {
+        "stage": "SUBPLAN",
+        "inputStage": {"stage": "OR", "inputStages": [
+            {"stage": "IXSCAN", "indexName": "email_1"},
+            {"stage": "IXSCAN", "indexName": "first_name_1"}
+        ]}
+    }}
+    assert collect(plan) == (["SUBPLAN", "OR", "IXSCAN", "IXSCAN"], ["email_1", "first_name_1"])
+
+
+def test_user_search_shape_uses_route_sort():
+    shape = next(s for s in QUERY_SHAPES if s.route.startswith("GET /users?search="))
+    assert shape.sort == [("created_at", -1), ("_id", -1)]
+
+
+def test_user_search_shape_matches_route_filters():
+    shape = next(s for s in QUERY_SHAPES if s.route.startswith("GET /users?search="))
+    assert shape.filter == build_user_filters(None, None, None, None, "ana")
+
+
+def test_user_search_uses_one_plain_prefix_per_clause():
+    """Sin alternancias: cada regex es ^prefijo literal y se traduce a límites de índice"""
+    clauses = build_user_filters(None, None, None, None, "  ana  ")["$or"]
+
+    assert clauses == [
+        {"email": {"$regex": "^ana"}},
+        {"first_name": {"$regex": "^ana"}},
+        {"first_name": {"$regex": "^Ana"}},
+        {"last_name": {"$regex": "^ana"}},
+        {"last_name": {"$regex": "^Ana"}},
+    ]
+    # Ya capitalizado: un solo prefijo por campo de nombre
+    assert build_user_filters(None, None, None, None, "Ana")["$or"] == [
+        {"email": {"$regex": "^ana"}},
+        {"first_name": {"$regex": "^Ana"}},
+        {"last_name": {"$regex": "^Ana"}},
+    ]
+    # Los metacaracteres se escapan
+    assert {"first_name": {"$regex": r"^A\.b\+"}} in build_user_filters(None, None, None, None, "a.b+")["$or"]
@@ -0,0 +1,196 @@
+"""
+Stress test de create_order: muchas órdenes concurrentes contra stock
+y usos de cupón limitados no deben exceder ninguno de los dos límites.
+También: transiciones de estado y updates parciales concurrentes.
+"""
+import asyncio
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+
+from app.models.coupon_model import Coupon, CouponRedemption, DiscountType
+from app.models.orders_model import Order, OrderStatus
+from app.models.product_model import Product
+from app.routes.order_routes import create_order, refund_order, update_order_status, update_shipping_info
+from app.routes.products_routes import update_product
+from app.schemas.order_schema import OrderCreate, OrderItemInput, OrderStatusUpdate, ShippingUpdate
+from app.schemas.product_schema import ProductUpdate
+from tests.conftest import utc_now, days
+
+CONCURRENT_ORDERS = 60
+
+pytestmark = pytest.mark.usefixtures("interleaved_io")
+
+
+async def place_orders(users, product, quantity=1, coupon_code=None):
+    """Dispara create_order en paralelo; retorna (órdenes creadas, errores)"""
+    async def place(user):
+        order_in = OrderCreate(
+            items=[OrderItemInput(product_id=product.id, quantity=quantity)],
+            coupon_code=coupon_code
+        )
+        return await create_order(order_in, current_user=user)
+
+    results = await asyncio.gather(*[place(user) for user in users], return_exceptions=True)
+    unexpected = [r for r in results if isinstance(r, Exception) and not isinstance(r, HTTPException)]
+    assert not unexpected, unexpected
+
+    created = [r for r in results if isinstance(r, Order)]
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert all(r.status_code == 400 for r in rejected)
+    return created, rejected
+
+
+async def create_product(stock: int) -> Product:
+    product = Product(name="Bolso de cuero", base_price=20.0, category="bolsos", stock=stock, weight_kg=0.5)
+    await product.create()
+    return product
+
+
+async def create_coupon(**fields) -> Coupon:
+    coupon = Coupon(
+        code="STRESS10",
+        description="Cupón de prueba",
+        discount_type=DiscountType.FIXED,
+        discount_value=5,
+        valid_from=utc_now() - days(1),
+        valid_until=utc_now() + days(1),
+        **fields
+    )
+    await coupon.create()
+    return coupon
+
+
+async def test_harness_interleaves_requests(db):
+    """Control: un read-modify-write ingenuo pierde incrementos bajo este harness"""
+    product = await create_product(stock=0)
+
+    async def naive_increment():
+        current = await Product.get(product.id)
+        await Product.find_one(Product.id == product.id).update({"$set": {"stock": current.stock + 1}})
+
+    await asyncio.gather(*[naive_increment() for _ in range(20)])
+    assert (await Product.get(product.id)).stock < 20
+
+
+async def test_concurrent_orders_never_oversell_stock(make_user):
+    product = await create_product(stock=7)
+    users = [await make_user() for _ in range(CONCURRENT_ORDERS)]
+
+    created, rejected = await place_orders(users, product, quantity=2)
+
+    product = await Product.get(product.id)
+    assert product.stock >= 0
+    assert len(created) == 3  # 7 // 2
+    assert product.stock == 7 - 2 * len(created)
+    assert len(rejected) == CONCURRENT_ORDERS - len(created)
+
+
+async def test_concurrent_redemptions_respect_max_uses(make_user):
+    product = await create_product(stock=1000)
+    coupon = await create_coupon(max_uses=10, max_uses_per_user=1)
+    users = [await make_user() for _ in range(CONCURRENT_ORDERS)]
+
+    created, _ = await place_orders(users, product, coupon_code=coupon.code)
+
+    coupon = await Coupon.get(coupon.id)
+    assert coupon.current_uses <= coupon.max_uses
+    assert coupon.current_uses == len(created) == 10
+    assert await CouponRedemption.find(CouponRedemption.coupon_id == coupon.id).count() == 10
+
+    # Las órdenes rechazadas devolvieron el stock
+    product = await Product.get(product.id)
+    assert product.stock == 1000 - len(created)
+
+
+async def test_concurrent_redemptions_respect_per_user_limit(make_user):
+    product = await create_product(stock=1000)
+    coupon = await create_coupon(max_uses=None, max_uses_per_user=2)
+    user = await make_user()
+
+    created, _ = await place_orders([user] * 20, product, coupon_code=coupon.code)
+
+    coupon = await Coupon.get(coupon.id)
+    assert len(created) == 2
+    assert coupon.current_uses == 2
+    assert await CouponRedemption.find(CouponRedemption.user_id == user.id).count() == 2
+
+
+async def test_stock_failure_releases_coupon_use(make_user):
+    product = await create_product(stock=3)
+    coupon = await create_coupon(max_uses=50, max_uses_per_user=1)
+    users = [await make_user() for _ in range(CONCURRENT_ORDERS)]
+
+    created, _ = await place_orders(users, product, coupon_code=coupon.code)
+
+    coupon = await Coupon.get(coupon.id)
+    product = await Product.get(product.id)
+    assert product.stock == 0
+    assert len(created) == 3
+    # Solo las órdenes creadas conservan su uso del cupón
+    assert coupon.current_uses == 3
+    assert await CouponRedemption.count() == 3
+
+
+async def test_concurrent_refunds_restore_stock_once(make_user):
+    product = await create_product(stock=10)
+    admin = await make_user(role="admin")
+    (order,), _ = await place_orders([await make_user()], product, quantity=4)
+
+    results = await asyncio.gather(
+        *[refund_order(str(order.id), notes="Producto dañado", current_user=admin) for _ in range(10)],
+        return_exceptions=True
+    )
+
+    refunded = [r for r in results if isinstance(r, Order)]
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(refunded) == 1
+    assert len(rejected) == 9 and all(r.status_code == 400 for r in rejected)
+
+    product = await Product.get(product.id)
+    assert product.stock == 10
+    order = await Order.get(order.id)
+    assert order.status == OrderStatus.REFUNDED
+    assert [e.status for e in order.tracking_history].count(OrderStatus.REFUNDED) == 1
+
+
+async def test_refund_of_cancelled_order_does_not_restore_stock_again(make_user):
+    product = await create_product(stock=10)
+    admin = await make_user(role="admin")
+    (order,), _ = await place_orders([await make_user()], product, quantity=4)
+    await order.push_tracking_event(status=OrderStatus.CANCELLED)
+
+    with pytest.raises(HTTPException):
+        await refund_order(str(order.id), notes="Duplicado", current_user=admin)
+    assert (await Product.get(product.id)).stock == 6
+
+
+async def test_partial_order_updates_do_not_clobber_each_other(make_user):
+    product = await create_product(stock=10)
+    admin = await make_user(role="admin")
+    (order,), _ = await place_orders([await make_user()], product)
+
+    # Cada ruta lee la orden, espera y escribe solo sus campos
+    await asyncio.gather(
+        update_order_status(str(order.id), OrderStatusUpdate(status=OrderStatus.PAID, notes="Pago manual"), current_user=admin),
+        update_shipping_info(str(order.id), ShippingUpdate(tracking_number="TRK-1", carrier="Correos"), current_user=admin)
+    )
+
+    order = await Order.get(order.id)
+    assert order.status == OrderStatus.PAID
+    assert order.tracking_number == "TRK-1"
+    assert order.carrier == "Correos"
+    assert [e.status for e in order.tracking_history] == [OrderStatus.PENDING, OrderStatus.PAID]
+
+
+async def test_product_edit_does_not_clobber_concurrent_stock_decrements(make_user):
+    product = await create_product(stock=100)
+    admin = await make_user(role="admin")
+    users = [await make_user() for _ in range(20)]
+
+    edit = update_product(str(product.id), ProductUpdate(name="Bolso de cuero natural"), BackgroundTasks(), current_user=admin)
+    (created, _), _ = await asyncio.gather(place_orders(users, product), edit)
+
+    product = await Product.get(product.id)
+    assert product.name == "Bolso de cuero natural"
+    assert product.stock == 100 - len(created) == 80
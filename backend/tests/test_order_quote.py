@@ -0,0 +1,98 @@
+"""
+Cotización firmada: /orders/quote -> POST /orders/ con quote_token
+"""
+from app.core.config import settings
+from app.models.product_model import Product
+
+
+async def create_product(price: float = 40.0, stock: int = 10) -> Product:
+    product = Product(name="Bolso de cuero", base_price=price, category="bolsos", stock=stock)
+    await product.create()
+    return product
+
+
+def cart(product: Product, quantity: int = 1) -> dict:
+    return {"items": [{"product_id": str(product.id), "quantity": quantity}]}
+
+
+async def quote(client, body: dict) -> dict:
+    response = await client.post("/orders/quote", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["quote_token"]
+    return data
+
+
+async def test_quote_token_round_trip_keeps_quoted_prices(db, client_as, make_user):
+    product = await create_product(price=40.0)
+    client = await client_as(await make_user())
+    quoted = await quote(client, cart(product, 2))
+
+    # Un cambio de precio posterior no afecta a la orden cotizada
+    await product.set({"base_price": 55.0})
+
+    response = await client.post("/orders/", json={**cart(product, 2), "quote_token": quoted["quote_token"]})
+    assert response.status_code == 201
+    order = response.json()
+    assert order["subtotal"] == 80.0
+    assert order["total_amount"] == quoted["total_amount"]
+
+    product = await Product.get(product.id)
+    assert product.stock == 8
+
+
+async def test_quote_token_for_another_cart_is_rejected(db, client_as, make_user):
+    product = await create_product()
+    client = await client_as(await make_user())
+    quoted = await quote(client, cart(product, 1))
+
+    response = await client.post("/orders/", json={**cart(product, 3), "quote_token": quoted["quote_token"]})
+    assert response.status_code == 400
+
+    product = await Product.get(product.id)
+    assert product.stock == 10
+
+
+async def test_quote_token_from_another_user_is_rejected(db, client_as, make_user):
+    product = await create_product()
+    quoted = await quote(await client_as(await make_user()), cart(product))
+
+    other = await client_as(await make_user())
+    response = await other.post("/orders/", json={**cart(product), "quote_token": quoted["quote_token"]})
+    assert response.status_code == 400
+
+
+async def test_tampered_quote_token_is_rejected(db, client_as, make_user):
+    product = await create_product()
+    client = await client_as(await make_user())
+    quoted = await quote(client, cart(product))
+
+    response = await client.post("/orders/", json={**cart(product), "quote_token": quoted["quote_token"][:-4] + "AAAA"})
+    assert response.status_code == 400
+
+
+async def test_expired_quote_token_reprices_the_cart(db, client_as, make_user, monkeypatch):
+    product = await create_product(price=40.0)
+    client = await client_as(await make_user())
+
+    monkeypatch.setattr(settings, "QUOTE_TOKEN_EXPIRE_MINUTES", -1)
+    quoted = await quote(client, cart(product))
+    await product.set({"base_price": 55.0})
+
+    response = await client.post("/orders/", json={**cart(product), "quote_token": quoted["quote_token"]})
+    assert response.status_code == 201
+    assert response.json()["subtotal"] == 55.0
+
+
+async def test_quote_token_for_deactivated_product_is_rejected(db, client_as, make_user):
+    product = await create_product()
+    client = await client_as(await make_user())
+    quoted = await quote(client, cart(product))
+
+    await product.set({"is_active": False})
+
+    response = await client.post("/orders/", json={**cart(product), "quote_token": quoted["quote_token"]})
+    assert response.status_code == 404
+
+    product = await Product.get(product.id)
+    assert product.stock == 10
@@ -0,0 +1,125 @@
+"""
+Backends de rate limit: misma regla en memoria y en Mongo
+"""
+import time
+
+import pytest
+
+from app.core import rate_limit as rate_limit_module
+from app.core.rate_limit import RateLimitBackend, MemoryRateLimitBackend, MongoRateLimitBackend, SlidingWindowLimiter
+
+LIMIT = 3
+WINDOW = 60
+
+
+class FakeClock:
+    """
+    Reemplaza time.time y time.monotonic. Empieza en el inicio de la
+    ventana actual: los contadores de Mongo tienen TTL.
+    """
+
+    def __init__(self):
+        self.start = time.time() // WINDOW * WINDOW
+        self.now = self.start
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    def at(self, seconds: float):
+        self.now = self.start + seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit_module, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def backend(request, db) -> RateLimitBackend:
+    return MemoryRateLimitBackend() if request.param == "memory" else MongoRateLimitBackend()
+
+
+async def hits(backend: RateLimitBackend, count: int, key: str = "login:1.2.3.4"):
+    return [await backend.hit(key, LIMIT, WINDOW) for _ in range(count)]
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+async def test_limit_is_enforced_per_key(backend, clock):
+    assert await hits(backend, LIMIT + 1) == [True, True, True, False]
+    assert await backend.is_blocked("login:1.2.3.4", LIMIT, WINDOW)
+
+    assert await hits(backend, 1, key="login:5.6.7.8") == [True]
+    assert not await backend.is_blocked("login:5.6.7.8", LIMIT, WINDOW)
+
+
+async def test_rejected_hits_keep_the_key_blocked(backend, clock):
+    await hits(backend, LIMIT)
+
+    # Insistir durante el bloqueo también cuenta
+    for second in (50, 55, 58):
+        clock.at(second)
+        assert await hits(backend, 1) == [False]
+
+    # Los intentos permitidos ya salieron de la ventana, los rechazados no
+    clock.at(WINDOW + 1)
+    assert await backend.is_blocked("login:1.2.3.4", LIMIT, WINDOW)
+    assert await hits(backend, 1) == [False]
+
+
+async def test_block_expires_after_a_quiet_window(backend, clock):
+    await hits(backend, LIMIT + 2)
+
+    clock.at(WINDOW * 3)
+    assert not await backend.is_blocked("login:1.2.3.4", LIMIT, WINDOW)
+    assert await hits(backend, 1) == [True]
+
+
+def test_memory_limiter_evicts_oldest_keys_when_full(clock):
+    limiter = SlidingWindowLimiter(LIMIT, WINDOW, max_keys=10)
+    for i in range(25):
+        assert limiter.hit(f"ip-{i}")
+
+    assert len(limiter._attempts) <= 10
+    assert "ip-24" in limiter._attempts
+    assert "ip-0" not in limiter._attempts
+
+
+class RecordingBackend(MemoryRateLimitBackend):
+    """Backend en memoria que registra las claves consultadas"""
+
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+
+    async def hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        self.keys.append(key)
+        return await super().hit(key, limit, window_seconds)
+
+    async def is_blocked(self, key: str, limit: int, window_seconds: int) -> bool:
+        self.keys.append(key)
+        return await super().is_blocked(key, limit, window_seconds)
+
+
+async def test_every_call_site_uses_the_configured_backend(db, monkeypatch, make_user, client_as):
+    """Reemplazar rate_limit.rate_limiter alcanza a cupones, búsqueda y login"""
+    from app.services.coupon_service import coupon_service
+
+    backend = RecordingBackend()
+    monkeypatch.setattr(rate_limit_module, "rate_limiter", backend)
+    client = await client_as(await make_user())
+
+    await coupon_service.allow_attempt("1.2.3.4", "promo10")
+    await coupon_service.record_miss("1.2.3.4")
+    await client.get("/products/", params={"search": "bolso"})
+    await client.post("/auth/login", data={"username": "nadie@example.com", "password": "incorrecta"})
+
+    prefixes = {key.split(":")[0] for key in backend.keys}
+    assert prefixes == {"coupon_miss", "coupon_validate", "search", "login"}
@@ -0,0 +1,93 @@
+"""
+scripts/recompute_ratings.py: reconstruye los agregados de rating de cada
+producto desde las reviews aprobadas y reinicia los que no tienen ninguna.
+"""
+import pytest
+from beanie import PydanticObjectId
+
+from app.models.product_model import Product
+from app.models.review_model import ProductReview
+from scripts import recompute_ratings as recompute_module
+
+
+@pytest.fixture(autouse=True)
+def skip_init_db(db, monkeypatch):
+    """La base en memoria ya está inicializada por el fixture db"""
+    async def init_db():
+        pass
+
+    monkeypatch.setattr(recompute_module, "init_db", init_db)
+
+
+async def create_product(name: str, **aggregates) -> Product:
+    product = Product(name=name, base_price=30.0, category="sandalias", stock=5, **aggregates)
+    await product.create()
+    return product
+
+
+async def create_review(product, rating, is_approved=True, verified_purchase=False):
+    await ProductReview(
+        product_id=product.id,
+        user_id=PydanticObjectId(),
+        order_id=PydanticObjectId(),
+        rating=rating,
+        title="Muy buenas",
+        comment="Cómodas y bien terminadas.",
+        verified_purchase=verified_purchase,
+        is_approved=is_approved
+    ).create()
+
+
+async def test_recompute_rebuilds_aggregates_from_approved_reviews():
+    # Agregados desfasados a propósito
+    product = await create_product("Sandalias", review_count=9, rating_sum=2, average_rating=0.2)
+    await create_review(product, 5, verified_purchase=True)
+    await create_review(product, 4, verified_purchase=True)
+    await create_review(product, 4)
+    await create_review(product, 1, is_approved=False)
+
+    await recompute_module.recompute_ratings()
+
+    product = await Product.get(product.id)
+    assert product.review_count == 3
+    assert product.rating_sum == 13
+    assert product.rating_distribution == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+    assert product.verified_review_count == 2
+    assert product.average_rating == 4.33
+
+
+async def test_recompute_resets_products_without_approved_reviews():
+    stale = await create_product(
+        "Bolso",
+        review_count=4,
+        rating_sum=12,
+        rating_distribution={"1": 0, "2": 0, "3": 4, "4": 0, "5": 0},
+        verified_review_count=1,
+        average_rating=3.0
+    )
+    await create_review(stale, 2, is_approved=False)
+    untouched = await create_product("Cartera")
+
+    await recompute_module.recompute_ratings()
+
+    for product_id in (stale.id, untouched.id):
+        product = await Product.get(product_id)
+        assert product.review_count == 0
+        assert product.rating_sum == 0
+        assert product.rating_distribution == {str(stars): 0 for stars in range(1, 6)}
+        assert product.verified_review_count == 0
+        assert product.average_rating == 0
+
+
+async def test_recompute_is_idempotent():
+    product = await create_product("Sandalias")
+    await create_review(product, 3)
+    await create_review(product, 5, verified_purchase=True)
+
+    await recompute_module.recompute_ratings()
+    first = (await Product.get(product.id)).model_dump(exclude={"updated_at"})
+    await recompute_module.recompute_ratings()
+    second = (await Product.get(product.id)).model_dump(exclude={"updated_at"})
+
+    assert first == second
+    assert first["average_rating"] == 4.0
@@ -0,0 +1,129 @@
+"""
+Endpoints de lectura de reviews: resúmenes en lote desde los agregados
+del producto y cache de la primera página de reviews.
+"""
+from beanie import PydanticObjectId
+
+from app.models.product_model import Product
+from app.models.review_model import ProductReview
+from app.routes.review_routes import (
+    REVIEW_SUMMARY_BATCH_MAX,
+    adjust_product_rating,
+    delete_review,
+    get_product_reviews,
+    update_review
+)
+from app.schemas.review_schema import ReviewUpdate
+from app.services.review_service import review_service
+
+
+async def create_product(name: str, ratings=()) -> Product:
+    product = Product(name=name, base_price=30.0, category="sandalias", stock=5)
+    await product.create()
+    for rating in ratings:
+        await adjust_product_rating(product.id, {rating: 1}, verified_delta=1)
+    return product
+
+
+async def test_batch_summary_reads_all_products_with_one_query(make_user, client_as, query_log):
+    rated = await create_product("Sandalias", ratings=[5, 4, 4])
+    unrated = await create_product("Bolso")
+    missing = PydanticObjectId()
+    client = await client_as(await make_user())
+    query_log.clear()
+
+    ids = [rated.id, unrated.id, missing, rated.id]
+    response = await client.get("/reviews/summary/batch", params={"product_ids": ",".join(map(str, ids))})
+
+    assert response.status_code == 200
+    summaries = response.json()
+    assert set(summaries) == {str(rated.id), str(unrated.id)}
+    assert summaries[str(rated.id)] == {
+        "product_id": str(rated.id),
+        "average_rating": 4.33,
+        "total_reviews": 3,
+        "rating_distribution": {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1},
+        "verified_purchase_count": 3,
+    }
+    assert summaries[str(unrated.id)]["total_reviews"] == 0
+
+    product_reads = [entry for entry in query_log if entry[0] == "products"]
+    assert len(product_reads) == 1
+    assert product_reads[0][2] == {"_id": {"$in": [rated.id, unrated.id, missing]}}
+
+
+async def test_batch_summary_rejects_invalid_ids_and_oversized_batches(make_user, client_as):
+    client = await client_as(await make_user())
+
+    response = await client.get("/reviews/summary/batch", params={"product_ids": "no-es-un-id"})
+    assert response.status_code == 400
+
+    too_many = ",".join(str(PydanticObjectId()) for _ in range(REVIEW_SUMMARY_BATCH_MAX + 1))
+    response = await client.get("/reviews/summary/batch", params={"product_ids": too_many})
+    assert response.status_code == 400
+
+
+async def create_review(product, user, rating=5, **fields) -> ProductReview:
+    review = ProductReview(
+        product_id=product.id,
+        user_id=user.id,
+        order_id=PydanticObjectId(),
+        rating=rating,
+        title="Muy buenas",
+        comment="Cómodas y bien terminadas.",
+        **fields
+    )
+    await review.create()
+    return review
+
+
+def review_reads(query_log) -> int:
+    return sum(1 for entry in query_log if entry[0] == "product_reviews")
+
+
+async def test_first_page_of_reviews_is_served_from_cache(make_user, query_log):
+    product = await create_product("Sandalias")
+    first = await create_review(product, await make_user(), rating=4)
+
+    page = await get_product_reviews(str(product.id), skip=0, limit=20, sort_by="recent")
+    assert [review.id for review in page] == [first.id]
+
+    query_log.clear()
+    hits = review_service.cache_stats()["hits"]
+    cached = await get_product_reviews(str(product.id), skip=0, limit=5, sort_by="recent")
+    assert [review.id for review in cached] == [first.id]
+    assert review_reads(query_log) == 0
+    assert review_service.cache_stats()["hits"] == hits + 1
+
+    # Páginas siguientes no se cachean
+    await get_product_reviews(str(product.id), skip=20, limit=20, sort_by="recent")
+    assert review_reads(query_log) == 1
+
+
+async def test_review_writes_invalidate_the_cached_first_page(make_user):
+    product = await create_product("Sandalias")
+    author = await make_user()
+    await create_review(product, await make_user(), rating=3)
+    await create_review(product, await make_user(), rating=5)
+
+    async def ratings(sort_by="rating_low"):
+        page = await get_product_reviews(str(product.id), skip=0, limit=20, sort_by=sort_by)
+        return [review.rating for review in page]
+
+    assert await ratings() == [3, 5]
+
+    # Una review escrita por fuera de las rutas no se ve hasta invalidar
+    own = await create_review(product, author, rating=2)
+    assert await ratings() == [3, 5]
+    review_service.invalidate_product(product.id)
+    assert await ratings() == [2, 3, 5]
+    assert await ratings("recent") == [2, 5, 3]
+
+    # Las rutas de escritura invalidan todos los órdenes del producto
+    await update_review(str(own.id), ReviewUpdate(rating=4), current_user=author)
+    assert await ratings() == [3, 4, 5]
+    assert await ratings("helpful") == [4, 5, 3]
+
+    await delete_review(str(own.id), current_user=author)
+    assert await ratings() == [3, 5]
+    assert await ratings("recent") == [5, 3]
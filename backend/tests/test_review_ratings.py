@@ -0,0 +1,179 @@
+"""
+Agregados de rating del producto: adjust_product_rating aplica los deltas
+en un solo pipeline update (con piso en 0 y promedio recalculado), y las
+rutas de reviews concurrentes no pierden ni duplican ajustes.
+"""
+import asyncio
+from collections import Counter
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.models.product_model import Product
+from app.models.review_model import ProductReview
+from app.routes.review_routes import adjust_product_rating, approve_review, delete_review, update_review
+from app.schemas.review_schema import ReviewUpdate
+
+pytestmark = pytest.mark.usefixtures("interleaved_io")
+
+
+async def create_product() -> Product:
+    product = Product(name="Sandalias de cuero", base_price=35.0, category="sandalias", stock=10)
+    await product.create()
+    return product
+
+
+async def create_review(product, user, rating, is_approved=True, verified_purchase=False) -> ProductReview:
+    review = ProductReview(
+        product_id=product.id,
+        user_id=user.id,
+        order_id=PydanticObjectId(),
+        rating=rating,
+        title="Muy buenas",
+        comment="Cómodas y bien terminadas.",
+        verified_purchase=verified_purchase,
+        is_approved=is_approved
+    )
+    await review.create()
+    if is_approved:
+        await adjust_product_rating(product.id, {rating: 1}, verified_delta=1 if verified_purchase else 0)
+    return review
+
+
+async def expected_aggregates(product_id) -> dict:
+    """Agregados recalculados desde las reviews aprobadas que quedan"""
+    reviews = await ProductReview.find(
+        ProductReview.product_id == product_id,
+        ProductReview.is_approved == True
+    ).to_list()
+    ratings = [review.rating for review in reviews]
+    distribution = Counter(ratings)
+    return {
+        "review_count": len(ratings),
+        "rating_sum": sum(ratings),
+        "rating_distribution": {str(stars): distribution.get(stars, 0) for stars in range(1, 6)},
+        "verified_review_count": sum(1 for review in reviews if review.verified_purchase),
+        "average_rating": round(sum(ratings) / len(ratings), 2) if ratings else 0,
+    }
+
+
+def aggregates_of(product: Product) -> dict:
+    return {
+        "review_count": product.review_count,
+        "rating_sum": product.rating_sum,
+        "rating_distribution": product.rating_distribution,
+        "verified_review_count": product.verified_review_count,
+        "average_rating": product.average_rating,
+    }
+
+
+async def test_adjust_product_rating_applies_deltas_and_recomputes_average(db):
+    product = await create_product()
+
+    await adjust_product_rating(product.id, {5: 1}, verified_delta=1)
+    await adjust_product_rating(product.id, {4: 1})
+    await adjust_product_rating(product.id, {4: 1})
+
+    product = await Product.get(product.id)
+    assert product.review_count == 3
+    assert product.rating_sum == 13
+    assert product.rating_distribution == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+    assert product.verified_review_count == 1
+    assert product.average_rating == 4.33
+
+    # Cambio de calificación 4 -> 1: el conteo no cambia, la suma y el promedio sí
+    await adjust_product_rating(product.id, {4: -1, 1: 1})
+
+    product = await Product.get(product.id)
+    assert product.review_count == 3
+    assert product.rating_sum == 10
+    assert product.rating_distribution == {"1": 1, "2": 0, "3": 0, "4": 1, "5": 1}
+    assert product.average_rating == 3.33
+
+
+async def test_adjust_product_rating_without_changes_is_a_noop(db):
+    product = await create_product()
+
+    await adjust_product_rating(product.id, {5: 0}, verified_delta=0)
+
+    raw = await Product.get_pymongo_collection().find_one({"_id": product.id})
+    assert raw["review_count"] == 0
+    assert raw["average_rating"] == 0
+
+
+async def test_removing_the_last_review_resets_average_to_zero(db):
+    product = await create_product()
+    await adjust_product_rating(product.id, {3: 1}, verified_delta=1)
+
+    await adjust_product_rating(product.id, {3: -1}, verified_delta=-1)
+
+    product = await Product.get(product.id)
+    assert aggregates_of(product) == {
+        "review_count": 0,
+        "rating_sum": 0,
+        "rating_distribution": {str(stars): 0 for stars in range(1, 6)},
+        "verified_review_count": 0,
+        "average_rating": 0,
+    }
+
+
+async def test_counters_are_clamped_at_zero_on_legacy_products(db):
+    """Un producto sin agregados (anterior a ellos) no queda con contadores negativos"""
+    product_id = PydanticObjectId()
+    await Product.get_pymongo_collection().insert_one({
+        "_id": product_id,
+        "name": "Producto antiguo",
+        "base_price": 20.0,
+        "category": "bolsos",
+        "average_rating": 4.5,
+    })
+
+    await adjust_product_rating(product_id, {4: -1}, verified_delta=-1)
+
+    raw = await Product.get_pymongo_collection().find_one({"_id": product_id})
+    assert raw["review_count"] == 0
+    assert raw["rating_sum"] == 0
+    assert raw["rating_distribution"] == {"4": 0}
+    assert raw["verified_review_count"] == 0
+    assert raw["average_rating"] == 0
+
+    # El documento sigue siendo válido para el modelo
+    product = await Product.get(product_id)
+    assert product.review_count == 0
+
+
+async def test_concurrent_review_writes_keep_aggregates_consistent(make_user):
+    """
+    Aprobaciones (algunas duplicadas), cambios de calificación y borrados
+    intercalados sobre el mismo producto dejan los agregados iguales a
+    recalcularlos desde las reviews.
+    """
+    product = await create_product()
+    admin = await make_user(role="admin")
+
+    pending = [
+        await create_review(product, await make_user(), rating=1 + i % 5, is_approved=False, verified_purchase=i % 2 == 0)
+        for i in range(10)
+    ]
+    owners = [await make_user() for _ in range(10)]
+    to_update = [await create_review(product, owner, rating=2) for owner in owners]
+    to_delete = [
+        await create_review(product, await make_user(), rating=5, verified_purchase=True)
+        for _ in range(10)
+    ]
+
+    writes = []
+    for review in pending:
+        # Dos admins aprobando la misma review a la vez: solo suma una vez
+        writes.append(approve_review(str(review.id), current_user=admin))
+        writes.append(approve_review(str(review.id), current_user=admin))
+    for i, (review, owner) in enumerate(zip(to_update, owners)):
+        writes.append(update_review(str(review.id), ReviewUpdate(rating=3 + i % 3), current_user=owner))
+    for review in to_delete:
+        writes.append(delete_review(str(review.id), current_user=admin))
+
+    await asyncio.gather(*writes)
+
+    product = await Product.get(product.id)
+    assert aggregates_of(product) == await expected_aggregates(product.id)
+    assert product.review_count == 20
@@ -0,0 +1,90 @@
+"""
+Votos 'útil' sobre reviews: un voto por usuario aunque lleguen requests
+concurrentes, y el voto se revierte si la review no admite votos.
+"""
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+
+from app.models.review_model import ProductReview, ReviewHelpfulVote
+from app.routes.review_routes import mark_review_helpful
+
+pytestmark = pytest.mark.usefixtures("interleaved_io")
+
+
+async def create_review(user, is_approved=True) -> ProductReview:
+    review = ProductReview(
+        product_id=PydanticObjectId(),
+        user_id=user.id,
+        order_id=PydanticObjectId(),
+        rating=5,
+        title="Muy buenas",
+        comment="Cómodas y bien terminadas.",
+        is_approved=is_approved
+    )
+    await review.create()
+    return review
+
+
+async def vote_concurrently(review_id, users):
+    results = await asyncio.gather(
+        *[mark_review_helpful(str(review_id), current_user=user) for user in users],
+        return_exceptions=True
+    )
+    unexpected = [r for r in results if isinstance(r, Exception) and not isinstance(r, HTTPException)]
+    assert not unexpected, unexpected
+    return [r for r in results if isinstance(r, dict)], [r for r in results if isinstance(r, HTTPException)]
+
+
+async def test_concurrent_double_votes_count_once(make_user):
+    review = await create_review(await make_user())
+    voter = await make_user()
+
+    accepted, rejected = await vote_concurrently(review.id, [voter] * 8)
+
+    assert len(accepted) == 1
+    assert all(error.status_code == 400 for error in rejected) and len(rejected) == 7
+    assert (await ProductReview.get(review.id)).helpful_count == 1
+    assert await ReviewHelpfulVote.find(ReviewHelpfulVote.review_id == review.id).count() == 1
+
+
+async def test_concurrent_votes_from_different_users_all_count(make_user):
+    review = await create_review(await make_user())
+    voters = [await make_user() for _ in range(10)]
+
+    accepted, rejected = await vote_concurrently(review.id, voters + voters)
+
+    assert len(accepted) == 10 and len(rejected) == 10
+    assert (await ProductReview.get(review.id)).helpful_count == 10
+    assert sorted(r["helpful_count"] for r in accepted) == list(range(1, 11))
+
+
+async def test_vote_is_rolled_back_when_the_increment_does_not_apply(make_user):
+    """Review pendiente: el $inc condicional no aplica y el voto se elimina"""
+    review = await create_review(await make_user(), is_approved=False)
+    voter = await make_user()
+
+    with pytest.raises(HTTPException) as error:
+        await mark_review_helpful(str(review.id), current_user=voter)
+
+    assert error.value.status_code == 404
+    assert await ReviewHelpfulVote.find(ReviewHelpfulVote.review_id == review.id).count() == 0
+    assert (await ProductReview.get(review.id)).helpful_count == 0
+
+    # Sin el voto huérfano, el usuario puede votar cuando la review se aprueba
+    await review.set({ProductReview.is_approved: True})
+    result = await mark_review_helpful(str(review.id), current_user=voter)
+    assert result == {"success": True, "helpful_count": 1}
+
+
+async def test_votes_on_missing_reviews_leave_no_vote_behind(make_user):
+    voter = await make_user()
+
+    for review_id in (str(PydanticObjectId()), "no-es-un-id"):
+        with pytest.raises(HTTPException) as error:
+            await mark_review_helpful(review_id, current_user=voter)
+        assert error.value.status_code == 404
+
+    assert await ReviewHelpfulVote.count() == 0
@@ -0,0 +1,61 @@
+"""
+Métodos de envío: IDs de zona y los IDs fijos del frontend
+"""
+from app.models.shipping_model import ShippingZone, ShippingMethod
+from app.models.user_model import Address
+from app.services.shipping_service import shipping_service
+
+SAN_SALVADOR = Address(street="Av. La Capilla 123", city="San Salvador", state="San Salvador")
+SANTA_ANA = Address(street="Calle Libertad 4", city="Santa Ana", state="Santa Ana")
+
+
+def method(method_id: str, price: float, days_max: int) -> ShippingMethod:
+    return ShippingMethod(
+        id=method_id,
+        name=method_id,
+        description="Método de zona",
+        base_price=price,
+        estimated_days_min=1,
+        estimated_days_max=days_max,
+        carrier="Correos de El Salvador"
+    )
+
+
+async def load_zone():
+    zone = ShippingZone(
+        name="San Salvador",
+        department="San Salvador",
+        shipping_methods=[method("ss_normal", 2.5, 3), method("ss_rapido", 8.0, 1), method("ss_economico", 1.5, 6)]
+    )
+    await zone.create()
+    await shipping_service.load()
+
+
+async def test_zone_method_ids_are_quoted_directly(db):
+    await load_zone()
+
+    quote = shipping_service.quote_method("ss_normal", SAN_SALVADOR, subtotal=20)
+    assert quote.method.id == "ss_normal"
+    assert quote.cost == 2.5
+
+
+async def test_legacy_ids_map_to_zone_equivalents(db):
+    await load_zone()
+
+    assert shipping_service.quote_method("standard_ss", SAN_SALVADOR, subtotal=20).method.id == "ss_economico"
+    assert shipping_service.quote_method("standard_national", SAN_SALVADOR, subtotal=20).method.id == "ss_economico"
+    assert shipping_service.quote_method("express", SAN_SALVADOR, subtotal=20).method.id == "ss_rapido"
+
+
+async def test_unknown_method_id_is_not_available(db):
+    await load_zone()
+
+    assert shipping_service.quote_method("drone", SAN_SALVADOR, subtotal=20) is None
+
+
+async def test_default_methods_without_zone(db):
+    await load_zone()
+
+    quote = shipping_service.quote_method("standard_national", SANTA_ANA, subtotal=20)
+    assert quote.method.id == "standard_national"
+    assert quote.zone_name is None
@@ -0,0 +1,76 @@
+"""
+Listado y exportación de usuarios (admin)
+"""
+import csv
+import io
+
+from tests.conftest import utc_now, days
+
+
+async def create_users(make_user, count: int):
+    # created_at distintos para un orden determinista
+    return [await make_user(created_at=utc_now() - days(i)) for i in range(count)]
+
+
+async def test_list_users_returns_bare_list_by_default(db, client_as, make_user):
+    admin = await make_user(role="admin", created_at=utc_now() - days(30))
+    users = await create_users(make_user, 3)
+    client = await client_as(admin)
+
+    response = await client.get("/users/")
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data, list)
+    assert [u["email"] for u in data] == [u.email for u in users] + [admin.email]
+
+    response = await client.get("/users/", params={"limit": 2})
+    assert [u["email"] for u in response.json()] == [u.email for u in users[:2]]
+
+
+async def test_list_users_cursor_mode_walks_all_pages(db, client_as, make_user):
+    admin = await make_user(role="admin", created_at=utc_now() - days(30))
+    users = await create_users(make_user, 5)
+    client = await client_as(admin)
+
+    seen = []
+    params = {"paginate": "true", "limit": 2, "role": "customer"}
+    while True:
+        response = await client.get("/users/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen += [u["email"] for u in page["items"]]
+        if not page["next_cursor"]:
+            break
+        params = {"cursor": page["next_cursor"], "limit": 2, "role": "customer"}
+
+    assert seen == [u.email for u in users]
+
+
+async def test_export_neutralizes_formula_cells(db, client_as, make_user):
+    admin = await make_user(role="admin")
+    await make_user(first_name="=HYPERLINK(\"http://evil\")", last_name="@SUM(A1)", phone_number="+50370000000")
+    client = await client_as(admin)
+
+    response = await client.get("/users/export")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    attacker = next(r for r in rows if r["last_name"].endswith("SUM(A1)"))
+
+    assert attacker["first_name"] == "'=HYPERLINK(\"http://evil\")"
+    assert attacker["last_name"] == "'@SUM(A1)"
+    assert attacker["phone_number"] == "'+50370000000"
+    assert attacker["role"] == "customer"
+
+
+async def test_search_matches_email_and_name_prefixes(db, client_as, make_user):
+    admin = await make_user(role="admin", first_name="Zoe", last_name="Admin")
+    ana = await make_user(first_name="Ana", last_name="López", email="ana.lopez@example.com")
+    anabel = await make_user(first_name="María", last_name="anabel", email="maria@example.com")
+    await make_user(first_name="Juana", last_name="Pérez", email="juana@example.com")
+    client = await client_as(admin)
+
+    response = await client.get("/users/", params={"search": "ana"})
+    assert {u["email"] for u in response.json()} == {ana.email, anabel.email}
+
+    response = await client.get("/users/", params={"search": "maria@"})
+    assert [u["email"] for u in response.json()] == [anabel.email]
@@ -0,0 +1,115 @@
+"""
+Compra verificada al crear reviews: se detecta desde las órdenes enviadas
+o entregadas del usuario, nunca desde datos del cliente.
+"""
+from beanie import PydanticObjectId
+
+from app.models.orders_model import Order, OrderItem, OrderStatus
+from app.models.product_model import Product
+from app.models.review_model import ProductReview
+from app.routes.review_routes import find_verified_purchase
+from tests.conftest import utc_now, days
+
+
+async def create_product(name: str = "Sandalias de cuero") -> Product:
+    product = Product(name=name, base_price=35.0, category="sandalias", stock=10)
+    await product.create()
+    return product
+
+
+async def create_order(user, products, status: OrderStatus, age_days: int = 0, variant_sku=None) -> Order:
+    items = [
+        OrderItem(
+            product_id=product.id,
+            product_name=product.name,
+            quantity=1,
+            price=product.base_price,
+            variant_sku=variant_sku,
+            variant_info="Talla 38, Negro" if variant_sku else None
+        )
+        for product in products
+    ]
+    order = Order(
+        user_id=user.id,
+        user_email=user.email,
+        items=items,
+        subtotal=sum(item.price for item in items),
+        total_amount=sum(item.price for item in items),
+        shipping_address=user.address,
+        status=status,
+        created_at=utc_now() - days(age_days)
+    )
+    await order.create()
+    return order
+
+
+def review_payload(product, **fields) -> dict:
+    return {
+        "product_id": str(product.id),
+        "rating": 5,
+        "title": "Excelentes",
+        "comment": "Muy cómodas y bien terminadas.",
+        **fields
+    }
+
+
+async def test_shipped_or_delivered_orders_verify_the_purchase(make_user):
+    sandals, bag = await create_product(), await create_product("Bolso")
+    user = await make_user()
+    await create_order(user, [bag, sandals], OrderStatus.SHIPPED, age_days=10, variant_sku="SAND-38-NEGRO")
+    latest = await create_order(user, [sandals], OrderStatus.DELIVERED, age_days=2)
+
+    purchase = await find_verified_purchase(user.id, sandals.id)
+
+    # La orden más reciente, con solo el item del producto
+    assert purchase["_id"] == latest.id
+    assert [item["product_id"] for item in purchase["items"]] == [sandals.id]
+
+    shipped = await find_verified_purchase(user.id, bag.id)
+    assert [item["product_id"] for item in shipped["items"]] == [bag.id]
+
+
+async def test_pending_or_foreign_orders_do_not_count(make_user):
+    product = await create_product()
+    buyer, other = await make_user(), await make_user()
+    await create_order(buyer, [product], OrderStatus.PENDING)
+    await create_order(buyer, [product], OrderStatus.CANCELLED)
+    await create_order(other, [product], OrderStatus.DELIVERED)
+
+    assert await find_verified_purchase(buyer.id, product.id) is None
+    assert await find_verified_purchase(PydanticObjectId(), product.id) is None
+
+
+async def test_buyer_review_is_verified_with_order_and_variant(make_user, client_as):
+    sandals, bag = await create_product(), await create_product("Bolso")
+    buyer = await make_user()
+    order = await create_order(buyer, [bag, sandals], OrderStatus.DELIVERED, variant_sku="SAND-38-NEGRO")
+    client = await client_as(buyer)
+
+    response = await client.post("/reviews/", json=review_payload(sandals))
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["verified_purchase"] is True
+    assert body["order_id"] == str(order.id)
+    assert body["variant_sku"] == "SAND-38-NEGRO"
+    assert (await Product.get(sandals.id)).verified_review_count == 1
+
+
+async def test_non_buyer_review_is_unverified_and_ignores_client_order_id(make_user, client_as):
+    product = await create_product()
+    buyer, stranger = await make_user(), await make_user()
+    buyer_order = await create_order(buyer, [product], OrderStatus.DELIVERED)
+    await create_order(stranger, [product], OrderStatus.PENDING)
+    client = await client_as(stranger)
+
+    response = await client.post("/reviews/", json=review_payload(product, order_id=str(buyer_order.id)))
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["verified_purchase"] is False
+    assert body["order_id"] is None
+
+    review = await ProductReview.find_one(ProductReview.user_id == stranger.id)
+    assert review.order_id is None
+    assert (await Product.get(product.id)).verified_review_count == 0
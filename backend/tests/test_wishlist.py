@@ -0,0 +1,190 @@
+"""
+Wishlist: carga de productos con una sola consulta y limpieza de
+productos eliminados o inactivos, upserts atómicos concurrentes y cache
+de membresía.
+"""
+import asyncio
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.core import cache as cache_module
+from app.core.config import settings
+from app.models.product_model import Product, ProductVariant
+from app.models.wishlist_model import Wishlist
+from app.routes.wishlist_routes import (
+    WishlistCheckRequest,
+    add_to_wishlist,
+    check_in_wishlist,
+    check_many_in_wishlist,
+    clear_wishlist,
+    get_wishlist_products,
+    remove_from_wishlist,
+    toggle_wishlist
+)
+from app.services.wishlist_service import wishlist_service
+
+
+async def create_product(name: str, **fields) -> Product:
+    product = Product(name=name, base_price=30.0, category="sandalias", **fields)
+    await product.create()
+    return product
+
+
+async def create_wishlist(user, product_ids) -> Wishlist:
+    wishlist = Wishlist(user_id=user.id, products=list(product_ids))
+    await wishlist.create()
+    return wishlist
+
+
+async def test_products_are_loaded_with_one_query_in_wishlist_order(make_user, query_log):
+    user = await make_user()
+    in_stock = await create_product("Sandalias", stock=3)
+    sold_out = await create_product("Bolso", stock=0)
+    variants = await create_product("Hamaca", has_variants=True, variants=[
+        ProductVariant(sku="HAM-AZUL", size="Única", color="Azul", stock=0),
+        ProductVariant(sku="HAM-ROJA", size="Única", color="Rojo", stock=2),
+    ])
+    # Orden de la wishlist distinto al de creación
+    order = [variants.id, in_stock.id, sold_out.id]
+    await create_wishlist(user, order)
+    query_log.clear()
+
+    products = await get_wishlist_products(current_user=user)
+
+    assert [PydanticObjectId(p.id) for p in products] == order
+    assert {p.name: p.in_stock for p in products} == {"Hamaca": True, "Sandalias": True, "Bolso": False}
+
+    product_reads = [entry for entry in query_log if entry[0] == "products"]
+    assert len(product_reads) == 1
+    assert product_reads[0][2] == {"_id": {"$in": order}}
+
+
+async def test_deleted_and_inactive_products_are_pruned(make_user):
+    user = await make_user()
+    kept = await create_product("Sandalias", stock=3)
+    inactive = await create_product("Bolso", stock=3, is_active=False)
+    deleted = await create_product("Cartera", stock=3)
+    await create_wishlist(user, [deleted.id, kept.id, inactive.id])
+    await deleted.delete()
+
+    # Membresía cacheada antes de la limpieza
+    assert deleted.id in await wishlist_service.get_membership(user.id)
+
+    products = await get_wishlist_products(current_user=user)
+
+    assert [p.name for p in products] == ["Sandalias"]
+    wishlist = await Wishlist.find_one(Wishlist.user_id == user.id)
+    assert wishlist.products == [kept.id]
+    assert await wishlist_service.get_membership(user.id) == frozenset({kept.id})
+
+
+async def test_empty_or_missing_wishlist_does_not_query_products(make_user, query_log):
+    user = await make_user()
+    assert await get_wishlist_products(current_user=user) == []
+
+    await create_wishlist(user, [])
+    assert await get_wishlist_products(current_user=user) == []
+
+    assert not [entry for entry in query_log if entry[0] == "products"]
+
+
+async def test_concurrent_adds_create_a_single_wishlist(make_user, interleaved_io):
+    user = await make_user()
+    products = [await create_product(f"Producto {i}", stock=1) for i in range(10)]
+
+    results = await asyncio.gather(*[
+        add_to_wishlist(str(product.id), current_user=user) for product in products
+    ])
+
+    assert sorted(r["count"] for r in results) == list(range(1, 11))
+    wishlists = await Wishlist.find(Wishlist.user_id == user.id).to_list()
+    assert len(wishlists) == 1
+    assert set(wishlists[0].products) == {p.id for p in products}
+
+
+async def test_upsert_race_is_retried_as_an_update(make_user, monkeypatch):
+    """
+    Otro request crea la wishlist entre el match vacío y el insert del
+    upsert: el índice único rechaza el segundo documento y el reintento
+    aplica el update sobre la wishlist ya creada.
+    """
+    user = await make_user()
+    first, second = await create_product("Sandalias", stock=1), await create_product("Bolso", stock=1)
+    collection = Wishlist.get_pymongo_collection()
+    original = type(collection).find_one_and_update
+    calls = []
+
+    async def racing_find_one_and_update(self, filter, update, *args, **kwargs):
+        calls.append(filter)
+        if len(calls) == 1:
+            await Wishlist(user_id=user.id, products=[first.id]).create()
+            raise DuplicateKeyError("E11000 duplicate key error collection: wishlists index: user_id_1")
+        return await original(self, filter, update, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), "find_one_and_update", racing_find_one_and_update)
+
+    result = await toggle_wishlist(str(second.id), current_user=user)
+
+    assert len(calls) == 2
+    assert result["added"] is True and result["count"] == 2
+    wishlists = await Wishlist.find(Wishlist.user_id == user.id).to_list()
+    assert len(wishlists) == 1
+    assert wishlists[0].products == [first.id, second.id]
+
+
+def wishlist_reads(query_log) -> int:
+    return sum(1 for entry in query_log if entry[0] == "wishlists")
+
+
+async def test_membership_checks_are_served_from_cache(make_user, query_log):
+    user = await make_user()
+    saved, other = await create_product("Sandalias", stock=1), await create_product("Bolso", stock=1)
+    await create_wishlist(user, [saved.id])
+    query_log.clear()
+    hits = wishlist_service.cache_stats()["hits"]
+
+    grid = await check_many_in_wishlist(
+        WishlistCheckRequest(product_ids=[str(saved.id), str(other.id), "no-es-un-id"]),
+        current_user=user
+    )
+    single = await check_in_wishlist(str(saved.id), current_user=user)
+
+    assert grid.in_wishlist == {str(saved.id): True, str(other.id): False, "no-es-un-id": False}
+    assert single == {"in_wishlist": True}
+    assert wishlist_reads(query_log) == 1
+    assert wishlist_service.cache_stats()["hits"] == hits + 1
+
+
+async def test_wishlist_mutations_invalidate_the_membership(make_user):
+    user = await make_user()
+    product = await create_product("Sandalias", stock=1)
+
+    async def in_wishlist() -> bool:
+        return (await check_in_wishlist(str(product.id), current_user=user))["in_wishlist"]
+
+    assert await in_wishlist() is False
+    await add_to_wishlist(str(product.id), current_user=user)
+    assert await in_wishlist() is True
+    await remove_from_wishlist(str(product.id), current_user=user)
+    assert await in_wishlist() is False
+    await toggle_wishlist(str(product.id), current_user=user)
+    assert await in_wishlist() is True
+    await clear_wishlist(current_user=user)
+    assert await in_wishlist() is False
+
+
+async def test_membership_expires_after_the_ttl(make_user, monkeypatch):
+    user = await make_user()
+    product = await create_product("Sandalias", stock=1)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock["now"])
+
+    assert product.id not in await wishlist_service.get_membership(user.id)
+
+    # Escritura por fuera del servicio (otro worker): se ve al expirar el TTL
+    await create_wishlist(user, [product.id])
+    assert product.id not in await wishlist_service.get_membership(user.id)
+
+    clock["now"] += settings.WISHLIST_CACHE_TTL_SECONDS + 1
+    assert product.id in await wishlist_service.get_membership(user.id)
@@ -0,0 +1,63 @@
+"""
+Avisos de wishlist: encolado en bloque en la cola de salida
+"""
+import pytest
+
+from app.models.email_outbox_model import EmailOutboxMessage
+from app.models.product_model import Product
+from app.models.wishlist_model import Wishlist
+from app.services.email_service import email_service
+from app.services.wishlist_alert_service import wishlist_alert_service
+
+
+@pytest.fixture
+def sendgrid_configured(monkeypatch):
+    # Solo se encola: basta con que el cliente exista
+    monkeypatch.setattr(email_service, "sg", object())
+
+
+async def create_wishers(make_user, product: Product, count: int):
+    users = []
+    for _ in range(count):
+        user = await make_user()
+        await Wishlist(user_id=user.id, products=[product.id]).create()
+        users.append(user)
+    return users
+
+
+async def test_back_in_stock_alerts_are_enqueued_in_bulk(db, make_user, sendgrid_configured, monkeypatch):
+    product = Product(name="Hamaca", base_price=60.0, category="hamacas", stock=5)
+    await product.create()
+    users = await create_wishers(make_user, product, 5)
+
+    inserts = []
+    original = EmailOutboxMessage.insert_many
+
+    async def counting_insert_many(documents, *args, **kwargs):
+        inserts.append(len(documents))
+        return await original(documents, *args, **kwargs)
+
+    monkeypatch.setattr(EmailOutboxMessage, "insert_many", counting_insert_many)
+    monkeypatch.setattr("app.core.config.settings.WISHLIST_ALERT_BATCH_SIZE", 3)
+
+    assert await wishlist_alert_service.notify_back_in_stock(product.id) == 5
+    assert inserts == [3, 2]
+
+    messages = {m.to_email: m for m in await EmailOutboxMessage.find_all().to_list()}
+    assert set(messages) == {u.email for u in users}
+    for user in users:
+        assert messages[user.email].kind == "back_in_stock"
+        assert user.first_name in messages[user.email].html_content
+
+    # Ventana por producto: una segunda difusión inmediata no encola nada
+    assert await wishlist_alert_service.notify_back_in_stock(product.id) == 0
+
+
+async def test_price_drop_alerts_show_the_old_price(db, make_user, sendgrid_configured):
+    product = Product(name="Bolso", base_price=30.0, category="bolsos", stock=5)
+    await product.create()
+    await create_wishers(make_user, product, 2)
+
+    assert await wishlist_alert_service.notify_price_drop(product.id, old_price=40.0) == 2
+    messages = await EmailOutboxMessage.find_all().to_list()
+    assert all("$40.00" in m.html_content for m in messages)